@@ -10,7 +10,10 @@ A production-ready LangGraph workflow for generating email drafts with:
 
 Flow: classifier -> contextBuilder -> drafter -> policyGuard
 """
+import functools
+import html
 import logging
+import re
 from typing import TypedDict, Literal
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
@@ -243,6 +246,37 @@ Generate the HTML email body:
     }
 
 
+# Tags are replaced with a space so adjacent block elements don't fuse words
+_HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+_HTML_ATTR_VALUE_PATTERN = re.compile(r"""=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+
+
+def _scannable_text(draft: str) -> str:
+    """
+    Lowercased visible text of a draft, followed by each attribute value
+    (href, alt, title, ...) on its own line.
+
+    Normalised phrases never contain a newline, so a match cannot span the
+    visible text and an attribute value.
+    """
+    segments = [_HTML_TAG_PATTERN.sub(" ", draft)]
+    for tag in _HTML_TAG_PATTERN.finditer(draft):
+        for match in _HTML_ATTR_VALUE_PATTERN.finditer(tag.group()):
+            segments.append(next(value for value in match.groups() if value is not None))
+    return "\n".join(" ".join(html.unescape(segment).split()) for segment in segments).lower()
+
+
+@functools.lru_cache(maxsize=256)
+def _normalized_blocklist(blocklist: tuple[str, ...]) -> tuple[tuple[str, str], ...]:
+    """(display, lowercased) pairs for non-empty phrases, built once per workspace blocklist."""
+    phrases = {}
+    for phrase in blocklist:
+        phrase = " ".join(phrase.split())
+        if phrase:
+            phrases.setdefault(phrase.lower(), phrase)
+    return tuple((phrase, phrase_lower) for phrase_lower, phrase in phrases.items())
+
+
 # Node: Policy Guard
 def policy_guard_node(state: DraftCrewState) -> DraftCrewState:
     """
@@ -252,8 +286,12 @@ def policy_guard_node(state: DraftCrewState) -> DraftCrewState:
 
     If violations found, halt the workflow.
     """
-    draft = state.get("draft_html", "")
     blocklist = state.get("blocklist", [])
+    if not blocklist:
+        # No policy to enforce; skip normalising the draft
+        return {**state, "violations": []}
+
+    draft = state.get("draft_html", "")
     violations = []
 
     logger.info(
@@ -264,17 +302,16 @@ def policy_guard_node(state: DraftCrewState) -> DraftCrewState:
         }
     )
 
-    # Check blocklist (case-insensitive, fail fast)
-    draft_lower = draft.lower()
-    for phrase in blocklist:
-        phrase_clean = phrase.strip().lower()
-        if phrase_clean and phrase_clean in draft_lower:
-            violation_msg = f"Blocklisted phrase detected: '{phrase.strip()}'"
+    # Check blocklist (case-insensitive) against visible text and attribute values
+    text_lower = _scannable_text(draft)
+    for phrase, phrase_lower in _normalized_blocklist(tuple(blocklist)):
+        if phrase_lower in text_lower:
+            violation_msg = f"Blocklisted phrase detected: '{phrase}'"
             violations.append(violation_msg)
             logger.warning(
                 f"Policy violation",
                 extra={
-                    "violation": phrase.strip(),
+                    "violation": phrase,
                     "workspace_id": state.get("workspace_id", "unknown"),
                 }
             )
@@ -107,7 +107,7 @@ async def upload_document(
 
         db_session.add(document)
 
-        embeddings = generate_embeddings(
+        embeddings = await generate_embeddings(
             document_id=document.id, file_name=file_name, text=file_text
         )
 
@@ -7,10 +7,11 @@ Access tokens are obtained securely without storing provider refresh tokens.
 import hashlib
 import logging
 from typing import Any
-from datetime import datetime
+from datetime import datetime, timezone
 import httpx
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
 from app.core.auth import auth_client
@@ -452,7 +453,6 @@ async def create_thread_reply_draft(
 
                 # Format availability paragraph if slots are available
                 if slots:
-                    from datetime import datetime
                     availability_lines = ["<p><strong>Proposed meeting times:</strong></p>", "<ul>"]
                     for slot in slots[:3]:  # Limit to 3 slots
                         try:
@@ -562,11 +562,34 @@ async def create_thread_reply_draft(
                 draft_id=draft_id,
                 subject=subject,
                 content_hash=content_hash,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+                created_at=datetime.now(timezone.utc),
+                updated_at=datetime.now(timezone.utc)
             )
             db_session.add(draft_record)
-            db_session.commit()
+            try:
+                db_session.commit()
+            except IntegrityError:
+                # A concurrent identical request stored its draft first; the
+                # unique constraint makes that row the one this request returns
+                db_session.rollback()
+                existing_draft = db_session.exec(statement).one()
+                logger.info(
+                    "Returning draft stored by a concurrent request",
+                    extra={
+                        "user_sub": user_sub[:8] + "...",
+                        "thread_id": thread_id,
+                        "draft_id": existing_draft.draft_id,
+                        "orphaned_draft_id": draft_id
+                    }
+                )
+                return DraftResponse(
+                    draft_id=existing_draft.draft_id,
+                    message_id=existing_draft.draft_id,
+                    thread_id=existing_draft.thread_id,
+                    subject=existing_draft.subject,
+                    created_at=existing_draft.created_at.isoformat(),
+                    is_duplicate=True
+                )
 
             logger.info(
                 "Draft reply created and stored successfully",
@@ -1,12 +1,13 @@
 """Knowledge Base API routes for upload and search."""
 import logging
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
 import PyPDF2
 from io import BytesIO
+from arq.jobs import Job, JobResult
 
 from app.core.auth import auth_client
-from app.kb.retrieval import upsert_document, search_kb
+from app.kb.retrieval import search_kb
 from app.kb.models import KBSearchRequest, KBSearchResponse
 
 logger = logging.getLogger(__name__)
@@ -20,6 +21,7 @@ MAX_FILE_SIZE = MAX_FILE_SIZE_MB * 1024 * 1024
 
 @kb_router.post("/upload")
 async def upload_kb_document(
+    request: Request,
     file: UploadFile = File(...),
     workspace_id: str = Query(...),
     title: str | None = Query(None),
@@ -30,8 +32,8 @@ async def upload_kb_document(
     """
     Upload a document to the KB.
 
-    Supports PDF and TXT files. Chunks the content, generates embeddings,
-    and stores in Qdrant with deduplication.
+    Supports PDF and TXT files. Text is extracted here; chunking, embedding
+    and the deduplicated Qdrant upsert run as a background ingest job.
 
     Args:
         file: File to upload (PDF or TXT)
@@ -41,11 +43,18 @@ async def upload_kb_document(
         tags: Comma-separated tags (e.g., "support,faq,billing")
 
     Returns:
-        Upload statistics (chunks uploaded, duplicates skipped)
+        202 with the ingest job ID; poll /kb/jobs/{job_id} for the upload statistics
+
+    Raises:
+        HTTPException 503: If the job queue (Redis) is unavailable
     """
     user = auth_session.get("user")
     user_email = user.get("email", "unknown")
 
+    arq_pool = request.app.state.arq
+    if arq_pool is None:
+        raise HTTPException(status_code=503, detail="KB ingestion queue is unavailable")
+
     # Read file
     binary_content = await file.read()
     file_name = file.filename or "untitled"
@@ -90,9 +99,11 @@ async def upload_kb_document(
     if tags:
         tag_list = [t.strip() for t in tags.split(",") if t.strip()]
 
-    # Upload to Qdrant
+    # Queue ingestion so the request doesn't wait on embedding and upserts
     try:
-        stats = upsert_document(
+        job = await arq_pool.enqueue_job(
+            "ingest",
+            owner=user.get("sub"),
             file_content=file_text,
             workspace_id=workspace_id,
             source="upload",
@@ -100,22 +111,63 @@ async def upload_kb_document(
             url=url,
             tags=tag_list,
         )
+    except Exception as e:
+        logger.error(f"Failed to queue KB ingest job: {e}")
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
-        logger.info(f"KB upload complete: {stats}")
+    logger.info(f"KB upload queued: job={job.job_id}, file={file_name}")
 
-        return JSONResponse(
-            status_code=200,
-            content={
-                "message": "Document uploaded successfully",
-                "file_name": file_name,
-                "workspace_id": workspace_id,
-                "stats": stats,
-            }
-        )
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": "Document queued for ingestion",
+            "file_name": file_name,
+            "workspace_id": workspace_id,
+            "job_id": job.job_id,
+        }
+    )
 
-    except Exception as e:
-        logger.error(f"Failed to upload document to KB: {e}")
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+@kb_router.get("/jobs/{job_id}")
+async def get_kb_job(
+    job_id: str,
+    request: Request,
+    auth_session=Depends(auth_client.require_session),
+) -> JSONResponse:
+    """
+    Get the status of a KB ingest job.
+
+    Args:
+        job_id: Job ID returned by /kb/upload
+
+    Returns:
+        Job status, plus upload statistics or the error once finished
+
+    Raises:
+        HTTPException 404: If the job doesn't exist or was queued by another user
+        HTTPException 503: If the job queue (Redis) is unavailable
+    """
+    arq_pool = request.app.state.arq
+    if arq_pool is None:
+        raise HTTPException(status_code=503, detail="KB ingestion queue is unavailable")
+
+    user = auth_session.get("user")
+
+    job = Job(job_id, redis=arq_pool)
+    status = await job.status()
+    info = await job.info()
+    # Other users' jobs are indistinguishable from missing ones
+    if info is None or info.kwargs.get("owner") != user.get("sub"):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    content = {"job_id": job_id, "status": status.value, "workspace_id": info.kwargs.get("workspace_id")}
+    if isinstance(info, JobResult):
+        if info.success:
+            content["stats"] = info.result
+        else:
+            content["error"] = str(info.result)
+
+    return JSONResponse(status_code=200, content=content)
 
 
 @kb_router.get("/search")
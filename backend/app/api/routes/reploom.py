@@ -162,84 +162,85 @@ async def run_draft(
                 headers["x-api-key"] = settings.LANGGRAPH_API_KEY
 
             # Make the request to LangGraph server
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    langgraph_url,
-                    json={
-                        "assistant_id": "reploom-crew",
-                        "input": initial_state,
-                        "config": {
-                            "configurable": {
-                                "thread_id": thread_id,
-                                "_credentials": {
-                                    "access_token": auth_session.get("token_sets", [{}])[0].get("access_token"),
-                                    "refresh_token": auth_session.get("refresh_token"),
-                                    "user": user,
-                                }
+            client = request.app.state.http
+            response = await client.post(
+                langgraph_url,
+                json={
+                    "assistant_id": "reploom-crew",
+                    "input": initial_state,
+                    "config": {
+                        "configurable": {
+                            "thread_id": thread_id,
+                            "_credentials": {
+                                "access_token": auth_session.get("token_sets", [{}])[0].get("access_token"),
+                                "refresh_token": auth_session.get("refresh_token"),
+                                "user": user,
                             }
-                        },
-                        "stream_mode": "values",
+                        }
                     },
-                    headers=headers,
-                )
+                    "stream_mode": "values",
+                },
+                headers=headers,
+                timeout=60.0,
+            )
 
-                if response.status_code != 200:
-                    logger.error(
-                        f"LangGraph server error",
-                        extra={
-                            "correlation_id": correlation_id,
-                            "status_code": response.status_code,
-                            "error": response.text[:200],  # Truncate error
-                        }
-                    )
-                    span.set_status(Status(StatusCode.ERROR, f"HTTP {response.status_code}"))
-                    span.set_attribute("http.status_code", response.status_code)
-                    raise HTTPException(
-                        status_code=response.status_code,
-                        detail=f"LangGraph server error: {response.status_code}"
-                    )
-
-                # Parse the response
-                result = response.json()
-
-                # Extract run ID from response
-                run_id = str(uuid.uuid4())  # Fallback
-                if isinstance(result, dict):
-                    run_id = result.get("run_id", run_id)
-
-                # Add intent and confidence to span (KEY REQUIREMENT)
-                intent = result.get("intent")
-                confidence = result.get("confidence")
-                if intent:
-                    span.set_attribute("draft.intent", intent)
-                if confidence is not None:
-                    span.set_attribute("draft.confidence", confidence)
-                span.set_attribute("draft.has_violations", bool(result.get("violations")))
-                span.set_attribute("run_id", run_id)
-
-                # Log successful completion
-                logger.info(
-                    f"Draft generation completed",
+            if response.status_code != 200:
+                logger.error(
+                    f"LangGraph server error",
                     extra={
                         "correlation_id": correlation_id,
-                        "thread_id": thread_id,
-                        "run_id": run_id,
-                        "intent": intent,
-                        "confidence": confidence,
-                        "has_violations": bool(result.get("violations")),
+                        "status_code": response.status_code,
+                        "error": response.text[:200],  # Truncate error
                     }
                 )
+                span.set_status(Status(StatusCode.ERROR, f"HTTP {response.status_code}"))
+                span.set_attribute("http.status_code", response.status_code)
+                raise HTTPException(
+                    status_code=response.status_code,
+                    detail=f"LangGraph server error: {response.status_code}"
+                )
 
-                span.set_status(Status(StatusCode.OK))
+            # Parse the response
+            result = response.json()
 
-                return RunDraftResponse(
-                    draft_html=result.get("draft_html"),
-                    confidence=confidence,
-                    intent=intent,
-                    violations=result.get("violations", []),
-                    thread_id=thread_id,
-                    run_id=run_id,
-                )
+            # Extract run ID from response
+            run_id = str(uuid.uuid4())  # Fallback
+            if isinstance(result, dict):
+                run_id = result.get("run_id", run_id)
+
+            # Add intent and confidence to span (KEY REQUIREMENT)
+            intent = result.get("intent")
+            confidence = result.get("confidence")
+            if intent:
+                span.set_attribute("draft.intent", intent)
+            if confidence is not None:
+                span.set_attribute("draft.confidence", confidence)
+            span.set_attribute("draft.has_violations", bool(result.get("violations")))
+            span.set_attribute("run_id", run_id)
+
+            # Log successful completion
+            logger.info(
+                f"Draft generation completed",
+                extra={
+                    "correlation_id": correlation_id,
+                    "thread_id": thread_id,
+                    "run_id": run_id,
+                    "intent": intent,
+                    "confidence": confidence,
+                    "has_violations": bool(result.get("violations")),
+                }
+            )
+
+            span.set_status(Status(StatusCode.OK))
+
+            return RunDraftResponse(
+                draft_html=result.get("draft_html"),
+                confidence=confidence,
+                intent=intent,
+                violations=result.get("violations", []),
+                thread_id=thread_id,
+                run_id=run_id,
+            )
 
         except httpx.RequestError as e:
             logger.error(
@@ -315,58 +316,58 @@ async def get_run_state(
         if settings.LANGGRAPH_API_KEY:
             headers["x-api-key"] = settings.LANGGRAPH_API_KEY
 
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(langgraph_url, headers=headers)
+        client = request.app.state.http
+        response = await client.get(langgraph_url, headers=headers, timeout=10.0)
 
-            if response.status_code == 404:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Run not found for thread_id: {thread_id}"
-                )
-
-            if response.status_code != 200:
-                logger.error(
-                    f"LangGraph server error",
-                    extra={
-                        "correlation_id": correlation_id,
-                        "status_code": response.status_code,
-                    }
-                )
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"LangGraph server error: {response.status_code}"
-                )
-
-            # Parse the response
-            result = response.json()
-
-            # Determine status from state
-            state = result.get("values", {})
-            violations = state.get("violations", [])
-            draft_html = state.get("draft_html")
-
-            if violations:
-                status = "failed"
-            elif draft_html:
-                status = "completed"
-            else:
-                status = "running"
+        if response.status_code == 404:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Run not found for thread_id: {thread_id}"
+            )
 
-            logger.info(
-                f"Fetched run state",
+        if response.status_code != 200:
+            logger.error(
+                f"LangGraph server error",
                 extra={
                     "correlation_id": correlation_id,
-                    "thread_id": thread_id,
-                    "status": status,
+                    "status_code": response.status_code,
                 }
             )
-
-            return RunStateResponse(
-                state=state,
-                status=status,
-                thread_id=thread_id,
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"LangGraph server error: {response.status_code}"
             )
 
+        # Parse the response
+        result = response.json()
+
+        # Determine status from state
+        state = result.get("values", {})
+        violations = state.get("violations", [])
+        draft_html = state.get("draft_html")
+
+        if violations:
+            status = "failed"
+        elif draft_html:
+            status = "completed"
+        else:
+            status = "running"
+
+        logger.info(
+            f"Fetched run state",
+            extra={
+                "correlation_id": correlation_id,
+                "thread_id": thread_id,
+                "status": status,
+            }
+        )
+
+        return RunStateResponse(
+            state=state,
+            status=status,
+            thread_id=thread_id,
+        )
+
     except HTTPException:
         raise
     except Exception as e:
@@ -385,7 +386,7 @@ async def get_run_state(
 
 
 @reploom_router.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """
     Health check endpoint to verify the reploom crew is available.
 
@@ -393,23 +394,23 @@ async def health_check():
         Status of LangGraph server and checkpointer configuration
     """
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{settings.LANGGRAPH_API_URL}/ok")
+        client = request.app.state.http
+        response = await client.get(f"{settings.LANGGRAPH_API_URL}/ok", timeout=5.0)
 
-            checkpointer_status = settings.GRAPH_CHECKPOINTER
+        checkpointer_status = settings.GRAPH_CHECKPOINTER
 
-            if response.status_code == 200:
-                return {
-                    "status": "healthy",
-                    "langgraph_server": "connected",
-                    "checkpointer": checkpointer_status,
-                }
-            else:
-                return {
-                    "status": "degraded",
-                    "langgraph_server": "error",
-                    "checkpointer": checkpointer_status,
-                }
+        if response.status_code == 200:
+            return {
+                "status": "healthy",
+                "langgraph_server": "connected",
+                "checkpointer": checkpointer_status,
+            }
+        else:
+            return {
+                "status": "degraded",
+                "langgraph_server": "error",
+                "checkpointer": checkpointer_status,
+            }
     except Exception as e:
         return {
             "status": "unhealthy",
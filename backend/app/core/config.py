@@ -83,6 +83,14 @@ class Settings(BaseSettings):
     QDRANT_URL: str = "http://localhost:6333"
     QDRANT_API_KEY: str = ""
     QDRANT_COLLECTION_NAME: str = "reploom_documents"
+    # gRPC multiplexes upserts/searches over one HTTP/2 connection; set to
+    # False where only the REST port is reachable
+    QDRANT_PREFER_GRPC: bool = True
+    QDRANT_GRPC_PORT: int = 6334
+    # Local per-workspace vector snapshots searched when Qdrant is unreachable;
+    # opt-in: set a writable directory to enable them
+    KB_SNAPSHOT_DIR: str = ""
+    KB_SNAPSHOT_INTERVAL_SECONDS: int = 600
 
     # LangGraph server
     LANGGRAPH_API_URL: str = "http://localhost:54367"
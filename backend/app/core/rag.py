@@ -6,6 +6,7 @@ from pydantic import SecretStr
 
 from app.core.config import settings
 from app.core.db import engine
+from app.kb.embeddings import agenerate_embeddings
 from app.models.embeddings import Embedding
 
 embedding_model = OpenAIEmbeddings(
@@ -16,10 +17,10 @@ embedding_model = OpenAIEmbeddings(
 vector_store: PGVectorStore | None = None
 
 
-def generate_embeddings(
+async def generate_embeddings(
     document_id: uuid.UUID, file_name: str, text: str
 ) -> list[Embedding]:
-    """Generate embeddings for a document."""
+    """Generate embeddings for a document, batching chunks into concurrent requests."""
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=100,
         chunk_overlap=10,
@@ -27,8 +28,9 @@ def generate_embeddings(
     )
 
     chunks = splitter.create_documents([text])
-    embeddings = embedding_model.embed_documents(
-        [chunk.page_content for chunk in chunks]
+    embeddings = await agenerate_embeddings(
+        [chunk.page_content for chunk in chunks],
+        model=embedding_model.model,
     )
 
     return [
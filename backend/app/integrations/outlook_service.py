@@ -4,17 +4,194 @@ This module provides functions for interacting with the Microsoft Graph API
 for Outlook mail operations, including message management and draft creation.
 """
 
+import asyncio
+import base64
+import hashlib
 import logging
-from typing import Any
+import random
+import weakref
+from collections.abc import Awaitable, Callable
+from typing import Any, NamedTuple, NoReturn
 import httpx
+import orjson
 from fastapi import HTTPException
 
 from app.core.tracing import get_tracer, safe_span_attributes
-from opentelemetry.trace import Status, StatusCode
+from opentelemetry.trace import Span, Status, StatusCode
 
 logger = logging.getLogger(__name__)
 tracer = get_tracer(__name__)
 
+GRAPH_API_BASE_URL = "https://graph.microsoft.com/v1.0"
+
+# Graph paths, relative to GRAPH_API_BASE_URL (also used for $batch sub-requests)
+_LIST_MESSAGES_URL = "/me/mailFolders/{folder}/messages"
+_MESSAGE_URL = "/me/messages/{message_id}"
+_CREATE_REPLY_URL = "/me/messages/{message_id}/createReply"
+_BATCH_URL = "/$batch"
+
+# Fields list_messages asks Graph for by default: what the message list view renders
+LIST_MESSAGES_SELECT = (
+    "id",
+    "conversationId",
+    "subject",
+    "from",
+    "bodyPreview",
+    "receivedDateTime",
+    "isRead",
+    "hasAttachments",
+)
+
+# Attempts per $batch when sub-requests are throttled (429)
+_BULK_MAX_ATTEMPTS = 3
+
+# Throttled/unavailable Graph responses are retried, honouring Retry-After
+# and otherwise backing off exponentially with jitter
+_RETRYABLE_STATUSES = frozenset({429, 503, 504})
+_MAX_RETRY_ATTEMPTS = 5
+_MAX_RETRY_DELAY_SECONDS = 30.0
+
+# Concurrent get_message calls for one mailbox are coalesced into $batch
+# requests: IDs queued within the window are flushed together, at most
+# _COALESCE_MAX_BATCH per batch and _MAILBOX_CONCURRENCY batches in flight
+_COALESCE_WINDOW_SECONDS = 0.005
+_COALESCE_MAX_BATCH = 4
+_MAILBOX_CONCURRENCY = 4
+
+# In-flight get_message futures, keyed by mailbox (see _mailbox_key) then
+# message ID; tokens themselves only live in the scheduled flush
+_pending: dict[str, dict[str, asyncio.Future]] = {}
+# Message IDs waiting for the next flush, keyed by mailbox
+_queued: dict[str, list[str]] = {}
+# Strong references to running flush tasks so they aren't garbage collected
+_flush_tasks: set[asyncio.Task] = set()
+# Batch gates per mailbox; each lives while a flush holds or awaits it
+_mailbox_semaphores: weakref.WeakValueDictionary[str, asyncio.Semaphore] = weakref.WeakValueDictionary()
+
+# Shared Graph client, created lazily so every call reuses warm (HTTP/2)
+# connections instead of paying a TCP + TLS handshake per request
+_graph_client: httpx.AsyncClient | None = None
+
+
+def get_graph_client() -> httpx.AsyncClient:
+    """Return the shared Microsoft Graph HTTP client, creating it on first use."""
+    global _graph_client
+    if _graph_client is None or _graph_client.is_closed:
+        _graph_client = httpx.AsyncClient(
+            base_url=GRAPH_API_BASE_URL,
+            timeout=15.0,
+            http2=True,
+            headers={"Accept": "application/json", "Accept-Encoding": "gzip"},
+            # Transport retries cover connection failures (nothing was sent);
+            # HTTP-level throttling is handled by _send_with_retry
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=3,
+                limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+            ),
+        )
+    return _graph_client
+
+
+def _auth_headers(user_token: str) -> tuple[tuple[str, str], ...]:
+    """Per-request Graph headers for a user; the shared client supplies the rest."""
+    return (("Authorization", f"Bearer {user_token}"),)
+
+
+def _json_body_headers(user_token: str) -> tuple[tuple[str, str], ...]:
+    """Per-request headers for a user's requests with an orjson-encoded body."""
+    return _auth_headers(user_token) + (("Content-Type", "application/json"),)
+
+
+def _mailbox_key(user_token: str) -> str:
+    """Stable key for the mailbox a token grants access to.
+
+    Graph access tokens issued for work accounts are JWTs naming the user's
+    tenant and object ID, which stay the same across token refreshes. Tokens
+    that don't decode (e.g. personal accounts' opaque tokens) fall back to a
+    hash, so the raw token is never kept as a key either way.
+    """
+    try:
+        claims_segment = user_token.split(".")[1]
+        claims = orjson.loads(base64.urlsafe_b64decode(claims_segment + "=" * (-len(claims_segment) % 4)))
+        if claims.get("oid") and claims.get("tid"):
+            return f"{claims['tid']}:{claims['oid']}"
+    except (IndexError, ValueError, AttributeError):
+        pass
+    return hashlib.sha256(user_token.encode("utf-8")).hexdigest()
+
+
+def _mailbox_semaphore(user_token: str) -> asyncio.Semaphore:
+    """Per-mailbox limit on concurrent coalesced batches, shared across token refreshes."""
+    key = _mailbox_key(user_token)
+    semaphore = _mailbox_semaphores.get(key)
+    if semaphore is None:
+        semaphore = _mailbox_semaphores[key] = asyncio.Semaphore(_MAILBOX_CONCURRENCY)
+    return semaphore
+
+
+async def close_graph_client() -> None:
+    """Close the shared Microsoft Graph HTTP client (called on application shutdown)."""
+    global _graph_client
+    if _graph_client is not None:
+        await _graph_client.aclose()
+        _graph_client = None
+
+
+def _retry_delay(retry_after: str | None, attempt: int) -> float:
+    """Seconds to wait before retrying a throttled or unavailable (sub-)response.
+
+    Takes the response's Retry-After header value, if any.
+    """
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        # Missing or HTTP-date Retry-After: exponential backoff with jitter
+        delay = 2 ** attempt + random.random()
+    return min(delay, _MAX_RETRY_DELAY_SECONDS)
+
+
+async def _send_with_retry(
+    send: Callable[[], Awaitable[httpx.Response]],
+    retry_statuses: frozenset[int] = _RETRYABLE_STATUSES,
+) -> httpx.Response:
+    """Send a Graph request, retrying throttled or unavailable responses.
+
+    The last response is returned as-is once attempts run out, so callers keep
+    their own status handling.
+    """
+    for attempt in range(_MAX_RETRY_ATTEMPTS):
+        response = await send()
+        if response.status_code not in retry_statuses or attempt == _MAX_RETRY_ATTEMPTS - 1:
+            return response
+
+        delay = _retry_delay(response.headers.get("Retry-After"), attempt)
+        logger.warning(
+            "Microsoft Graph API request throttled or unavailable, retrying",
+            extra={"status_code": response.status_code, "retry_after": delay, "attempt": attempt + 1}
+        )
+        await asyncio.sleep(delay)
+
+    return response
+
+
+def _parse_json_body(response: httpx.Response) -> dict[str, Any]:
+    """Decode a Graph response body with orjson.
+
+    Empty bodies decode to an empty dict. Error responses whose body isn't JSON
+    (e.g. gateway HTML pages) also yield an empty dict so the status-specific
+    handling still runs; undecodable success bodies propagate the error.
+    """
+    body = response.content
+    if not body:
+        return {}
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        if response.status_code >= 400:
+            return {}
+        raise
+
 
 class OutlookServiceError(Exception):
     """Base exception for Outlook service errors."""
@@ -48,11 +225,104 @@ class InvalidMessageError(OutlookServiceError):
         )
 
 
+class _GraphCall(NamedTuple):
+    """Describes a failed Graph call for _raise_for_graph."""
+    span: Span
+    action: str  # Used in log lines, e.g. "message fetch"
+    failure_message: str  # Prefix for OutlookServiceError messages
+    error_code: str
+    not_found: Callable[[], OutlookServiceError]
+    log_extra: dict[str, Any]
+    invalid_request_message: str = "Invalid request"
+
+
+def _graph_error_message(response: httpx.Response, default: str) -> str:
+    """Extract Graph's error.message from an error response body."""
+    return _parse_json_body(response).get("error", {}).get("message", default)
+
+
+def _raise_unauthorized(response: httpx.Response, call: _GraphCall) -> NoReturn:
+    logger.warning("Microsoft Graph API returned 401 for %s", call.action, extra=call.log_extra)
+    call.span.set_status(Status(StatusCode.ERROR, "Unauthorized"))
+    raise HTTPException(
+        status_code=401,
+        detail="Outlook authorization expired. Please reconnect your Outlook account."
+    )
+
+
+def _raise_forbidden(response: httpx.Response, call: _GraphCall) -> NoReturn:
+    error_message = _graph_error_message(response, "")
+    logger.warning(
+        "Microsoft Graph API returned 403 for %s", call.action,
+        extra={**call.log_extra, "error_message": error_message}
+    )
+    call.span.set_status(Status(StatusCode.ERROR, "Forbidden"))
+    raise HTTPException(
+        status_code=403,
+        detail=f"Outlook access denied: {error_message or 'Permission denied'}"
+    )
+
+
+def _raise_not_found(response: httpx.Response, call: _GraphCall) -> NoReturn:
+    error = call.not_found()
+    logger.warning(error.message, extra=call.log_extra)
+    call.span.set_status(Status(StatusCode.ERROR, "Not found"))
+    raise error
+
+
+def _raise_bad_request(response: httpx.Response, call: _GraphCall) -> NoReturn:
+    error_message = _graph_error_message(response, "Invalid request")
+    logger.error(
+        "Invalid %s request", call.action,
+        extra={**call.log_extra, "error": error_message}
+    )
+    call.span.set_status(Status(StatusCode.ERROR, "Invalid request"))
+    raise InvalidMessageError(f"{call.invalid_request_message}: {error_message}")
+
+
+def _raise_rate_limited(response: httpx.Response, call: _GraphCall) -> NoReturn:
+    logger.warning("Microsoft Graph API rate limit exceeded for %s", call.action, extra=call.log_extra)
+    call.span.set_status(Status(StatusCode.ERROR, "Rate limited"))
+    raise HTTPException(
+        status_code=429,
+        detail="Outlook API rate limit exceeded. Please try again later."
+    )
+
+
+def _raise_graph_error(response: httpx.Response, call: _GraphCall) -> NoReturn:
+    error_message = _graph_error_message(response, "Unknown error")
+    logger.error(
+        "Microsoft Graph API error on %s", call.action,
+        extra={**call.log_extra, "status_code": response.status_code, "error": error_message}
+    )
+    call.span.set_status(Status(StatusCode.ERROR, f"HTTP {response.status_code}"))
+    raise OutlookServiceError(
+        message=f"{call.failure_message}: {error_message}",
+        status_code=response.status_code,
+        error_code=call.error_code
+    )
+
+
+_GRAPH_ERROR_HANDLERS: dict[int, Callable[[httpx.Response, _GraphCall], NoReturn]] = {
+    400: _raise_bad_request,
+    401: _raise_unauthorized,
+    403: _raise_forbidden,
+    404: _raise_not_found,
+    429: _raise_rate_limited,
+}
+
+
+def _raise_for_graph(response: httpx.Response, call: _GraphCall) -> NoReturn:
+    """Raise the service error for a Graph error response (status >= 400)."""
+    _GRAPH_ERROR_HANDLERS.get(response.status_code, _raise_graph_error)(response, call)
+
+
 async def list_messages(
     user_token: str,
     folder: str = "inbox",
     top: int = 50,
-    skip: int = 0
+    skip: int = 0,
+    select: tuple[str, ...] = LIST_MESSAGES_SELECT
 ) -> dict[str, Any]:
     """List Outlook messages from a specific folder.
 
@@ -61,6 +331,8 @@ async def list_messages(
         folder: Folder to list messages from (default: "inbox")
         top: Maximum number of messages to return (default: 50, max: 100)
         skip: Number of messages to skip for pagination (default: 0)
+        select: Message fields to return; pass only what the caller reads to
+            keep responses small (default: LIST_MESSAGES_SELECT)
 
     Returns:
         dict containing messages list and metadata
@@ -98,14 +370,14 @@ async def list_messages(
         ))
 
         # Microsoft Graph API endpoint for listing messages
-        graph_api_url = f"https://graph.microsoft.com/v1.0/me/mailFolders/{folder}/messages"
+        graph_api_url = _LIST_MESSAGES_URL.format(folder=folder)
 
         # Add query parameters
         params = {
             "$top": min(top, 100),  # Graph API max is 100
             "$skip": skip,
             "$orderby": "receivedDateTime DESC",
-            "$select": "id,conversationId,subject,from,bodyPreview,receivedDateTime,isRead,hasAttachments"
+            "$select": ",".join(select)
         }
 
         logger.info(
@@ -114,85 +386,43 @@ async def list_messages(
         )
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    graph_api_url,
-                    headers={
-                        "Authorization": f"Bearer {user_token}",
-                        "Accept": "application/json",
-                        "Content-Type": "application/json"
-                    },
-                    params=params,
-                    timeout=15.0
-                )
-
-                # Handle specific error cases
-                if response.status_code == 401:
-                    logger.warning("Microsoft Graph API returned 401 for list messages")
-                    span.set_status(Status(StatusCode.ERROR, "Unauthorized"))
-                    raise HTTPException(
-                        status_code=401,
-                        detail="Outlook authorization expired. Please reconnect your Outlook account."
-                    )
-
-                elif response.status_code == 403:
-                    error_data = response.json() if response.content else {}
-                    error_message = error_data.get("error", {}).get("message", "")
-                    logger.warning(
-                        "Microsoft Graph API returned 403 for list messages",
-                        extra={"error_message": error_message}
-                    )
-                    span.set_status(Status(StatusCode.ERROR, "Forbidden"))
-                    raise HTTPException(
-                        status_code=403,
-                        detail=f"Outlook access denied: {error_message or 'Permission denied'}"
-                    )
-
-                elif response.status_code == 404:
-                    logger.warning(
-                        "Folder not found",
-                        extra={"folder": folder}
-                    )
-                    span.set_status(Status(StatusCode.ERROR, "Folder not found"))
-                    raise OutlookServiceError(
+            client = get_graph_client()
+            response = await _send_with_retry(lambda: client.get(
+                graph_api_url,
+                headers=_auth_headers(user_token),
+                params=params,
+                timeout=15.0
+            ))
+
+            if response.status_code >= 400:
+                _raise_for_graph(response, _GraphCall(
+                    span=span,
+                    action="list messages",
+                    failure_message="Failed to list messages",
+                    error_code="list_messages_error",
+                    not_found=lambda: OutlookServiceError(
                         message=f"Folder '{folder}' not found",
                         status_code=404,
                         error_code="folder_not_found"
-                    )
+                    ),
+                    log_extra={"folder": folder},
+                ))
 
-                elif response.status_code >= 400:
-                    error_data = response.json() if response.content else {}
-                    error_message = error_data.get("error", {}).get("message", "Unknown error")
-                    logger.error(
-                        "Microsoft Graph API error listing messages",
-                        extra={
-                            "folder": folder,
-                            "status_code": response.status_code,
-                            "error": error_message
-                        }
-                    )
-                    span.set_status(Status(StatusCode.ERROR, f"HTTP {response.status_code}"))
-                    raise OutlookServiceError(
-                        message=f"Failed to list messages: {error_message}",
-                        status_code=response.status_code,
-                        error_code="list_messages_error"
-                    )
+            response.raise_for_status()
+            messages_data = _parse_json_body(response)
 
-                response.raise_for_status()
-                messages_data = response.json()
-
-                logger.info(
-                    "Outlook messages listed successfully",
-                    extra={
-                        "folder": folder,
-                        "message_count": len(messages_data.get("value", []))
-                    }
-                )
+            logger.info(
+                "Outlook messages listed successfully",
+                extra={
+                    "folder": folder,
+                    "message_count": len(messages_data.get("value", []))
+                }
+            )
 
-                span.set_status(Status(StatusCode.OK))
-                span.set_attribute("message_count", len(messages_data.get("value", [])))
+            span.set_status(Status(StatusCode.OK))
+            span.set_attribute("message_count", len(messages_data.get("value", [])))
 
-                return messages_data
+            return messages_data
 
         except httpx.TimeoutException:
             logger.error("Microsoft Graph API timeout listing messages", extra={"folder": folder})
@@ -232,6 +462,11 @@ async def list_messages(
 async def get_message(user_token: str, message_id: str) -> dict[str, Any]:
     """Get a specific Outlook message by ID.
 
+    Concurrent calls for the same user are coalesced: IDs requested within a
+    few milliseconds of each other are fetched together in one `$batch`
+    request, and callers asking for a message that is already in flight share
+    its result.
+
     Args:
         user_token: Valid Microsoft access token
         message_id: Microsoft Graph message ID
@@ -264,13 +499,97 @@ async def get_message(user_token: str, message_id: str) -> dict[str, Any]:
             "internetMessageId": "<abc@example.com>"
         }
     """
+    loop = asyncio.get_running_loop()
+    mailbox = _mailbox_key(user_token)
+    pending = _pending.setdefault(mailbox, {})
+
+    future = pending.get(message_id)
+    if future is None:
+        future = loop.create_future()
+        pending[message_id] = future
+        queued = _queued.setdefault(mailbox, [])
+        if not queued:
+            # The flush fetches with the token of the call that scheduled it,
+            # including IDs queued meanwhile under a refreshed token
+            loop.call_later(_COALESCE_WINDOW_SECONDS, _start_flush, mailbox, user_token)
+        queued.append(message_id)
+
+    # Shield so one caller's cancellation doesn't cancel the shared fetch
+    return await asyncio.shield(future)
+
+
+def _start_flush(mailbox: str, user_token: str) -> None:
+    """Launch a flush of the IDs queued for a mailbox."""
+    task = asyncio.get_running_loop().create_task(_flush(mailbox, user_token))
+    _flush_tasks.add(task)
+    task.add_done_callback(_flush_tasks.discard)
+
+
+async def _flush(mailbox: str, user_token: str) -> None:
+    """Fetch every queued message ID for a mailbox, in batches of up to four."""
+    message_ids = _queued.pop(mailbox, [])
+    await asyncio.gather(*(
+        _flush_batch(mailbox, user_token, message_ids[start:start + _COALESCE_MAX_BATCH])
+        for start in range(0, len(message_ids), _COALESCE_MAX_BATCH)
+    ))
+
+
+async def _flush_batch(mailbox: str, user_token: str, message_ids: list[str]) -> None:
+    """Fetch one coalesced batch and resolve its callers' futures."""
+    futures = _pending.get(mailbox, {})
+    try:
+        async with _mailbox_semaphore(user_token):
+            if len(message_ids) == 1:
+                await _settle(futures[message_ids[0]], _fetch_message(user_token, message_ids[0]))
+                return
+
+            try:
+                messages = await get_messages_bulk(user_token, message_ids, batch_size=len(message_ids))
+            except OutlookServiceError:
+                # A bad ID fails the whole batch; fetch individually so each
+                # caller gets its own result or error
+                await asyncio.gather(*(
+                    _settle(futures[mid], _fetch_message(user_token, mid))
+                    for mid in message_ids
+                ))
+                return
+            except Exception as e:
+                for mid in message_ids:
+                    if not futures[mid].done():
+                        futures[mid].set_exception(e)
+                return
+
+            for mid, message in zip(message_ids, messages):
+                if not futures[mid].done():
+                    futures[mid].set_result(message)
+    finally:
+        for mid in message_ids:
+            futures.pop(mid, None)
+        if not futures and _pending.get(mailbox) is futures:
+            del _pending[mailbox]
+
+
+async def _settle(future: asyncio.Future, fetch: Any) -> None:
+    """Await a fetch and store its result or exception on a future."""
+    try:
+        result = await fetch
+    except Exception as e:
+        if not future.done():
+            future.set_exception(e)
+    else:
+        if not future.done():
+            future.set_result(result)
+
+
+async def _fetch_message(user_token: str, message_id: str) -> dict[str, Any]:
+    """Fetch a single Outlook message with a plain GET."""
     with tracer.start_as_current_span("outlook.get_message") as span:
         span.set_attributes(safe_span_attributes(
             message_id=message_id,
             operation="get_message"
         ))
 
-        graph_api_url = f"https://graph.microsoft.com/v1.0/me/messages/{message_id}"
+        graph_api_url = _MESSAGE_URL.format(message_id=message_id)
 
         logger.info(
             "Fetching Outlook message",
@@ -278,81 +597,211 @@ async def get_message(user_token: str, message_id: str) -> dict[str, Any]:
         )
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    graph_api_url,
-                    headers={
-                        "Authorization": f"Bearer {user_token}",
-                        "Accept": "application/json"
-                    },
-                    timeout=15.0
-                )
+            client = get_graph_client()
+            response = await _send_with_retry(lambda: client.get(
+                graph_api_url,
+                headers=_auth_headers(user_token),
+                timeout=15.0
+            ))
+
+            if response.status_code >= 400:
+                _raise_for_graph(response, _GraphCall(
+                    span=span,
+                    action="message fetch",
+                    failure_message="Failed to fetch message",
+                    error_code="message_fetch_error",
+                    not_found=lambda: MessageNotFoundError(f"Message {message_id} not found"),
+                    log_extra={"message_id": message_id},
+                ))
+
+            response.raise_for_status()
+            message_data = _parse_json_body(response)
+
+            logger.info(
+                "Outlook message fetched successfully",
+                extra={"message_id": message_id}
+            )
 
-                # Handle specific error cases
-                if response.status_code == 404:
-                    logger.warning(
-                        "Outlook message not found",
-                        extra={"message_id": message_id}
-                    )
-                    span.set_status(Status(StatusCode.ERROR, "Message not found"))
-                    raise MessageNotFoundError(f"Message {message_id} not found")
+            span.set_status(Status(StatusCode.OK))
 
-                elif response.status_code == 401:
-                    logger.warning(
-                        "Microsoft Graph API returned 401 for message fetch",
-                        extra={"message_id": message_id}
-                    )
-                    span.set_status(Status(StatusCode.ERROR, "Unauthorized"))
-                    raise HTTPException(
-                        status_code=401,
-                        detail="Outlook authorization expired. Please reconnect your Outlook account."
-                    )
+            return message_data
 
-                elif response.status_code == 403:
-                    error_data = response.json() if response.content else {}
-                    error_message = error_data.get("error", {}).get("message", "")
-                    logger.warning(
-                        "Microsoft Graph API returned 403 for message fetch",
-                        extra={"message_id": message_id, "error_message": error_message}
-                    )
-                    span.set_status(Status(StatusCode.ERROR, "Forbidden"))
-                    raise HTTPException(
-                        status_code=403,
-                        detail=f"Outlook access denied: {error_message or 'Permission denied'}"
-                    )
+        except httpx.TimeoutException:
+            logger.error("Microsoft Graph API timeout fetching message", extra={"message_id": message_id})
+            span.set_status(Status(StatusCode.ERROR, "Timeout"))
+            raise HTTPException(
+                status_code=504,
+                detail="Outlook API request timeout. Please try again."
+            )
 
-                elif response.status_code >= 400:
-                    error_data = response.json() if response.content else {}
-                    error_message = error_data.get("error", {}).get("message", "Unknown error")
-                    logger.error(
-                        "Microsoft Graph API error fetching message",
-                        extra={
-                            "message_id": message_id,
-                            "status_code": response.status_code,
-                            "error": error_message
-                        }
-                    )
-                    span.set_status(Status(StatusCode.ERROR, f"HTTP {response.status_code}"))
-                    raise OutlookServiceError(
-                        message=f"Failed to fetch message: {error_message}",
-                        status_code=response.status_code,
-                        error_code="message_fetch_error"
+        except httpx.RequestError as e:
+            logger.error(
+                "Microsoft Graph API network error fetching message",
+                extra={"message_id": message_id, "error": str(e)}
+            )
+            span.set_status(Status(StatusCode.ERROR, "Network error"))
+            raise HTTPException(
+                status_code=503,
+                detail="Unable to connect to Outlook API. Please try again later."
+            )
+
+        except (MessageNotFoundError, OutlookServiceError, HTTPException):
+            # Re-raise our custom exceptions (span status already set)
+            raise
+
+        except Exception as e:
+            logger.exception(
+                "Unexpected error fetching Outlook message",
+                extra={"message_id": message_id, "error_type": type(e).__name__}
+            )
+            span.set_status(Status(StatusCode.ERROR, f"Unexpected: {type(e).__name__}"))
+            raise HTTPException(
+                status_code=500,
+                detail="An unexpected error occurred. Please try again or contact support."
+            )
+
+
+async def get_messages_bulk(
+    user_token: str,
+    message_ids: list[str],
+    batch_size: int = 4
+) -> list[dict[str, Any]]:
+    """Get several Outlook messages using Graph JSON batching.
+
+    Message IDs are packed into `$batch` requests of at most `batch_size`
+    sub-requests, turning N message fetches into ceil(N / batch_size) round
+    trips. Batches are sent one at a time to stay within Outlook's per-mailbox
+    concurrency limit of 4; throttled sub-requests are retried after their
+    Retry-After delay.
+
+    Args:
+        user_token: Valid Microsoft access token
+        message_ids: Microsoft Graph message IDs to fetch
+        batch_size: Sub-requests per batch (default: 4, Graph max: 20)
+
+    Returns:
+        list of message data dicts, in the same order as message_ids
+
+    Raises:
+        MessageNotFoundError: If any message doesn't exist
+        OutlookServiceError: For other API errors
+        HTTPException: For auth and network errors
+    """
+    with tracer.start_as_current_span("outlook.get_messages_bulk") as span:
+        span.set_attributes(safe_span_attributes(
+            message_count=len(message_ids),
+            batch_size=batch_size,
+            operation="get_messages_bulk"
+        ))
+
+        logger.info(
+            "Fetching Outlook messages in bulk",
+            extra={"message_count": len(message_ids), "batch_size": batch_size}
+        )
+
+        results: dict[str, dict[str, Any]] = {}
+
+        try:
+            client = get_graph_client()
+            for start in range(0, len(message_ids), batch_size):
+                pending = list(dict.fromkeys(message_ids[start:start + batch_size]))
+                for attempt in range(_BULK_MAX_ATTEMPTS):
+                    batch_payload = {
+                        "requests": [
+                            {"id": str(index), "method": "GET", "url": _MESSAGE_URL.format(message_id=mid)}
+                            for index, mid in enumerate(pending)
+                        ]
+                    }
+                    response = await client.post(
+                        _BATCH_URL,
+                        headers=_json_body_headers(user_token),
+                        content=orjson.dumps(batch_payload),
+                        timeout=15.0
                     )
 
-                response.raise_for_status()
-                message_data = response.json()
+                    if response.status_code == 401:
+                        logger.warning("Microsoft Graph API returned 401 for batch message fetch")
+                        span.set_status(Status(StatusCode.ERROR, "Unauthorized"))
+                        raise HTTPException(
+                            status_code=401,
+                            detail="Outlook authorization expired. Please reconnect your Outlook account."
+                        )
+
+                    elif response.status_code >= 400:
+                        error_data = _parse_json_body(response)
+                        error_message = error_data.get("error", {}).get("message", "Unknown error")
+                        logger.error(
+                            "Microsoft Graph API error on batch message fetch",
+                            extra={"status_code": response.status_code, "error": error_message}
+                        )
+                        span.set_status(Status(StatusCode.ERROR, f"HTTP {response.status_code}"))
+                        raise OutlookServiceError(
+                            message=f"Failed to fetch messages: {error_message}",
+                            status_code=response.status_code,
+                            error_code="message_fetch_error"
+                        )
+
+                    throttled: list[str] = []
+                    retry_after = 0.0
+                    for item in _parse_json_body(response).get("responses", []):
+                        mid = pending[int(item["id"])]
+                        status = item.get("status", 500)
+                        body = item.get("body") or {}
+
+                        if status < 400:
+                            results[mid] = body
+                        elif status == 429:
+                            throttled.append(mid)
+                            headers = item.get("headers") or {}
+                            retry_after = max(retry_after, _retry_delay(headers.get("Retry-After"), attempt))
+                        elif status == 404:
+                            logger.warning(
+                                "Outlook message not found in batch",
+                                extra={"message_id": mid}
+                            )
+                            span.set_status(Status(StatusCode.ERROR, "Message not found"))
+                            raise MessageNotFoundError(f"Message {mid} not found")
+                        elif status == 401:
+                            span.set_status(Status(StatusCode.ERROR, "Unauthorized"))
+                            raise HTTPException(
+                                status_code=401,
+                                detail="Outlook authorization expired. Please reconnect your Outlook account."
+                            )
+                        else:
+                            error_message = body.get("error", {}).get("message", "Unknown error")
+                            logger.error(
+                                "Microsoft Graph API error fetching message in batch",
+                                extra={"message_id": mid, "status_code": status, "error": error_message}
+                            )
+                            span.set_status(Status(StatusCode.ERROR, f"HTTP {status}"))
+                            raise OutlookServiceError(
+                                message=f"Failed to fetch message: {error_message}",
+                                status_code=status,
+                                error_code="message_fetch_error"
+                            )
+
+                    if not throttled:
+                        break
+                    if attempt == _BULK_MAX_ATTEMPTS - 1:
+                        span.set_status(Status(StatusCode.ERROR, "Rate limited"))
+                        raise HTTPException(
+                            status_code=429,
+                            detail="Outlook API rate limit exceeded. Please try again later."
+                        )
 
-                logger.info(
-                    "Outlook message fetched successfully",
-                    extra={"message_id": message_id}
-                )
+                    logger.warning(
+                        "Batch sub-requests throttled, retrying",
+                        extra={"throttled_count": len(throttled), "retry_after": retry_after}
+                    )
+                    await asyncio.sleep(retry_after)
+                    pending = throttled
 
-                span.set_status(Status(StatusCode.OK))
+            span.set_status(Status(StatusCode.OK))
 
-                return message_data
+            return [results[mid] for mid in message_ids]
 
         except httpx.TimeoutException:
-            logger.error("Microsoft Graph API timeout fetching message", extra={"message_id": message_id})
+            logger.error("Microsoft Graph API timeout fetching messages in bulk")
             span.set_status(Status(StatusCode.ERROR, "Timeout"))
             raise HTTPException(
                 status_code=504,
@@ -361,8 +810,8 @@ async def get_message(user_token: str, message_id: str) -> dict[str, Any]:
 
         except httpx.RequestError as e:
             logger.error(
-                "Microsoft Graph API network error fetching message",
-                extra={"message_id": message_id, "error": str(e)}
+                "Microsoft Graph API network error fetching messages in bulk",
+                extra={"error": str(e)}
             )
             span.set_status(Status(StatusCode.ERROR, "Network error"))
             raise HTTPException(
@@ -376,8 +825,8 @@ async def get_message(user_token: str, message_id: str) -> dict[str, Any]:
 
         except Exception as e:
             logger.exception(
-                "Unexpected error fetching Outlook message",
-                extra={"message_id": message_id, "error_type": type(e).__name__}
+                "Unexpected error fetching Outlook messages in bulk",
+                extra={"error_type": type(e).__name__}
             )
             span.set_status(Status(StatusCode.ERROR, f"Unexpected: {type(e).__name__}"))
             raise HTTPException(
@@ -444,106 +893,67 @@ async def create_reply_draft(
         try:
             # Step 1: Create a reply draft using the createReply action
             # This automatically sets up threading, subject, and recipient
-            create_reply_url = f"https://graph.microsoft.com/v1.0/me/messages/{message_id}/createReply"
-
-            async with httpx.AsyncClient() as client:
-                # Create the draft with optional comment
-                payload = {}
-                if comment:
-                    payload["comment"] = comment
-
-                create_response = await client.post(
+            create_reply_url = _CREATE_REPLY_URL.format(message_id=message_id)
+
+            client = get_graph_client()
+            # Set the HTML body on the draft in the same request when possible.
+            # Graph rejects a comment combined with message.body, so a comment
+            # still needs the follow-up PATCH below.
+            html_content = {"contentType": "html", "content": html_body}
+            if comment:
+                payload = {"comment": comment}
+            else:
+                payload = {"message": {"body": html_content}}
+
+            # createReply isn't idempotent: only retry 429, which Graph returns
+            # before doing any work, never a 503/504 that may have created a draft
+            create_response = await _send_with_retry(
+                lambda: client.post(
                     create_reply_url,
-                    headers={
-                        "Authorization": f"Bearer {user_token}",
-                        "Content-Type": "application/json",
-                        "Accept": "application/json"
-                    },
-                    json=payload,
+                    headers=_json_body_headers(user_token),
+                    content=orjson.dumps(payload),
                     timeout=15.0
-                )
-
-                if create_response.status_code == 404:
-                    logger.warning(
-                        "Message not found for reply",
-                        extra={"message_id": message_id}
-                    )
-                    span.set_status(Status(StatusCode.ERROR, "Message not found"))
-                    raise MessageNotFoundError(f"Message {message_id} not found")
-
-                elif create_response.status_code == 400:
-                    error_data = create_response.json() if create_response.content else {}
-                    error_message = error_data.get("error", {}).get("message", "Invalid request")
-                    logger.error(
-                        "Invalid draft creation request",
-                        extra={"message_id": message_id, "error": error_message}
-                    )
-                    span.set_status(Status(StatusCode.ERROR, "Invalid request"))
-                    raise InvalidMessageError(f"Invalid draft request: {error_message}")
-
-                elif create_response.status_code == 429:
-                    logger.warning(
-                        "Microsoft Graph API rate limit exceeded for draft creation",
-                        extra={"message_id": message_id}
-                    )
-                    span.set_status(Status(StatusCode.ERROR, "Rate limited"))
-                    raise HTTPException(
-                        status_code=429,
-                        detail="Outlook API rate limit exceeded. Please try again later."
-                    )
-
-                elif create_response.status_code >= 400:
-                    error_data = create_response.json() if create_response.content else {}
-                    error_message = error_data.get("error", {}).get("message", "Unknown error")
-                    logger.error(
-                        "Failed to create reply draft",
-                        extra={
-                            "message_id": message_id,
-                            "status_code": create_response.status_code,
-                            "error": error_message
-                        }
-                    )
-                    span.set_status(Status(StatusCode.ERROR, f"HTTP {create_response.status_code}"))
-                    raise OutlookServiceError(
-                        message=f"Failed to create draft: {error_message}",
-                        status_code=create_response.status_code,
-                        error_code="draft_creation_error"
-                    )
+                ),
+                retry_statuses=frozenset({429}),
+            )
 
-                create_response.raise_for_status()
-                draft_data = create_response.json()
-                draft_id = draft_data.get("id")
+            if create_response.status_code >= 400:
+                _raise_for_graph(create_response, _GraphCall(
+                    span=span,
+                    action="draft creation",
+                    failure_message="Failed to create draft",
+                    error_code="draft_creation_error",
+                    not_found=lambda: MessageNotFoundError(f"Message {message_id} not found"),
+                    log_extra={"message_id": message_id},
+                    invalid_request_message="Invalid draft request",
+                ))
+
+            create_response.raise_for_status()
+            draft_data = _parse_json_body(create_response)
+            draft_id = draft_data.get("id")
+
+            if not draft_id:
+                logger.error(
+                    "Draft created but no ID returned",
+                    extra={"message_id": message_id}
+                )
+                span.set_status(Status(StatusCode.ERROR, "Missing draft ID"))
+                raise InvalidMessageError("Draft created but no ID returned from API")
 
-                if not draft_id:
-                    logger.error(
-                        "Draft created but no ID returned",
-                        extra={"message_id": message_id}
-                    )
-                    span.set_status(Status(StatusCode.ERROR, "Missing draft ID"))
-                    raise InvalidMessageError("Draft created but no ID returned from API")
-
-                # Step 2: Update the draft body with our HTML content
-                update_url = f"https://graph.microsoft.com/v1.0/me/messages/{draft_id}"
-                update_payload = {
-                    "body": {
-                        "contentType": "html",
-                        "content": html_body
-                    }
-                }
+            # Step 2: Update the draft body with our HTML content (comment replies only)
+            if comment:
+                update_url = _MESSAGE_URL.format(message_id=draft_id)
+                update_payload = {"body": html_content}
 
-                update_response = await client.patch(
+                update_response = await _send_with_retry(lambda: client.patch(
                     update_url,
-                    headers={
-                        "Authorization": f"Bearer {user_token}",
-                        "Content-Type": "application/json",
-                        "Accept": "application/json"
-                    },
-                    json=update_payload,
+                    headers=_json_body_headers(user_token),
+                    content=orjson.dumps(update_payload),
                     timeout=15.0
-                )
+                ))
 
                 if update_response.status_code >= 400:
-                    error_data = update_response.json() if update_response.content else {}
+                    error_data = _parse_json_body(update_response)
                     error_message = error_data.get("error", {}).get("message", "Unknown error")
                     logger.error(
                         "Failed to update draft body",
@@ -558,20 +968,20 @@ async def create_reply_draft(
                     logger.warning("Draft created but body update failed, returning draft anyway")
 
                 update_response.raise_for_status()
-                updated_draft = update_response.json()
+                draft_data = _parse_json_body(update_response)
 
-                logger.info(
-                    "Outlook reply draft created successfully",
-                    extra={
-                        "message_id": message_id,
-                        "draft_id": draft_id
-                    }
-                )
+            logger.info(
+                "Outlook reply draft created successfully",
+                extra={
+                    "message_id": message_id,
+                    "draft_id": draft_id
+                }
+            )
 
-                span.set_status(Status(StatusCode.OK))
-                span.set_attribute("draft_id", draft_id)
+            span.set_status(Status(StatusCode.OK))
+            span.set_attribute("draft_id", draft_id)
 
-                return updated_draft
+            return draft_data
 
         except httpx.TimeoutException:
             logger.error(
@@ -1,20 +1,101 @@
 """Text chunking with deduplication."""
-import hashlib
+import functools
+from collections.abc import Iterable, Iterator, Sequence
 from typing import NamedTuple
+import numpy as np
 import tiktoken
+import xxhash
+
+
+# UTF-8 continuation bytes (0b10xxxxxx); every other byte starts a character
+_UTF8_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+# Content-defined chunking: a chunk may end after a token whose gear hash
+# over the preceding _CDC_WINDOW tokens has its top bits all zero, so
+# boundaries follow the content rather than offsets from the start
+_CDC_WINDOW = 16
+_SPLITMIX_INCREMENT = np.uint64(0x9E3779B97F4A7C15)
+_SPLITMIX_MUL1 = np.uint64(0xBF58476D1CE4E5B9)
+_SPLITMIX_MUL2 = np.uint64(0x94D049BB133111EB)
 
 
 class Chunk(NamedTuple):
-    """A text chunk with metadata."""
+    """A text chunk with metadata.
+
+    start_idx/end_idx are character offsets into the source text, so
+    text[start_idx:end_idx] == content.
+    """
     content: str
-    content_hash: str
+    content_hash: bytes
     start_idx: int
     end_idx: int
 
 
-def compute_content_hash(text: str) -> str:
-    """Compute SHA256 hash of text content for deduplication."""
-    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+def compute_content_hash(data: str | bytes | memoryview) -> bytes:
+    """Compute a 128-bit XXH3 digest of text content for deduplication.
+
+    The hash is only a dedup key and point ID seed, so a fast
+    non-cryptographic hash is enough. Accepts the text itself or its UTF-8
+    bytes, so callers that already hold encoded bytes skip the encode. Raw
+    digests keep the dedup set small; call .hex() where the hash leaves the
+    process (Qdrant payloads, point IDs).
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return xxhash.xxh3_128_digest(data)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_encoding(encoding_name: str) -> tiktoken.Encoding | None:
+    """Load a tiktoken encoding once per process; None if it can't be loaded."""
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception:
+        return None
+
+
+def _gear_hashes(tokens: Sequence[int] | np.ndarray) -> np.ndarray:
+    """Rolling gear hash ending at each token (window of _CDC_WINDOW tokens)."""
+    # SplitMix64 finalizer: a well-mixed 64-bit value per token ID
+    gear = np.asarray(tokens, dtype=np.uint64) + _SPLITMIX_INCREMENT
+    gear = (gear ^ (gear >> np.uint64(30))) * _SPLITMIX_MUL1
+    gear = (gear ^ (gear >> np.uint64(27))) * _SPLITMIX_MUL2
+    gear ^= gear >> np.uint64(31)
+
+    hashes = gear.copy()
+    for shift in range(1, _CDC_WINDOW):
+        hashes[shift:] += gear[:-shift] << np.uint64(shift)
+    return hashes
+
+
+def _content_defined_boundaries(tokens: Sequence[int] | np.ndarray, chunk_size: int) -> list[int]:
+    """
+    Token indices where chunks end, chosen from the content.
+
+    Chunks span between chunk_size // 2 and chunk_size tokens (except the
+    last), ending at the first candidate boundary past the minimum, or at
+    chunk_size if there is none. Candidates fire about once per
+    chunk_size // 4 tokens. Inserting or deleting text only moves the
+    boundaries next to the edit, so the remaining chunks keep their hashes
+    and are deduplicated against earlier uploads.
+    """
+    chunk_size = max(1, chunk_size)
+    min_size = max(1, chunk_size // 2)
+    mask_bits = max(1, (chunk_size // 4).bit_length() - 1)
+    threshold = np.uint64(1 << (64 - mask_bits))
+    candidates = np.flatnonzero(_gear_hashes(tokens) < threshold) + 1
+
+    boundaries = []
+    start = 0
+    while len(tokens) - start > chunk_size:
+        i = np.searchsorted(candidates, start + min_size)
+        if i < len(candidates) and candidates[i] <= start + chunk_size:
+            start = int(candidates[i])
+        else:
+            start += chunk_size
+        boundaries.append(start)
+    boundaries.append(len(tokens))
+    return boundaries
 
 
 def chunk_text(
@@ -24,92 +105,109 @@ def chunk_text(
     encoding_name: str = "cl100k_base",  # OpenAI's tiktoken encoding
 ) -> list[Chunk]:
     """
-    Chunk text into overlapping segments based on token count.
+    Chunk text into overlapping segments at content-defined token boundaries.
 
     Args:
         text: Input text to chunk
-        chunk_size: Target tokens per chunk (default: 800)
-        chunk_overlap: Overlap tokens between chunks (default: 200)
+        chunk_size: Maximum tokens per chunk (default: 800)
+        chunk_overlap: Tokens repeated from the previous chunk (default: 200)
         encoding_name: Tiktoken encoding to use
 
     Returns:
         List of Chunk objects with content and metadata
     """
-    try:
-        encoding = tiktoken.get_encoding(encoding_name)
-    except Exception:
-        # Fallback to basic character-based chunking if tiktoken fails
-        return _chunk_by_chars(text, chunk_size * 4, chunk_overlap * 4)
+    return list(iter_chunks(text, chunk_size, chunk_overlap, encoding_name))
 
-    # Encode text to tokens
-    tokens = encoding.encode(text)
 
-    chunks = []
-    start_idx = 0
+def iter_chunks(
+    text: str,
+    chunk_size: int = 800,
+    chunk_overlap: int = 200,
+    encoding_name: str = "cl100k_base",
+) -> Iterator[Chunk]:
+    """
+    Lazily chunk text into overlapping segments based on token count.
 
-    while start_idx < len(tokens):
-        # Get chunk of tokens
-        end_idx = min(start_idx + chunk_size, len(tokens))
-        chunk_tokens = tokens[start_idx:end_idx]
+    Same chunks as chunk_text, produced one at a time so large documents can
+    be embedded and upserted in batches without holding every chunk at once.
+    """
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        # Fallback to basic character-based chunking if tiktoken fails
+        yield from _iter_chunks_by_chars(text, chunk_size * 4, chunk_overlap * 4)
+        return
 
-        # Decode back to text
-        chunk_text = encoding.decode(chunk_tokens)
+    # Encode once, then map token boundaries to character offsets: a token
+    # covers the characters whose first UTF-8 byte it contains, so chunks
+    # can be sliced straight out of the text instead of decoding each one
+    tokens = encoding.encode(text)
+    char_offsets = [0]
+    for token_bytes in encoding.decode_tokens_bytes(tokens):
+        char_offsets.append(
+            char_offsets[-1] + len(token_bytes.translate(None, _UTF8_CONTINUATION_BYTES))
+        )
+
+    # ASCII text has identical character and byte offsets, so chunks can be
+    # hashed from zero-copy slices of one up-front encode
+    text_bytes = memoryview(text.encode('ascii')) if text.isascii() else None
+
+    # Boundaries budget the new tokens; with the overlap repeated from the
+    # previous chunk, no chunk exceeds chunk_size tokens
+    start_idx = 0
+    for end_idx in _content_defined_boundaries(tokens, chunk_size - chunk_overlap):
+        start_char = char_offsets[max(0, start_idx - chunk_overlap)]
+        end_char = char_offsets[end_idx]
+        chunk_text = text[start_char:end_char]
+        start_idx = end_idx
 
         # Skip empty or whitespace-only chunks
         if chunk_text.strip():
-            chunks.append(Chunk(
+            hash_input = text_bytes[start_char:end_char] if text_bytes is not None else chunk_text
+            yield Chunk(
                 content=chunk_text,
-                content_hash=compute_content_hash(chunk_text),
-                start_idx=start_idx,
-                end_idx=end_idx,
-            ))
-
-        # Move start position (with overlap)
-        start_idx += chunk_size - chunk_overlap
-
-        # Avoid infinite loop on last small chunk
-        if end_idx == len(tokens):
-            break
+                content_hash=compute_content_hash(hash_input),
+                start_idx=start_char,
+                end_idx=end_char,
+            )
 
-    return chunks
 
-
-def _chunk_by_chars(text: str, chunk_size: int, chunk_overlap: int) -> list[Chunk]:
+def _iter_chunks_by_chars(text: str, chunk_size: int, chunk_overlap: int) -> Iterator[Chunk]:
     """Fallback character-based chunking when tiktoken unavailable."""
-    chunks = []
-    start = 0
+    # Code points stand in for token IDs when choosing boundaries
+    code_points = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
 
-    while start < len(text):
-        end = min(start + chunk_size, len(text))
-        chunk_text = text[start:end]
+    start = 0
+    for end in _content_defined_boundaries(code_points, chunk_size - chunk_overlap):
+        chunk_start = max(0, start - chunk_overlap)
+        chunk_text = text[chunk_start:end]
+        start = end
 
         if chunk_text.strip():
-            chunks.append(Chunk(
+            yield Chunk(
                 content=chunk_text,
                 content_hash=compute_content_hash(chunk_text),
-                start_idx=start,
+                start_idx=chunk_start,
                 end_idx=end,
-            ))
-
-        start += chunk_size - chunk_overlap
-
-        if end == len(text):
-            break
+            )
 
-    return chunks
 
-
-def deduplicate_chunks(chunks: list[Chunk]) -> list[Chunk]:
+def deduplicate_chunks(
+    chunks: Iterable[Chunk],
+    seen_hashes: set[bytes] | None = None,
+) -> list[Chunk]:
     """
     Remove duplicate chunks based on content hash.
 
     Args:
-        chunks: List of chunks to deduplicate
+        chunks: Chunks to deduplicate
+        seen_hashes: Hashes already kept by earlier calls; updated in place so
+            a document can be deduplicated batch by batch
 
     Returns:
         Deduplicated list of chunks (first occurrence kept)
     """
-    seen_hashes = set()
+    if seen_hashes is None:
+        seen_hashes = set()
     unique_chunks = []
 
     for chunk in chunks:
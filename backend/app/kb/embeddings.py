@@ -1,13 +1,42 @@
 """Embedding generation with batching support."""
+import asyncio
+import base64
+import functools
 import logging
+import threading
 from typing import List
-from openai import OpenAI
+import numpy as np
+import tiktoken
+from cachetools import TTLCache, cached
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
 from app.core.config import settings
+from app.kb.rate_limit import get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
+# OpenAI embeddings request limits: 2048 inputs and 300k tokens per request;
+# the token budget keeps headroom for tokenizer differences
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 250_000
+
+# The SDK retries 429/5xx itself, honouring Retry-After with exponential backoff
+_OPENAI_MAX_RETRIES = 5
+
+# HTTP/2 lets concurrent embedding batches share one connection
+_OPENAI_HTTP_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+_OPENAI_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+# Search query vectors by (model, query); repeated searches (dashboard
+# refreshes, eval runs) skip the OpenAI round-trip. Entries are raw float32
+# bytes (~6 KB for 1536 dims, vs ~50 KB as a tuple of floats), so the cache
+# tops out around 50 MB. search_kb runs in the threadpool, so access is locked.
+_query_embedding_cache: TTLCache = TTLCache(maxsize=8192, ttl=3600)
+_query_embedding_lock = threading.Lock()
+
+# Initialize OpenAI clients
 _openai_client: OpenAI | None = None
+_async_openai_client: AsyncOpenAI | None = None
 
 
 def get_openai_client() -> OpenAI:
@@ -15,23 +44,107 @@ def get_openai_client() -> OpenAI:
     global _openai_client
 
     if _openai_client is None:
-        _openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        _openai_client = OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=_OPENAI_MAX_RETRIES,
+            http_client=DefaultHttpxClient(
+                http2=True,
+                limits=_OPENAI_HTTP_LIMITS,
+                timeout=_OPENAI_TIMEOUT,
+            ),
+        )
 
     return _openai_client
 
 
+def get_async_openai_client() -> AsyncOpenAI:
+    """Get or create the async OpenAI client."""
+    global _async_openai_client
+
+    if _async_openai_client is None:
+        _async_openai_client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=_OPENAI_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(
+                http2=True,
+                limits=_OPENAI_HTTP_LIMITS,
+                timeout=_OPENAI_TIMEOUT,
+            ),
+        )
+
+    return _async_openai_client
+
+
+async def close_openai_clients() -> None:
+    """Close the shared OpenAI clients (call on application shutdown)."""
+    global _openai_client, _async_openai_client
+
+    if _openai_client is not None:
+        _openai_client.close()
+        _openai_client = None
+    if _async_openai_client is not None:
+        await _async_openai_client.close()
+        _async_openai_client = None
+
+
+@functools.lru_cache(maxsize=8)
+def _get_model_encoding(model: str) -> tiktoken.Encoding | None:
+    """Tokenizer for an embedding model, loaded once; None if unavailable."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        return None
+
+
+def _pack_batches(
+    texts: list[str],
+    model: str,
+    max_inputs: int,
+    max_tokens: int,
+) -> list[tuple[int, int, int]]:
+    """
+    Split texts into contiguous (start, end, tokens) batches under the request limits.
+
+    Batches are filled greedily until adding the next text would exceed
+    max_tokens or the batch holds max_inputs texts. Token counts come from
+    the model's tokenizer, or the character count if it can't be loaded.
+    """
+    if not texts:
+        return [(0, 0, 0)]
+
+    encoding = _get_model_encoding(model)
+    if encoding is not None:
+        token_counts = [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+    else:
+        token_counts = [len(text) for text in texts]
+
+    batches = []
+    start = 0
+    token_sum = 0
+    for i, count in enumerate(token_counts):
+        if i > start and (token_sum + count > max_tokens or i - start == max_inputs):
+            batches.append((start, i, token_sum))
+            start = i
+            token_sum = 0
+        token_sum += count
+    batches.append((start, len(texts), token_sum))
+    return batches
+
+
 def generate_embeddings(
     texts: list[str],
     model: str = "text-embedding-3-small",
-    batch_size: int = 100,
+    batch_size: int = MAX_INPUTS_PER_REQUEST,
+    max_tokens_per_request: int = MAX_TOKENS_PER_REQUEST,
 ) -> list[list[float]]:
     """
-    Generate embeddings for multiple texts with batching.
+    Generate embeddings for multiple texts with token-budgeted batching.
 
     Args:
         texts: List of text strings to embed
         model: OpenAI embedding model to use
-        batch_size: Number of texts to process per API call
+        batch_size: Maximum number of texts per API call
+        max_tokens_per_request: Maximum total tokens per API call
 
     Returns:
         List of embedding vectors (one per input text)
@@ -42,11 +155,12 @@ def generate_embeddings(
     client = get_openai_client()
     all_embeddings = []
 
-    # Process in batches to respect API rate limits
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
+    # Pack texts into as few requests as the API limits allow
+    batches = _pack_batches(texts, model, batch_size, max_tokens_per_request)
+    for batch_number, (start, end, _) in enumerate(batches, 1):
+        batch = texts[start:end]
 
-        logger.info(f"Generating embeddings for batch {i//batch_size + 1} ({len(batch)} texts)")
+        logger.info("Generating embeddings for batch %d (%d texts)", batch_number, len(batch))
 
         try:
             response = client.embeddings.create(
@@ -59,13 +173,90 @@ def generate_embeddings(
             all_embeddings.extend(batch_embeddings)
 
         except Exception as e:
-            logger.error(f"Failed to generate embeddings for batch: {e}")
+            logger.error("Failed to generate embeddings for batch: %s", e)
             raise
 
-    logger.info(f"Generated {len(all_embeddings)} embeddings total")
+    logger.info("Generated %d embeddings total", len(all_embeddings))
     return all_embeddings
 
 
+async def agenerate_embeddings(
+    texts: list[str],
+    model: str = "text-embedding-3-small",
+    batch_size: int = MAX_INPUTS_PER_REQUEST,
+    max_concurrency: int = 5,
+    max_tokens_per_request: int = MAX_TOKENS_PER_REQUEST,
+) -> np.ndarray:
+    """
+    Generate embeddings for multiple texts, sending batches concurrently.
+
+    Vectors are requested base64-encoded and decoded straight into one
+    float32 array (~6 KB per 1536-dim vector) rather than lists of Python
+    floats (~50 KB each), which matters for large document uploads.
+
+    Args:
+        texts: List of text strings to embed
+        model: OpenAI embedding model to use
+        batch_size: Maximum number of texts per API call
+        max_concurrency: Maximum embedding requests in flight at once
+        max_tokens_per_request: Maximum total tokens per API call
+
+    Returns:
+        float32 array of shape (len(texts), dimensions), rows in input order
+    """
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+
+    client = get_async_openai_client()
+    rate_limiter = get_rate_limiter(model)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results: np.ndarray | None = None
+
+    async def embed_batch(batch_number: int, start: int, end: int, tokens: int) -> None:
+        batch = texts[start:end]
+        async with semaphore:
+            # Wait out exhausted request/token budgets rather than hitting 429s
+            await rate_limiter.acquire(tokens)
+            logger.info("Generating embeddings for batch %d (%d texts)", batch_number, len(batch))
+            try:
+                raw_response = await client.embeddings.with_raw_response.create(
+                    input=batch,
+                    model=model,
+                    encoding_format="base64",
+                )
+            except Exception as e:
+                logger.error("Failed to generate embeddings for batch: %s", e)
+                raise
+            rate_limiter.update(raw_response.headers)
+            response = raw_response.parse()
+
+        if len(response.data) != len(batch):
+            raise ValueError(
+                f"Expected {len(batch)} embeddings for batch {batch_number}, got {len(response.data)}"
+            )
+
+        # Write into place so batches can finish in any order
+        nonlocal results
+        for offset, item in enumerate(response.data):
+            vector = np.frombuffer(base64.b64decode(item.embedding), dtype=np.float32)
+            if results is None:
+                results = np.empty((len(texts), vector.size), dtype=np.float32)
+            results[start + offset] = vector
+
+    # A failed batch cancels the others rather than letting them spend tokens
+    # on a result that will be discarded; re-raise it unwrapped
+    batches = _pack_batches(texts, model, batch_size, max_tokens_per_request)
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for batch_number, (start, end, tokens) in enumerate(batches, 1):
+                tg.create_task(embed_batch(batch_number, start, end, tokens))
+    except ExceptionGroup as eg:
+        raise eg.exceptions[0]
+
+    logger.info("Generated %d embeddings total", len(texts))
+    return results
+
+
 def generate_single_embedding(
     text: str,
     model: str = "text-embedding-3-small",
@@ -82,3 +273,38 @@ def generate_single_embedding(
     """
     embeddings = generate_embeddings([text], model=model)
     return embeddings[0] if embeddings else []
+
+
+@cached(
+    _query_embedding_cache,
+    key=lambda query, model: (model, query),
+    lock=_query_embedding_lock,
+)
+def _embed_query(query: str, model: str) -> bytes:
+    response = get_openai_client().embeddings.create(
+        input=[query],
+        model=model,
+        encoding_format="base64",
+    )
+    return base64.b64decode(response.data[0].embedding)
+
+
+def embed_query(
+    query: str,
+    model: str = "text-embedding-3-small",
+) -> list[float]:
+    """
+    Generate the embedding for a search query, reusing recent results.
+
+    Whitespace is collapsed before lookup so trivially different spellings
+    of the same query share a cache entry.
+
+    Args:
+        query: Search query text
+        model: OpenAI embedding model to use
+
+    Returns:
+        Embedding vector
+    """
+    vector = np.frombuffer(_embed_query(" ".join(query.split()), model), dtype=np.float32)
+    return vector.tolist()
@@ -0,0 +1,110 @@
+"""MinHash LSH near-duplicate detection for KB chunks."""
+from collections.abc import Iterable
+import numpy as np
+import xxhash
+from app.kb.chunker import Chunk
+
+
+NUM_PERM = 128
+SHINGLE_SIZE = 3  # words per shingle
+DEFAULT_THRESHOLD = 0.85
+
+# 16 bands of 8 rows puts the LSH candidate threshold near 0.7, so pairs at
+# 0.85 are almost always compared; candidates are then checked exactly
+# against the signature estimate
+_BANDS = 16
+_ROWS = NUM_PERM // _BANDS
+
+# Fixed seed so signatures are comparable across processes
+_rng = np.random.default_rng(0x5EED)
+_PERM_A = _rng.integers(1, 2**64, size=(NUM_PERM, 1), dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.integers(0, 2**64, size=(NUM_PERM, 1), dtype=np.uint64)
+
+
+def minhash_signature(text: str, shingle_size: int = SHINGLE_SIZE) -> np.ndarray:
+    """
+    Compute a MinHash signature over word shingles of text.
+
+    Shingles are built from whitespace-split words, so reflowed or
+    re-indented copies of the same text get the same signature.
+
+    Args:
+        text: Text to fingerprint
+        shingle_size: Words per shingle
+
+    Returns:
+        uint32 array of NUM_PERM minimum hash values
+    """
+    words = text.split()
+    if len(words) <= shingle_size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {
+            " ".join(words[i:i + shingle_size])
+            for i in range(len(words) - shingle_size + 1)
+        }
+
+    base = np.fromiter(
+        (xxhash.xxh32_intdigest(s.encode("utf-8")) for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # Multiply-shift universal hashing: the high 32 bits of a*x + b (mod 2^64)
+    permuted = (_PERM_A * base + _PERM_B) >> np.uint64(32)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+class MinHashLSH:
+    """In-memory LSH index over MinHash signatures."""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._signatures: list[np.ndarray] = []
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(_BANDS)]
+
+    def insert_if_novel(self, signature: np.ndarray) -> bool:
+        """
+        Add a signature unless a near-duplicate is already indexed.
+
+        Returns:
+            True if the signature was added, False if it matched an indexed one
+        """
+        bands = [
+            signature[band * _ROWS:(band + 1) * _ROWS].tobytes()
+            for band in range(_BANDS)
+        ]
+
+        candidates: set[int] = set()
+        for buckets, key in zip(self._buckets, bands):
+            candidates.update(buckets.get(key, ()))
+        for idx in candidates:
+            if np.mean(self._signatures[idx] == signature) >= self.threshold:
+                return False
+
+        idx = len(self._signatures)
+        self._signatures.append(signature)
+        for buckets, key in zip(self._buckets, bands):
+            buckets.setdefault(key, []).append(idx)
+        return True
+
+
+def deduplicate_near_chunks(
+    chunks: Iterable[Chunk],
+    lsh: MinHashLSH | None = None,
+) -> list[Chunk]:
+    """
+    Remove chunks that are near-duplicates of ones already kept.
+
+    Args:
+        chunks: Chunks to filter (run deduplicate_chunks first to drop exact copies cheaply)
+        lsh: Index of chunks kept by earlier calls; updated in place so a
+            document can be filtered batch by batch
+
+    Returns:
+        Chunks whose estimated Jaccard similarity to every kept chunk is
+        below the index threshold (first occurrence kept)
+    """
+    if lsh is None:
+        lsh = MinHashLSH()
+
+    return [chunk for chunk in chunks if lsh.insert_if_novel(minhash_signature(chunk.content))]
@@ -0,0 +1,91 @@
+"""Client-side pacing of OpenAI requests from rate limit response headers."""
+import asyncio
+import functools
+import re
+from collections.abc import Mapping
+
+
+# OpenAI reset durations look like "1s", "6m0s", "120ms" or "1h2m3.5s"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def _parse_reset(value: str | None) -> float | None:
+    """Seconds until a limit resets, or None if the header is missing or malformed."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _parse_int(value: str | None) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class OpenAIRateLimiter:
+    """
+    Hold back requests that OpenAI's last reported limits can't fit.
+
+    Remaining request and token budgets (and when they reset) are taken from
+    the x-ratelimit-* headers of each response. acquire() reserves budget
+    for a request before it is sent and sleeps until the reset if the budget
+    is exhausted, so concurrent batches wait instead of bursting into 429s.
+    Before any headers arrive nothing is held back.
+    """
+
+    def __init__(self) -> None:
+        self._requests_remaining: int | None = None
+        self._tokens_remaining: int | None = None
+        self._requests_reset_at = 0.0
+        self._tokens_reset_at = 0.0
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until a request of `tokens` tokens fits, then reserve it."""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if now >= self._requests_reset_at:
+                self._requests_remaining = None
+            if now >= self._tokens_reset_at:
+                self._tokens_remaining = None
+
+            wait = 0.0
+            if self._requests_remaining is not None and self._requests_remaining < 1:
+                wait = self._requests_reset_at - now
+            if self._tokens_remaining is not None and tokens > self._tokens_remaining:
+                wait = max(wait, self._tokens_reset_at - now)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+
+        if self._requests_remaining is not None:
+            self._requests_remaining -= 1
+        if self._tokens_remaining is not None:
+            self._tokens_remaining -= tokens
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Record the limits reported in a response's headers."""
+        now = asyncio.get_running_loop().time()
+
+        requests_remaining = _parse_int(headers.get("x-ratelimit-remaining-requests"))
+        requests_reset = _parse_reset(headers.get("x-ratelimit-reset-requests"))
+        if requests_remaining is not None and requests_reset is not None:
+            self._requests_remaining = requests_remaining
+            self._requests_reset_at = now + requests_reset
+
+        tokens_remaining = _parse_int(headers.get("x-ratelimit-remaining-tokens"))
+        tokens_reset = _parse_reset(headers.get("x-ratelimit-reset-tokens"))
+        if tokens_remaining is not None and tokens_reset is not None:
+            self._tokens_remaining = tokens_remaining
+            self._tokens_reset_at = now + tokens_reset
+
+
+@functools.lru_cache(maxsize=8)
+def get_rate_limiter(model: str) -> OpenAIRateLimiter:
+    """Shared limiter per model (OpenAI limits are per model for one API key)."""
+    return OpenAIRateLimiter()
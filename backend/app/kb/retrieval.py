@@ -1,18 +1,190 @@
 """KB retrieval and search functionality."""
+import asyncio
+import hashlib
 import logging
 import uuid
-from datetime import datetime
-from qdrant_client.models import PointStruct, Filter, FieldCondition, MatchValue
-from app.kb.client import get_qdrant_client, ensure_collection_exists
-from app.kb.chunker import Chunk, chunk_text, deduplicate_chunks, compute_content_hash
-from app.kb.embeddings import generate_embeddings, generate_single_embedding
+from datetime import datetime, timezone
+from itertools import islice
+from typing import NamedTuple
+import numpy as np
+import grpc
+from qdrant_client.http.exceptions import ResponseHandlingException
+from qdrant_client.models import (
+    Batch,
+    FilterSelector,
+    QuantizationSearchParams,
+    SearchParams,
+)
+from app.kb.client import (
+    SPARSE_VECTOR_NAME,
+    collection_has_sparse_vectors,
+    content_hash_filter,
+    dense_vector,
+    ensure_collection_exists,
+    get_qdrant_client,
+    superseded_points_filter,
+    workspace_filter,
+)
+from app.kb.chunker import Chunk, iter_chunks, deduplicate_chunks, compute_content_hash
+from app.kb.embeddings import agenerate_embeddings, embed_query
+from app.kb.minhash import MinHashLSH, deduplicate_near_chunks
+from app.kb.snapshot import has_snapshot, mark_stale, search_snapshot
+from app.kb.sparse import bm25_document_vector, bm25_query_vector
 from app.kb.models import KBChunk, KBSearchResult
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Chunks embedded and upserted per round during document ingestion; each
+# round is packed into token-budgeted embedding requests sent concurrently
+_UPSERT_BATCH_SIZE = 500
+# Points per Qdrant upsert call
+_POINTS_PER_UPSERT = 256
+# Upsert calls queued ahead of the Qdrant writers; bounds memory and makes
+# embedding wait when Qdrant falls behind
+_UPSERT_QUEUE_SIZE = 4
+# Concurrent upsert calls per upload; Qdrant ingests fastest with a couple
+# of requests in flight, while more mostly contend on the same segments
+_UPSERT_CONCURRENCY = 2
 
-def upsert_document(
+# Queries this short (in words) are keyword lookups: they go to the BM25
+# sparse vectors, skipping the query embedding, when the collection has them
+_KEYWORD_QUERY_MAX_WORDS = 3
+
+# gRPC statuses meaning Qdrant itself is unreachable; other errors (bad
+# filters, missing collections) are not answered from the local snapshot
+_QDRANT_UNREACHABLE_CODES = frozenset({grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED})
+
+# Binary codes are coarse, so fetch 3x the candidates for rescoring
+_SEARCH_PARAMS = SearchParams(
+    quantization=QuantizationSearchParams(rescore=True, oversampling=3.0),
+)
+
+
+# Namespace for chunk point IDs (uuid5 of workspace and content hash)
+_POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "reploom:kb:point")
+
+# Scroll pages read per round when looking for other workspaces' copies of
+# new chunks; chunks still not found after that are embedded
+_EMBEDDING_CACHE_MAX_PAGES = 4
+
+
+def _point_id(workspace_id: str, content_hash: bytes) -> str:
+    """Stable Qdrant point ID for a chunk within one workspace.
+
+    The workspace is part of the ID, so identical chunks uploaded by
+    different workspaces are separate points and never overwrite each other.
+    """
+    return str(uuid.uuid5(_POINT_ID_NAMESPACE, f"{workspace_id}:{content_hash.hex()}"))
+
+
+def _legacy_content_hashes(content: str) -> list[str]:
+    """Content hashes earlier chunk hash schemes (SHA-256, then BLAKE2b-128) stored for this text."""
+    data = content.encode("utf-8")
+    return [hashlib.sha256(data).hexdigest(), hashlib.blake2b(data, digest_size=16).hexdigest()]
+
+
+def _delete_superseded_points(client, collection_name: str, workspace_id: str, chunks: list[tuple[Chunk, str]]) -> None:
+    """Delete the workspace's copies of these chunks stored under earlier point ID schemes.
+
+    Point IDs changed with the content hash and again when they became
+    workspace-scoped; without this, re-uploading a document stores every
+    chunk a second time next to its old point and searches return both.
+    """
+    content_hashes = []
+    for chunk, _ in chunks:
+        content_hashes.append(chunk.content_hash.hex())
+        content_hashes.extend(_legacy_content_hashes(chunk.content))
+    client.delete(
+        collection_name=collection_name,
+        points_selector=FilterSelector(
+            filter=superseded_points_filter(workspace_id, content_hashes, [point_id for _, point_id in chunks])
+        ),
+        wait=True,
+    )
+
+
+def _cached_vectors(client, collection_name: str, content_hashes: list[str]) -> dict[str, list[float]]:
+    """Stored vectors of chunks with these content hashes, from any workspace.
+
+    Used read-only as an embedding cache: the vectors are copied into new
+    points for the uploading workspace, other workspaces' points are never
+    written.
+    """
+    vectors: dict[str, list[float]] = {}
+    wanted = set(content_hashes)
+    offset = None
+    for _ in range(_EMBEDDING_CACHE_MAX_PAGES):
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=content_hash_filter(sorted(wanted)),
+            limit=len(wanted),
+            offset=offset,
+            with_payload=["content_hash"],
+            with_vectors=True,
+        )
+        for record in records:
+            content_hash = (record.payload or {}).get("content_hash")
+            vector = dense_vector(record.vector)
+            if content_hash in wanted and vector is not None:
+                vectors[content_hash] = vector
+                wanted.discard(content_hash)
+        if not wanted or offset is None:
+            break
+    return vectors
+
+
+class _PendingUpsert(NamedTuple):
+    """Points queued for the Qdrant writer, vectors kept as one float32 array."""
+    ids: list[str]
+    vectors: np.ndarray
+    payloads: list[dict]
+    # Also write BM25 sparse vectors (computed in the writer's thread)
+    with_sparse: bool = False
+
+
+def _upsert_points(client, collection_name: str, pending: _PendingUpsert, wait: bool) -> None:
+    """Send one queued batch, converting vectors to lists only at send time."""
+    vectors = pending.vectors.tolist()
+    if pending.with_sparse:
+        vectors = {
+            "": vectors,
+            SPARSE_VECTOR_NAME: [bm25_document_vector(payload["content"]) for payload in pending.payloads],
+        }
+
+    client.upsert(
+        collection_name=collection_name,
+        points=Batch(
+            ids=pending.ids,
+            vectors=vectors,
+            payloads=pending.payloads,
+        ),
+        wait=wait,
+    )
+
+
+async def _drain_upserts(
+    client,
+    collection_name: str,
+    queue: asyncio.Queue[_PendingUpsert | None],
+) -> None:
+    """Write queued point batches to Qdrant until a None sentinel arrives.
+
+    Several writers drain one queue. Batches return once written to the
+    WAL, except each writer's last one, which waits for completion so the
+    document's final writes surface errors.
+    """
+    held: _PendingUpsert | None = None
+    while (pending := await queue.get()) is not None:
+        if held is not None:
+            await asyncio.to_thread(_upsert_points, client, collection_name, held, False)
+        held = pending
+
+    if held is not None:
+        await asyncio.to_thread(_upsert_points, client, collection_name, held, True)
+
+
+async def upsert_document(
     file_content: str,
     workspace_id: str,
     source: str = "upload",
@@ -39,73 +211,162 @@ def upsert_document(
     collection_name = collection_name or settings.QDRANT_COLLECTION_NAME
     tags = tags or []
 
-    # Ensure collection exists
-    ensure_collection_exists(collection_name)
+    # Ensure collection exists (Qdrant client calls are blocking; keep them
+    # off the event loop)
+    await asyncio.to_thread(ensure_collection_exists, collection_name)
+    client = get_qdrant_client()
+    use_sparse = await asyncio.to_thread(collection_has_sparse_vectors, client, collection_name)
+
+    # Step 1: Chunk the text lazily so embedding and upsert run batch by batch
+    logger.info("Chunking document (workspace=%s, source=%s)", workspace_id, source)
+    chunk_iter = iter_chunks(file_content, chunk_size=800, chunk_overlap=200)
+    seen_hashes: set[bytes] = set()
+    near_duplicate_index = MinHashLSH()
+    original_count = 0
+    dedup_count = 0
+    reused_count = 0
+    queue: asyncio.Queue[_PendingUpsert | None] = asyncio.Queue(maxsize=_UPSERT_QUEUE_SIZE)
+    # Payload fields shared by every point; one timestamp per upload
+    payload_base = {
+        "workspace_id": workspace_id,
+        "source": source,
+        "title": title,
+        "url": url,
+        "tags": tags,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+    # A failure on either side cancels the other; re-raise it unwrapped so
+    # callers see the same errors as a serial upload
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(_UPSERT_CONCURRENCY):
+                tg.create_task(_drain_upserts(client, collection_name, queue))
+
+            # Tokenizing and hashing are CPU-bound, so pull each batch off the event loop
+            while batch := await asyncio.to_thread(lambda: list(islice(chunk_iter, _UPSERT_BATCH_SIZE))):
+                original_count += len(batch)
+
+                # Step 2: Deduplicate by content hash, then drop near-duplicates
+                # (reflowed whitespace, lightly edited copies) by MinHash
+                # similarity, both across the whole document
+                chunks = deduplicate_chunks(batch, seen_hashes)
+                chunks = await asyncio.to_thread(deduplicate_near_chunks, chunks, near_duplicate_index)
+                if not chunks:
+                    continue
 
-    # Step 1: Chunk the text
-    logger.info(f"Chunking document (workspace={workspace_id}, source={source})")
-    chunks = chunk_text(file_content, chunk_size=800, chunk_overlap=200)
+                # Step 3: Skip chunks this workspace already stores under their
+                # stable IDs. New ones reuse the vector of an identical chunk
+                # stored by any workspace instead of being re-embedded
+                point_ids = [_point_id(workspace_id, c.content_hash) for c in chunks]
+                stored = {
+                    str(record.id)
+                    for record in await asyncio.to_thread(
+                        client.retrieve,
+                        collection_name=collection_name,
+                        ids=point_ids,
+                        with_payload=False,
+                        with_vectors=False,
+                    )
+                }
+                new_chunks = [
+                    (chunk, point_id) for chunk, point_id in zip(chunks, point_ids) if point_id not in stored
+                ]
+                reused_count += len(chunks) - len(new_chunks)
+                if not new_chunks:
+                    continue
 
-    # Step 2: Deduplicate by content hash
-    original_count = len(chunks)
-    chunks = deduplicate_chunks(chunks)
-    dedup_count = len(chunks)
+                cached = await asyncio.to_thread(
+                    _cached_vectors,
+                    client,
+                    collection_name,
+                    list({chunk.content_hash.hex() for chunk, _ in new_chunks}),
+                )
+                pending: list[tuple[Chunk, str, list[float] | None]] = [
+                    (chunk, point_id, cached.get(chunk.content_hash.hex())) for chunk, point_id in new_chunks
+                ]
+                # Old copies of these chunks may have lent their vectors above;
+                # now drop them so each chunk is stored once
+                await asyncio.to_thread(_delete_superseded_points, client, collection_name, workspace_id, new_chunks)
+
+                # Step 4: Generate embeddings for content not stored yet
+                to_embed = [chunk.content for chunk, _, vector in pending if vector is None]
+                new_embeddings = iter(await agenerate_embeddings(to_embed)) if to_embed else iter(())
+
+                # Step 5: Collect point IDs (stable per workspace and content hash),
+                # vectors and payloads
+                ids = []
+                vector_rows = []
+                payloads = []
+
+                for chunk, point_id, vector in pending:
+                    ids.append(point_id)
+                    vector_rows.append(vector if vector is not None else next(new_embeddings))
+                    payloads.append({
+                        **payload_base,
+                        "content": chunk.content,
+                        "content_hash": chunk.content_hash.hex(),
+                    })
+
+                vectors = np.asarray(vector_rows, dtype=np.float32)
 
-    logger.info(f"Deduplication: {original_count} -> {dedup_count} chunks ({original_count - dedup_count} duplicates removed)")
+                # Step 6: Hand the points to the Qdrant writers (upsert = insert or
+                # update if exists) in sub-batches, so the next round's embeddings
+                # are requested while this round is written
+                logger.info("Upserting %d points to Qdrant collection '%s'", len(ids), collection_name)
+                for start in range(0, len(ids), _POINTS_PER_UPSERT):
+                    end = start + _POINTS_PER_UPSERT
+                    await queue.put(
+                        _PendingUpsert(ids[start:end], vectors[start:end], payloads[start:end], use_sparse)
+                    )
+                dedup_count += len(ids)
+
+            for _ in range(_UPSERT_CONCURRENCY):
+                await queue.put(None)
+    except ExceptionGroup as eg:
+        raise eg.exceptions[0]
+
+    if dedup_count:
+        mark_stale(collection_name, workspace_id)
+
+    duplicates_skipped = original_count - dedup_count - reused_count
+    logger.info(
+        "Deduplication: %d -> %d chunks (%d duplicates removed, %d already stored)",
+        original_count, dedup_count, duplicates_skipped, reused_count,
+    )
 
-    if not chunks:
+    if not dedup_count and not reused_count:
         logger.warning("No chunks to upload after deduplication")
         return {
             "chunks_total": 0,
             "chunks_uploaded": 0,
             "duplicates_skipped": 0,
+            "chunks_already_stored": 0,
         }
 
-    # Step 3: Generate embeddings in batch
-    chunk_texts = [c.content for c in chunks]
-    embeddings = generate_embeddings(chunk_texts, batch_size=100)
-
-    # Step 4: Create points with stable IDs (based on content hash)
-    client = get_qdrant_client()
-    points = []
-
-    for chunk, embedding in zip(chunks, embeddings):
-        # Use content hash as stable ID (ensures same content = same ID)
-        point_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, chunk.content_hash))
-
-        payload = {
-            "workspace_id": workspace_id,
-            "source": source,
-            "title": title,
-            "url": url,
-            "tags": tags,
-            "content": chunk.content,
-            "content_hash": chunk.content_hash,
-            "created_at": datetime.utcnow().isoformat(),
-        }
-
-        points.append(PointStruct(
-            id=point_id,
-            vector=embedding,
-            payload=payload,
-        ))
-
-    # Step 5: Upsert to Qdrant (upsert = insert or update if exists)
-    logger.info(f"Upserting {len(points)} points to Qdrant collection '{collection_name}'")
-    client.upsert(
-        collection_name=collection_name,
-        points=points,
-    )
-
-    logger.info(f"Successfully uploaded {len(points)} chunks")
+    logger.info("Successfully uploaded %d chunks", dedup_count)
 
     return {
         "chunks_total": original_count,
         "chunks_uploaded": dedup_count,
-        "duplicates_skipped": original_count - dedup_count,
+        "duplicates_skipped": duplicates_skipped,
+        "chunks_already_stored": reused_count,
     }
 
 
+def _search_result(chunk_id: str, score: float, payload: dict) -> KBSearchResult:
+    return KBSearchResult(
+        chunk_id=chunk_id,
+        content=payload.get("content", ""),
+        score=score,
+        workspace_id=payload.get("workspace_id", ""),
+        source=payload.get("source", "unknown"),
+        title=payload.get("title"),
+        url=payload.get("url"),
+        tags=payload.get("tags", []),
+    )
+
+
 def search_kb(
     query: str,
     workspace_id: str,
@@ -129,40 +390,50 @@ def search_kb(
     collection_name = collection_name or settings.QDRANT_COLLECTION_NAME
     client = get_qdrant_client()
 
-    # Generate query embedding
-    logger.info(f"Searching KB: query='{query[:50]}...', workspace={workspace_id}, k={k}")
-    query_embedding = generate_single_embedding(query)
+    query_filter = workspace_filter(workspace_id)
+    logger.info("Searching KB: query='%.50s...', workspace=%s, k=%d", query, workspace_id, k)
 
-    # Search with workspace filter
-    search_results = client.search(
-        collection_name=collection_name,
-        query_vector=query_embedding,
-        query_filter=Filter(
-            must=[
-                FieldCondition(
-                    key="workspace_id",
-                    match=MatchValue(value=workspace_id),
-                )
-            ]
-        ),
-        limit=k,
-        with_vectors=with_vectors,  # Optimize: skip vectors by default
-    )
+    try:
+        search_results = []
+        if (
+            len(query.split()) <= _KEYWORD_QUERY_MAX_WORDS
+            and collection_has_sparse_vectors(client, collection_name)
+        ):
+            # Keyword lookup against BM25 sparse vectors; no OpenAI call
+            search_results = client.query_points(
+                collection_name=collection_name,
+                query=bm25_query_vector(query),
+                using=SPARSE_VECTOR_NAME,
+                query_filter=query_filter,
+                limit=k,
+                with_vectors=with_vectors,
+            ).points
+
+        if not search_results:
+            # Dense search (also the fallback when no chunk contains the keywords)
+            search_results = client.query_points(
+                collection_name=collection_name,
+                query=embed_query(query),
+                query_filter=query_filter,
+                limit=k,
+                with_vectors=with_vectors,  # Optimize: skip vectors by default
+                # Search the quantized vectors, then rescore the oversampled
+                # candidates against the full-precision originals to keep top-k quality
+                search_params=_SEARCH_PARAMS,
+            ).points
+    except (ResponseHandlingException, grpc.RpcError) as e:
+        if isinstance(e, grpc.RpcError) and e.code() not in _QDRANT_UNREACHABLE_CODES:
+            raise
+        # Qdrant unreachable: brute-force the workspace's local snapshot
+        hits = search_snapshot(collection_name, workspace_id, embed_query(query), k)
+        if hits is None:
+            raise
+        logger.warning("Qdrant unavailable; served KB search from local snapshot")
+        results = [_search_result(hit.point_id, hit.score, hit.payload) for hit in hits]
+    else:
+        if not has_snapshot(collection_name, workspace_id):
+            mark_stale(collection_name, workspace_id)
+        results = [_search_result(str(hit.id), hit.score, hit.payload) for hit in search_results]
 
-    # Convert to KBSearchResult
-    results = []
-    for hit in search_results:
-        payload = hit.payload
-        results.append(KBSearchResult(
-            chunk_id=str(hit.id),
-            content=payload.get("content", ""),
-            score=hit.score,
-            workspace_id=payload.get("workspace_id", ""),
-            source=payload.get("source", "unknown"),
-            title=payload.get("title"),
-            url=payload.get("url"),
-            tags=payload.get("tags", []),
-        ))
-
-    logger.info(f"Found {len(results)} results")
+    logger.info("Found %d results", len(results))
     return results
@@ -0,0 +1,201 @@
+"""Local per-workspace vector snapshots for KB search while Qdrant is down."""
+import asyncio
+import functools
+import logging
+import os
+import time
+from pathlib import Path
+from typing import NamedTuple
+import numpy as np
+import orjson
+import xxhash
+from app.core.config import settings
+from app.kb.client import dense_vector, get_qdrant_client, workspace_filter
+
+logger = logging.getLogger(__name__)
+
+_SCROLL_PAGE_SIZE = 1024
+
+# (collection, workspace) pairs whose snapshot is missing or out of date
+_stale_workspaces: set[tuple[str, str]] = set()
+
+
+class SnapshotHit(NamedTuple):
+    """One fallback search result."""
+    point_id: str
+    score: float
+    payload: dict
+
+
+class _Snapshot(NamedTuple):
+    ids: list[str]
+    payloads: list[dict]
+    vectors: np.ndarray  # float16, rows L2-normalised, memory-mapped
+
+
+def _meta_path(collection_name: str, workspace_id: str) -> Path:
+    """Metadata file path (workspace IDs are hashed into safe file names).
+
+    The metadata names the snapshot's vector file, which is written under a
+    fresh generation name each time, so replacing the metadata file is the
+    single atomic step that publishes a new snapshot.
+    """
+    directory = Path(settings.KB_SNAPSHOT_DIR) / collection_name
+    stem = xxhash.xxh3_64_hexdigest(workspace_id.encode("utf-8"))
+    return directory / f"{stem}.json"
+
+
+def snapshots_enabled() -> bool:
+    return bool(settings.KB_SNAPSHOT_DIR)
+
+
+def mark_stale(collection_name: str, workspace_id: str) -> None:
+    """Queue a workspace for the next snapshot refresh."""
+    if snapshots_enabled():
+        _stale_workspaces.add((collection_name, workspace_id))
+
+
+def has_snapshot(collection_name: str, workspace_id: str) -> bool:
+    if not snapshots_enabled():
+        return False
+    return _meta_path(collection_name, workspace_id).exists()
+
+
+def snapshot_workspace(collection_name: str, workspace_id: str) -> int:
+    """
+    Copy a workspace's points from Qdrant to local snapshot files.
+
+    Vectors are stored as one float16 matrix (~3 KB per 1536-dim vector) so
+    the fallback can memory-map it; IDs and payloads go to a JSON sidecar.
+    The vectors go to a new generation file first, then the sidecar naming
+    it replaces the old one in one rename, so readers never pair one
+    snapshot's vectors with another's metadata. Temporary and generation
+    names include the pid, as the API and the ingest worker both refresh.
+
+    Returns:
+        Number of points written
+    """
+    client = get_qdrant_client()
+
+    ids: list[str] = []
+    payloads: list[dict] = []
+    rows: list[list[float]] = []
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=workspace_filter(workspace_id),
+            limit=_SCROLL_PAGE_SIZE,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        for record in records:
+            vector = dense_vector(record.vector)
+            if vector is None:
+                continue
+            ids.append(str(record.id))
+            payloads.append(record.payload or {})
+            rows.append(vector)
+        if offset is None:
+            break
+
+    vectors = np.asarray(rows, dtype=np.float32).reshape(len(rows), -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = (vectors / np.where(norms == 0, 1, norms)).astype(np.float16)
+
+    meta_path = _meta_path(collection_name, workspace_id)
+    meta_path.parent.mkdir(parents=True, exist_ok=True)
+    pid = os.getpid()
+    vectors_path = meta_path.with_name(f"{meta_path.stem}.{time.time_ns():x}-{pid}.npy")
+    tmp_meta = meta_path.with_name(f"{meta_path.name}.{pid}.tmp")
+    previous = _vectors_name(meta_path)
+
+    with open(vectors_path, "wb") as f:
+        np.save(f, vectors)
+    tmp_meta.write_bytes(orjson.dumps({"vectors": vectors_path.name, "ids": ids, "payloads": payloads}))
+    os.replace(tmp_meta, meta_path)
+
+    # Readers that loaded the old generation keep their memory map
+    if previous and previous != vectors_path.name:
+        meta_path.with_name(previous).unlink(missing_ok=True)
+    return len(ids)
+
+
+def _vectors_name(meta_path: Path) -> str | None:
+    """Vector file named by the current metadata, if there is one."""
+    try:
+        return orjson.loads(meta_path.read_bytes()).get("vectors")
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return None
+
+
+@functools.lru_cache(maxsize=32)
+def _load_snapshot(meta_path: Path, inode: int, mtime_ns: int) -> _Snapshot:
+    """Load a snapshot once per metadata version (each replace brings a new inode)."""
+    meta = orjson.loads(meta_path.read_bytes())
+    vectors = np.load(meta_path.with_name(meta["vectors"]), mmap_mode="r")
+    if len(vectors) != len(meta["ids"]):
+        raise ValueError(f"Snapshot {meta_path} lists {len(meta['ids'])} IDs for {len(vectors)} vectors")
+    return _Snapshot(ids=meta["ids"], payloads=meta["payloads"], vectors=vectors)
+
+
+def search_snapshot(
+    collection_name: str,
+    workspace_id: str,
+    query_vector: list[float],
+    k: int,
+) -> list[SnapshotHit] | None:
+    """
+    Brute-force cosine search over a workspace snapshot.
+
+    Returns:
+        Top-k hits by descending score, or None if no snapshot exists
+    """
+    if not snapshots_enabled():
+        return None
+    meta_path = _meta_path(collection_name, workspace_id)
+    # A refresh can replace the metadata and delete its old vector file
+    # between the two reads; the second attempt sees the new generation
+    for _ in range(2):
+        try:
+            stat = meta_path.stat()
+            snapshot = _load_snapshot(meta_path, stat.st_ino, stat.st_mtime_ns)
+            break
+        except FileNotFoundError:
+            continue
+        except (KeyError, ValueError) as e:
+            logger.warning("Ignoring unreadable KB snapshot %s: %s", meta_path, e)
+            return None
+    else:
+        return None
+    if not snapshot.ids or k <= 0:
+        return []
+
+    query = np.asarray(query_vector, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+    scores = snapshot.vectors @ query.astype(np.float16)
+    scores = scores.astype(np.float32)
+
+    # argpartition selects the top k in O(n); only those k are sorted
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [
+        SnapshotHit(snapshot.ids[i], float(scores[i]), snapshot.payloads[i])
+        for i in top
+    ]
+
+
+async def run_snapshot_refresh(interval_seconds: float | None = None) -> None:
+    """Refresh stale workspace snapshots periodically (run as a background task)."""
+    interval = interval_seconds or settings.KB_SNAPSHOT_INTERVAL_SECONDS
+    while True:
+        await asyncio.sleep(interval)
+        while _stale_workspaces:
+            collection_name, workspace_id = _stale_workspaces.pop()
+            try:
+                count = await asyncio.to_thread(snapshot_workspace, collection_name, workspace_id)
+                logger.info("Refreshed KB snapshot for workspace %s (%d points)", workspace_id, count)
+            except Exception:
+                logger.exception("Failed to refresh KB snapshot for workspace %s", workspace_id)
@@ -0,0 +1,50 @@
+"""BM25 sparse vectors for keyword search over KB chunks."""
+import re
+from collections import Counter
+import xxhash
+from qdrant_client.models import SparseVector
+
+
+# Standard BM25 parameters; _AVG_DOC_TOKENS approximates a chunk (800
+# tiktoken tokens is roughly 600 words)
+_K1 = 1.2
+_B = 0.75
+_AVG_DOC_TOKENS = 600
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _term_index(term: str) -> int:
+    """Map a term to a sparse dimension; 32-bit hash collisions are negligible."""
+    return xxhash.xxh32_intdigest(term.encode("utf-8"))
+
+
+def _to_sparse(weights: dict[int, float]) -> SparseVector:
+    indices = sorted(weights)
+    return SparseVector(indices=indices, values=[weights[i] for i in indices])
+
+
+def bm25_document_vector(text: str) -> SparseVector:
+    """
+    Sparse vector of BM25 term-frequency weights for a chunk.
+
+    IDF is left to Qdrant (the collection's sparse vectors use the IDF
+    modifier), so weights only depend on the chunk itself.
+    """
+    tokens = _tokenize(text)
+    length_norm = _K1 * (1 - _B + _B * len(tokens) / _AVG_DOC_TOKENS)
+
+    weights: dict[int, float] = {}
+    for term, tf in Counter(tokens).items():
+        index = _term_index(term)
+        weights[index] = weights.get(index, 0.0) + tf * (_K1 + 1) / (tf + length_norm)
+    return _to_sparse(weights)
+
+
+def bm25_query_vector(query: str) -> SparseVector:
+    """Sparse vector for a keyword query (each distinct term weighted 1)."""
+    return _to_sparse({_term_index(term): 1.0 for term in _tokenize(query)})
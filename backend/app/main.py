@@ -1,9 +1,13 @@
+import asyncio
+import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from sqlmodel import Session, text
 import httpx
+from arq import create_pool
+from arq.connections import RedisSettings
 
 from app.core.config import settings
 from app.api.api_router import api_router
@@ -11,9 +15,15 @@ from app.core.auth import auth_client
 from app.core.db import engine, init_db
 from app.core.fga import authorization_manager
 from app.core.tracing import setup_tracing
+from app.integrations.gmail_service import close_http_client as close_gmail_http_client
+from app.integrations.outlook_service import close_graph_client
+from app.kb.embeddings import close_openai_clients
+from app.kb.snapshot import run_snapshot_refresh, snapshots_enabled
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
 
+logger = logging.getLogger(__name__)
+
 # Initialize OpenTelemetry tracing
 setup_tracing(service_name="reploom-backend")
 
@@ -26,10 +36,33 @@ async def lifespan(app: FastAPI):
     # Startup
     init_db()
     authorization_manager.connect()
+    # Shared client for ad-hoc outbound calls (health probes, LangGraph);
+    # reuses pooled connections instead of a new handshake per request
+    app.state.http = httpx.AsyncClient(
+        timeout=5.0,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+    )
+    # Redis pool for queueing background jobs (KB ingestion); the API still
+    # boots without Redis, and KB uploads answer 503 until the API restarts
+    try:
+        app.state.arq = await create_pool(RedisSettings.from_dsn(settings.REDIS_URL))
+    except Exception as e:
+        logger.warning(f"Redis unavailable, KB uploads disabled: {e}")
+        app.state.arq = None
+    # Keep local KB snapshots fresh for searches while Qdrant is unreachable
+    snapshot_task = asyncio.create_task(run_snapshot_refresh()) if snapshots_enabled() else None
 
     yield
 
     # Shutdown
+    if snapshot_task is not None:
+        snapshot_task.cancel()
+    await app.state.http.aclose()
+    if app.state.arq is not None:
+        await app.state.arq.aclose()
+    await close_gmail_http_client()
+    await close_graph_client()
+    await close_openai_clients()
 
 
 app = FastAPI(
@@ -58,49 +91,51 @@ app.state.auth_client = auth_client
 app.include_router(api_router, prefix=settings.API_PREFIX)
 
 
-@app.get("/healthz")
-async def health_check():
-    """Health check endpoint that verifies connectivity to all external services."""
-    health_status = {
-        "status": "healthy",
-        "services": {
-            "postgres": "unknown",
-            "redis": "unknown",
-            "qdrant": "unknown",
-        }
-    }
-
-    # Check PostgreSQL
+def _check_postgres() -> tuple[str, bool]:
+    """Probe PostgreSQL (blocking; run in a worker thread)."""
     try:
         with Session(engine) as session:
             session.exec(text("SELECT 1"))
-            health_status["services"]["postgres"] = "healthy"
+        return "healthy", True
     except Exception as e:
-        health_status["services"]["postgres"] = f"unhealthy: {str(e)}"
-        health_status["status"] = "degraded"
+        return f"unhealthy: {str(e)}", False
 
-    # Check Redis
+
+async def _check_redis(redis) -> tuple[str, bool]:
+    """Ping Redis through the job queue pool."""
+    if redis is None:
+        return "unhealthy: not connected", False
     try:
-        async with httpx.AsyncClient() as client:
-            # Simple check - if Redis URL is configured
-            if settings.REDIS_URL:
-                health_status["services"]["redis"] = "configured"
-            else:
-                health_status["services"]["redis"] = "not configured"
+        await asyncio.wait_for(redis.ping(), timeout=2.0)
+        return "healthy", True
     except Exception as e:
-        health_status["services"]["redis"] = f"error: {str(e)}"
+        return f"unhealthy: {str(e)}", False
+
 
-    # Check Qdrant
+async def _check_qdrant(client: httpx.AsyncClient) -> tuple[str, bool]:
+    """Probe Qdrant's health endpoint."""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{settings.QDRANT_URL}/healthz", timeout=2.0)
-            if response.status_code == 200:
-                health_status["services"]["qdrant"] = "healthy"
-            else:
-                health_status["services"]["qdrant"] = f"unhealthy: status {response.status_code}"
-                health_status["status"] = "degraded"
+        response = await client.get(f"{settings.QDRANT_URL}/healthz", timeout=2.0)
+        if response.status_code == 200:
+            return "healthy", True
+        return f"unhealthy: status {response.status_code}", False
     except Exception as e:
-        health_status["services"]["qdrant"] = f"unhealthy: {str(e)}"
-        health_status["status"] = "degraded"
+        return f"unhealthy: {str(e)}", False
+
+
+@app.get("/healthz")
+async def health_check(request: Request):
+    """Health check endpoint that verifies connectivity to all external services."""
+    # Probe all services concurrently so latency is the slowest probe, not the sum
+    async with asyncio.TaskGroup() as tg:
+        probes = {
+            "postgres": tg.create_task(asyncio.to_thread(_check_postgres)),
+            "redis": tg.create_task(_check_redis(request.app.state.arq)),
+            "qdrant": tg.create_task(_check_qdrant(request.app.state.http)),
+        }
 
-    return health_status
+    results = {name: task.result() for name, task in probes.items()}
+    return {
+        "status": "healthy" if all(ok for _, ok in results.values()) else "degraded",
+        "services": {name: status for name, (status, _) in results.items()},
+    }
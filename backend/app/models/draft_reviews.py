@@ -3,6 +3,7 @@
 import uuid
 from datetime import datetime, timezone
 from typing import Literal
+from sqlalchemy import Index, text
 from sqlmodel import Field, SQLModel, Column, JSON, String
 
 
@@ -15,11 +16,23 @@ class DraftReview(SQLModel, table=True):
     """
 
     __tablename__ = "draft_reviews"
+    __table_args__ = (
+        # "My reviews" listing, optionally filtered by status, newest first
+        Index("ix_draft_reviews_user_status", "user_id", "status", "updated_at"),
+        # Pending review queue; small because reviewed rows drop out of it
+        Index(
+            "ix_draft_reviews_user_pending",
+            "user_id",
+            "updated_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+        Index("ix_draft_reviews_thread_user", "thread_id", "user_id"),
+    )
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
 
     # User who is reviewing
-    user_id: str = Field(index=True)
+    user_id: str
     user_email: str
 
     # Email provider (gmail or outlook)
@@ -29,7 +42,7 @@ class DraftReview(SQLModel, table=True):
     )
 
     # Link to Gmail/Outlook thread and draft
-    thread_id: str = Field(index=True)
+    thread_id: str
     draft_id: str | None = None  # Gmail/Outlook draft ID (if created)
 
     # LangGraph run information
@@ -64,10 +77,3 @@ class DraftReview(SQLModel, table=True):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     reviewed_at: datetime | None = None
-
-    class Config:
-        """SQLModel configuration."""
-        indexes = [
-            ("user_id", "status"),
-            ("thread_id", "user_id"),
-        ]
@@ -2,6 +2,7 @@
 
 import uuid
 from datetime import datetime, timezone
+from sqlalchemy import UniqueConstraint
 from sqlmodel import Field, SQLModel
 
 
@@ -11,16 +12,21 @@ class GmailDraft(SQLModel, table=True):
     This model stores a reference to created drafts to prevent duplicates
     when the same source message generates multiple draft attempts.
 
-    The combination of (user_id, thread_id, reply_to_msg_id) should be unique
-    to ensure we don't create duplicate drafts for the same reply context.
+    The combination of (user_id, thread_id, reply_to_msg_id, content_hash)
+    is unique: the same reply context can hold several drafts, but never two
+    with the same body.
     """
 
     __tablename__ = "gmail_drafts"
+    __table_args__ = (
+        # Backs the idempotency lookup with a unique btree index
+        UniqueConstraint("user_id", "thread_id", "reply_to_msg_id", "content_hash", name="uq_gmail_drafts_reply_content"),
+    )
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
 
     # User who created the draft
-    user_id: str = Field(index=True)
+    user_id: str
     user_email: str
 
     # Gmail thread and message references
@@ -39,10 +45,3 @@ class GmailDraft(SQLModel, table=True):
     # Timestamps
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-
-    class Config:
-        """SQLModel configuration."""
-        indexes = [
-            # Composite index for finding existing drafts
-            ("user_id", "thread_id", "reply_to_msg_id"),
-        ]
@@ -2,6 +2,7 @@
 
 import uuid
 from datetime import datetime, timezone
+from sqlalchemy import UniqueConstraint
 from sqlmodel import Field, SQLModel
 
 
@@ -11,16 +12,21 @@ class OutlookDraft(SQLModel, table=True):
     This model stores a reference to created Outlook drafts to prevent duplicates
     when the same source message generates multiple draft attempts.
 
-    The combination of (user_id, conversation_id, message_id) should be unique
-    to ensure we don't create duplicate drafts for the same reply context.
+    The combination of (user_id, conversation_id, message_id, content_hash)
+    is unique: the same reply context can hold several drafts, but never two
+    with the same body.
     """
 
     __tablename__ = "outlook_drafts"
+    __table_args__ = (
+        # Backs the idempotency lookup with a unique btree index
+        UniqueConstraint("user_id", "conversation_id", "message_id", "content_hash", name="uq_outlook_drafts_reply_content"),
+    )
 
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
 
     # User who created the draft
-    user_id: str = Field(index=True)
+    user_id: str
     user_email: str
 
     # Outlook conversation and message references
@@ -39,10 +45,3 @@ class OutlookDraft(SQLModel, table=True):
     # Timestamps
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-
-    class Config:
-        """SQLModel configuration."""
-        indexes = [
-            # Composite index for finding existing drafts
-            ("user_id", "conversation_id", "message_id"),
-        ]
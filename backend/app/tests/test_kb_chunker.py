@@ -1,6 +1,6 @@
 """Unit tests for KB chunking and deduplication."""
 import pytest
-from app.kb.chunker import chunk_text, deduplicate_chunks, compute_content_hash, Chunk
+from app.kb.chunker import chunk_text, iter_chunks, deduplicate_chunks, compute_content_hash, Chunk
 
 
 class TestChunker:
@@ -27,6 +27,32 @@ class TestChunker:
         assert len(chunks) == 1
         assert chunks[0].content == text
 
+    def test_chunk_offsets_slice_source_text(self):
+        """Test chunk offsets are character offsets into the source text."""
+        text = "Café naïve résumé — 日本語のテキスト. " * 40
+        chunks = chunk_text(text, chunk_size=30, chunk_overlap=5)
+
+        assert len(chunks) > 1
+        assert all(text[c.start_idx:c.end_idx] == c.content for c in chunks)
+
+    def test_iter_chunks_matches_chunk_text(self):
+        """Test the lazy chunker yields the same chunks as chunk_text."""
+        text = "This is a test. " * 100
+        assert list(iter_chunks(text, chunk_size=50, chunk_overlap=10)) == chunk_text(
+            text, chunk_size=50, chunk_overlap=10
+        )
+
+    def test_chunk_boundaries_survive_insertion(self):
+        """Test inserting text only changes the chunks around the edit."""
+        text = " ".join(f"word{i * 7919 % 10007}" for i in range(3000))
+        edited = text[:500] + " An inserted sentence. " + text[500:]
+
+        original_hashes = {c.content_hash for c in chunk_text(text, chunk_size=200, chunk_overlap=20)}
+        edited_chunks = chunk_text(edited, chunk_size=200, chunk_overlap=20)
+        unchanged = sum(c.content_hash in original_hashes for c in edited_chunks)
+
+        assert unchanged >= len(edited_chunks) - 2
+
     def test_compute_content_hash(self):
         """Test content hash generation."""
         text1 = "Hello, world!"
@@ -43,10 +69,16 @@ class TestChunker:
         # Different content = different hash
         assert hash1 != hash3
 
-        # Hash should be SHA256 (64 hex chars)
-        assert len(hash1) == 64
-        assert all(c in "0123456789abcdef" for c in hash1)
+        # Hash should be a raw 128-bit BLAKE2b digest
+        assert isinstance(hash1, bytes)
+        assert len(hash1) == 16
+
 
+    def test_compute_content_hash_accepts_bytes(self):
+        """Test hashing UTF-8 bytes matches hashing the text."""
+        text = "Hello, wörld!"
+        assert compute_content_hash(text.encode("utf-8")) == compute_content_hash(text)
+        assert compute_content_hash(memoryview(text.encode("utf-8"))) == compute_content_hash(text)
 
 class TestDeduplication:
     """Test chunk deduplication."""
@@ -83,6 +115,15 @@ class TestDeduplication:
         deduped = deduplicate_chunks([])
         assert len(deduped) == 0
 
+    def test_deduplicate_chunks_across_batches(self):
+        """Test a shared seen set deduplicates across successive batches."""
+        chunk_a = Chunk(content="A", content_hash=compute_content_hash("A"), start_idx=0, end_idx=1)
+        chunk_b = Chunk(content="B", content_hash=compute_content_hash("B"), start_idx=1, end_idx=2)
+
+        seen = set()
+        assert deduplicate_chunks([chunk_a], seen) == [chunk_a]
+        assert deduplicate_chunks([chunk_a, chunk_b], seen) == [chunk_b]
+
     def test_deduplicate_preserves_order(self):
         """Test that deduplication preserves order of first occurrences."""
         chunk1 = Chunk(content="A", content_hash=compute_content_hash("A"), start_idx=0, end_idx=1)
@@ -0,0 +1,34 @@
+"""Unit tests for the KB ingest worker."""
+from unittest.mock import AsyncMock, patch
+from app.workers.kb_ingest import WorkerSettings, ingest
+
+
+class TestKBIngestWorker:
+    """Test the Arq ingest job."""
+
+    async def test_ingest_runs_upsert_and_returns_stats(self):
+        """Test the job forwards the document to upsert_document and returns its stats."""
+        stats = {"chunks_total": 3, "chunks_uploaded": 3, "duplicates_skipped": 0, "chunks_already_stored": 0}
+
+        with patch("app.workers.kb_ingest.upsert_document", new_callable=AsyncMock, return_value=stats) as mock_upsert:
+            result = await ingest(
+                {"job_id": "job-1"},
+                file_content="Refunds take 5 days.",
+                workspace_id="workspace-123",
+                title="FAQ",
+                tags=["support"],
+            )
+
+        assert result == stats
+        mock_upsert.assert_awaited_once_with(
+            file_content="Refunds take 5 days.",
+            workspace_id="workspace-123",
+            source="upload",
+            title="FAQ",
+            url=None,
+            tags=["support"],
+        )
+
+    def test_worker_registers_ingest(self):
+        """Test the worker exposes the job the upload route enqueues."""
+        assert ingest in WorkerSettings.functions
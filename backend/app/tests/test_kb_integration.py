@@ -1,8 +1,105 @@
 """Integration tests for KB upload and retrieval."""
+import base64
+import hashlib
+import uuid
+from dataclasses import dataclass
+
+import grpc
+import numpy as np
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, patch, MagicMock
+from qdrant_client import QdrantClient
+from qdrant_client.http.exceptions import ResponseHandlingException
+from qdrant_client.models import Distance, PointStruct, VectorParams
+from app.kb.chunker import chunk_text
+from app.kb.client import workspace_filter
 from app.kb.retrieval import upsert_document, search_kb
+from app.kb import embeddings
+from app.kb.embeddings import _pack_batches
 from app.kb.models import KBSearchResult
+from app.kb.snapshot import SnapshotHit
+
+
+@pytest.fixture(autouse=True)
+def clear_query_embedding_cache():
+    """Start every test without cached query vectors."""
+    embeddings._query_embedding_cache.clear()
+    yield
+    embeddings._query_embedding_cache.clear()
+
+
+# Shared by every test: one embedding as a float list and as the base64
+# float32 payload the API returns with encoding_format="base64"
+EMBEDDING = [0.1] * 1536
+EMBEDDING_B64 = base64.b64encode(np.asarray(EMBEDDING, dtype=np.float32).tobytes()).decode()
+
+
+# Read-only stand-ins for API responses; MagicMock is kept for clients whose calls are asserted
+@dataclass(frozen=True, slots=True)
+class FakeEmbedding:
+    embedding: str
+
+
+@dataclass(frozen=True, slots=True)
+class FakeEmbeddingResponse:
+    data: tuple[FakeEmbedding, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class FakeHit:
+    id: str
+    score: float = 0.0
+    payload: dict | None = None
+    vector: list[float] | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class FakeQueryResponse:
+    points: tuple[FakeHit, ...] = ()
+
+
+@dataclass(frozen=True, slots=True)
+class FakeRawResponse:
+    headers: dict[str, str]
+    response: FakeEmbeddingResponse
+
+    def parse(self) -> FakeEmbeddingResponse:
+        return self.response
+
+
+class FakeRpcError(grpc.RpcError):
+    """gRPC failure with a status code, as raised by Qdrant's gRPC client."""
+
+    def __init__(self, code: grpc.StatusCode):
+        super().__init__(code.name)
+        self._code = code
+
+    def code(self) -> grpc.StatusCode:
+        return self._code
+
+
+EMBEDDING_ITEM = FakeEmbedding(EMBEDDING_B64)
+QUERY_EMBEDDING_RESPONSE = FakeEmbeddingResponse((EMBEDDING_ITEM,))
+NO_HITS = FakeQueryResponse()
+# Qdrant scroll result: no workspace stores the chunk yet
+NO_STORED_COPIES = ([], None)
+
+
+def _fake_embeddings(**kwargs):
+    """Return one base64 float32 embedding per input, like the OpenAI embeddings endpoint."""
+    # The frozen item is shared, so large batches cost one tuple, not an object per input
+    return FakeEmbeddingResponse((EMBEDDING_ITEM,) * len(kwargs["input"]))
+
+
+def _fake_raw_embeddings(**kwargs):
+    """Raw embeddings response with rate limit headers, as from with_raw_response."""
+    headers = {
+        "x-ratelimit-remaining-requests": "4999",
+        "x-ratelimit-reset-requests": "12ms",
+        "x-ratelimit-remaining-tokens": "4999000",
+        "x-ratelimit-reset-tokens": "6ms",
+    }
+    return FakeRawResponse(headers, _fake_embeddings(**kwargs))
 
 
 class TestKBIntegration:
@@ -10,23 +107,22 @@ class TestKBIntegration:
 
     @patch("app.kb.retrieval.get_qdrant_client")
     @patch("app.kb.retrieval.ensure_collection_exists")
-    @patch("app.kb.embeddings.get_openai_client")
-    def test_upsert_document_basic(self, mock_openai, mock_ensure_collection, mock_qdrant):
+    @patch("app.kb.embeddings.get_async_openai_client")
+    async def test_upsert_document_basic(self, mock_openai, mock_ensure_collection, mock_qdrant):
         """Test basic document upload and chunking."""
         # Mock OpenAI client
         mock_openai_instance = MagicMock()
-        mock_response = Mock()
-        mock_response.data = [Mock(embedding=[0.1] * 1536) for _ in range(3)]
-        mock_openai_instance.embeddings.create.return_value = mock_response
+        mock_openai_instance.embeddings.with_raw_response.create = AsyncMock(side_effect=_fake_raw_embeddings)
         mock_openai.return_value = mock_openai_instance
 
         # Mock Qdrant client
         mock_qdrant_instance = MagicMock()
+        mock_qdrant_instance.scroll.return_value = NO_STORED_COPIES
         mock_qdrant.return_value = mock_qdrant_instance
 
         # Upload a simple document
         text = "This is a test document. " * 100
-        result = upsert_document(
+        result = await upsert_document(
             file_content=text,
             workspace_id="workspace-123",
             source="upload",
@@ -43,30 +139,33 @@ class TestKBIntegration:
         mock_ensure_collection.assert_called_once()
 
         # Verify embeddings were generated
-        mock_openai_instance.embeddings.create.assert_called()
+        mock_openai_instance.embeddings.with_raw_response.create.assert_called()
 
         # Verify upsert was called
         mock_qdrant_instance.upsert.assert_called_once()
+        points = mock_qdrant_instance.upsert.call_args[1]["points"]
+        assert len(points.ids) == len(points.vectors) == len(points.payloads)
+        assert points.vectors[0] == pytest.approx(EMBEDDING)
+        assert points.payloads[0]["workspace_id"] == "workspace-123"
 
     @patch("app.kb.retrieval.get_qdrant_client")
     @patch("app.kb.retrieval.ensure_collection_exists")
-    @patch("app.kb.embeddings.get_openai_client")
-    def test_upsert_document_deduplication(self, mock_openai, mock_ensure_collection, mock_qdrant):
+    @patch("app.kb.embeddings.get_async_openai_client")
+    async def test_upsert_document_deduplication(self, mock_openai, mock_ensure_collection, mock_qdrant):
         """Test that deduplication works during upload."""
         # Mock OpenAI client
         mock_openai_instance = MagicMock()
-        mock_response = Mock()
-        mock_response.data = [Mock(embedding=[0.1] * 1536)]
-        mock_openai_instance.embeddings.create.return_value = mock_response
+        mock_openai_instance.embeddings.with_raw_response.create = AsyncMock(side_effect=_fake_raw_embeddings)
         mock_openai.return_value = mock_openai_instance
 
         # Mock Qdrant client
         mock_qdrant_instance = MagicMock()
+        mock_qdrant_instance.scroll.return_value = NO_STORED_COPIES
         mock_qdrant.return_value = mock_qdrant_instance
 
         # Upload document with repeated content
         text = "Exact same sentence. " * 200  # Will create duplicate chunks
-        result = upsert_document(
+        result = await upsert_document(
             file_content=text,
             workspace_id="workspace-123",
             source="upload",
@@ -76,30 +175,181 @@ class TestKBIntegration:
         assert result["duplicates_skipped"] >= 0
         assert result["chunks_uploaded"] > 0
 
+    @patch("app.kb.retrieval.get_qdrant_client")
+    @patch("app.kb.retrieval.ensure_collection_exists")
+    @patch("app.kb.embeddings.get_async_openai_client")
+    async def test_upsert_document_skips_stored_chunks(self, mock_openai, mock_ensure_collection, mock_qdrant):
+        """Test chunks already stored for the workspace aren't re-embedded."""
+        mock_openai_instance = MagicMock()
+        mock_openai_instance.embeddings.with_raw_response.create = AsyncMock()
+        mock_openai.return_value = mock_openai_instance
+
+        # Every requested point already exists for this workspace
+        mock_qdrant_instance = MagicMock()
+        mock_qdrant_instance.retrieve.side_effect = lambda **kwargs: [
+            FakeHit(point_id, payload={"workspace_id": "workspace-123"}, vector=EMBEDDING)
+            for point_id in kwargs["ids"]
+        ]
+        mock_qdrant.return_value = mock_qdrant_instance
+
+        result = await upsert_document(
+            file_content="This is a test document. " * 100,
+            workspace_id="workspace-123",
+        )
+
+        assert result["chunks_uploaded"] == 0
+        assert result["chunks_already_stored"] + result["duplicates_skipped"] == result["chunks_total"]
+        mock_openai_instance.embeddings.with_raw_response.create.assert_not_called()
+        mock_qdrant_instance.upsert.assert_not_called()
+
+    @patch("app.kb.retrieval.get_qdrant_client")
+    @patch("app.kb.retrieval.ensure_collection_exists")
+    @patch("app.kb.embeddings.get_async_openai_client")
+    async def test_upsert_document_reuses_other_workspace_vectors(self, mock_openai, mock_ensure_collection, mock_qdrant):
+        """Test identical chunks from another workspace are copied into new points, not re-embedded or overwritten."""
+        mock_openai_instance = MagicMock()
+        mock_openai_instance.embeddings.with_raw_response.create = AsyncMock()
+        mock_openai.return_value = mock_openai_instance
+
+        # Nothing stored for this workspace; every chunk stored by another one
+        mock_qdrant_instance = MagicMock()
+        mock_qdrant_instance.retrieve.return_value = []
+        mock_qdrant_instance.scroll.side_effect = lambda **kwargs: (
+            [
+                FakeHit(f"other-{content_hash}", payload={"content_hash": content_hash}, vector=EMBEDDING)
+                for content_hash in kwargs["scroll_filter"].must[0].match.any
+            ],
+            None,
+        )
+        mock_qdrant.return_value = mock_qdrant_instance
+
+        text = "This is a test document. " * 100
+        result = await upsert_document(file_content=text, workspace_id="workspace-123")
+        points = mock_qdrant_instance.upsert.call_args[1]["points"]
+
+        assert result["chunks_uploaded"] == len(points.ids) > 0
+        assert points.vectors[0] == pytest.approx(EMBEDDING)
+        assert {payload["workspace_id"] for payload in points.payloads} == {"workspace-123"}
+        assert not any(point_id.startswith("other-") for point_id in points.ids)
+        mock_openai_instance.embeddings.with_raw_response.create.assert_not_called()
+
+        # The same content gets distinct point IDs in another workspace
+        mock_qdrant_instance.upsert.reset_mock()
+        await upsert_document(file_content=text, workspace_id="workspace-456")
+        other_ids = mock_qdrant_instance.upsert.call_args[1]["points"].ids
+        assert set(other_ids).isdisjoint(points.ids)
+
+    @patch("app.kb.retrieval.get_qdrant_client")
+    @patch("app.kb.retrieval.ensure_collection_exists")
+    @patch("app.kb.embeddings.get_async_openai_client")
+    async def test_upsert_document_replaces_points_under_old_ids(self, mock_openai, mock_ensure_collection, mock_qdrant):
+        """Test re-uploading after a point ID change leaves one point per chunk."""
+        mock_openai_instance = MagicMock()
+        mock_openai_instance.embeddings.with_raw_response.create = AsyncMock(side_effect=_fake_raw_embeddings)
+        mock_openai.return_value = mock_openai_instance
+
+        client = QdrantClient(":memory:")
+        client.create_collection("kb", vectors_config=VectorParams(size=len(EMBEDDING), distance=Distance.COSINE))
+        mock_qdrant.return_value = client
+
+        # Chunks stored by earlier schemes: unscoped point IDs seeded by
+        # SHA-256 hashes (this workspace) and BLAKE2b hashes (another one)
+        text = " ".join(f"Sentence number {i} of the handbook." for i in range(800))
+        chunks = chunk_text(text, chunk_size=800, chunk_overlap=200)
+        old_points = []
+        for workspace_id, hash_text in (
+            ("workspace-123", lambda data: hashlib.sha256(data).hexdigest()),
+            ("workspace-456", lambda data: hashlib.blake2b(data, digest_size=16).hexdigest()),
+        ):
+            for chunk in chunks:
+                content_hash = hash_text(chunk.content.encode("utf-8"))
+                old_points.append(PointStruct(
+                    id=str(uuid.uuid5(uuid.NAMESPACE_DNS, content_hash)),
+                    vector=EMBEDDING,
+                    payload={"workspace_id": workspace_id, "content": chunk.content, "content_hash": content_hash},
+                ))
+        client.upsert("kb", points=old_points)
+
+        result = await upsert_document(file_content=text, workspace_id="workspace-123", collection_name="kb")
+
+        def count(workspace_id):
+            return client.count("kb", count_filter=workspace_filter(workspace_id), exact=True).count
+
+        assert result["chunks_uploaded"] == len(chunks) > 1
+        assert count("workspace-123") == len(chunks)
+        # Other workspaces' points are left alone
+        assert count("workspace-456") == len(chunks)
+
+    @patch("app.kb.retrieval._POINTS_PER_UPSERT", 2)
+    @patch("app.kb.retrieval.get_qdrant_client")
+    @patch("app.kb.retrieval.ensure_collection_exists")
+    @patch("app.kb.embeddings.get_async_openai_client")
+    async def test_upsert_document_writes_batches_concurrently(self, mock_openai, mock_ensure_collection, mock_qdrant):
+        """Test every point is written once across the concurrent writers."""
+        mock_openai_instance = MagicMock()
+        mock_openai_instance.embeddings.with_raw_response.create = AsyncMock(side_effect=_fake_raw_embeddings)
+        mock_openai.return_value = mock_openai_instance
+        mock_qdrant_instance = MagicMock()
+        mock_qdrant_instance.scroll.return_value = NO_STORED_COPIES
+        mock_qdrant_instance.retrieve.return_value = []
+        mock_qdrant.return_value = mock_qdrant_instance
+
+        result = await upsert_document(
+            file_content=" ".join(f"word{i * 7919 % 10007}" for i in range(3000)),
+            workspace_id="workspace-123",
+        )
+
+        calls = mock_qdrant_instance.upsert.call_args_list
+        written = [point_id for call in calls for point_id in call[1]["points"].ids]
+        assert len(calls) > 2
+        assert sorted(written) == sorted(set(written))
+        assert len(written) == result["chunks_uploaded"]
+        # Each writer waits on its final batch only
+        assert sum(call[1]["wait"] for call in calls) == 2
+
+    @patch("app.kb.retrieval.get_qdrant_client")
+    @patch("app.kb.retrieval.ensure_collection_exists")
+    @patch("app.kb.embeddings.get_async_openai_client")
+    async def test_upsert_document_surfaces_upsert_errors(self, mock_openai, mock_ensure_collection, mock_qdrant):
+        """Test a failed Qdrant write propagates from the pipelined upload."""
+        mock_openai_instance = MagicMock()
+        mock_openai_instance.embeddings.with_raw_response.create = AsyncMock(side_effect=_fake_raw_embeddings)
+        mock_openai.return_value = mock_openai_instance
+
+        mock_qdrant_instance = MagicMock()
+        mock_qdrant_instance.scroll.return_value = NO_STORED_COPIES
+        mock_qdrant_instance.upsert.side_effect = RuntimeError("qdrant down")
+        mock_qdrant.return_value = mock_qdrant_instance
+
+        with pytest.raises(RuntimeError, match="qdrant down"):
+            await upsert_document(
+                file_content="This is a test document. " * 100,
+                workspace_id="workspace-123",
+            )
+
     @patch("app.kb.retrieval.get_qdrant_client")
     @patch("app.kb.embeddings.get_openai_client")
     def test_search_kb_basic(self, mock_openai, mock_qdrant):
         """Test basic KB search functionality."""
         # Mock OpenAI client for query embedding
         mock_openai_instance = MagicMock()
-        mock_response = Mock()
-        mock_response.data = [Mock(embedding=[0.1] * 1536)]
-        mock_openai_instance.embeddings.create.return_value = mock_response
+        mock_openai_instance.embeddings.create.return_value = QUERY_EMBEDDING_RESPONSE
         mock_openai.return_value = mock_openai_instance
 
         # Mock Qdrant search results
         mock_qdrant_instance = MagicMock()
-        mock_hit = Mock()
-        mock_hit.id = "test-id-123"
-        mock_hit.score = 0.95
-        mock_hit.payload = {
-            "workspace_id": "workspace-123",
-            "source": "upload",
-            "title": "Test Doc",
-            "content": "Relevant content here",
-            "tags": ["test"],
-        }
-        mock_qdrant_instance.search.return_value = [mock_hit]
+        hit = FakeHit(
+            "test-id-123",
+            score=0.95,
+            payload={
+                "workspace_id": "workspace-123",
+                "source": "upload",
+                "title": "Test Doc",
+                "content": "Relevant content here",
+                "tags": ["test"],
+            },
+        )
+        mock_qdrant_instance.query_points.return_value = FakeQueryResponse((hit,))
         mock_qdrant.return_value = mock_qdrant_instance
 
         # Perform search
@@ -117,10 +367,11 @@ class TestKBIntegration:
         assert results[0].workspace_id == "workspace-123"
 
         # Verify Qdrant search was called with correct params
-        mock_qdrant_instance.search.assert_called_once()
-        call_kwargs = mock_qdrant_instance.search.call_args[1]
+        mock_qdrant_instance.query_points.assert_called_once()
+        call_kwargs = mock_qdrant_instance.query_points.call_args[1]
         assert call_kwargs["limit"] == 5
         assert call_kwargs["with_vectors"] == False  # Default optimization
+        assert call_kwargs["search_params"].quantization.rescore is True
 
     @patch("app.kb.retrieval.get_qdrant_client")
     @patch("app.kb.embeddings.get_openai_client")
@@ -128,14 +379,12 @@ class TestKBIntegration:
         """Test KB search with vectors enabled (debug mode)."""
         # Mock OpenAI
         mock_openai_instance = MagicMock()
-        mock_response = Mock()
-        mock_response.data = [Mock(embedding=[0.1] * 1536)]
-        mock_openai_instance.embeddings.create.return_value = mock_response
+        mock_openai_instance.embeddings.create.return_value = QUERY_EMBEDDING_RESPONSE
         mock_openai.return_value = mock_openai_instance
 
         # Mock Qdrant
         mock_qdrant_instance = MagicMock()
-        mock_qdrant_instance.search.return_value = []
+        mock_qdrant_instance.query_points.return_value = NO_HITS
         mock_qdrant.return_value = mock_qdrant_instance
 
         # Search with vectors enabled
@@ -147,7 +396,7 @@ class TestKBIntegration:
         )
 
         # Verify with_vectors flag was passed
-        call_kwargs = mock_qdrant_instance.search.call_args[1]
+        call_kwargs = mock_qdrant_instance.query_points.call_args[1]
         assert call_kwargs["with_vectors"] == True
 
     @patch("app.kb.retrieval.get_qdrant_client")
@@ -156,14 +405,12 @@ class TestKBIntegration:
         """Test that search filters by workspace_id."""
         # Mock OpenAI
         mock_openai_instance = MagicMock()
-        mock_response = Mock()
-        mock_response.data = [Mock(embedding=[0.1] * 1536)]
-        mock_openai_instance.embeddings.create.return_value = mock_response
+        mock_openai_instance.embeddings.create.return_value = QUERY_EMBEDDING_RESPONSE
         mock_openai.return_value = mock_openai_instance
 
         # Mock Qdrant
         mock_qdrant_instance = MagicMock()
-        mock_qdrant_instance.search.return_value = []
+        mock_qdrant_instance.query_points.return_value = NO_HITS
         mock_qdrant.return_value = mock_qdrant_instance
 
         # Search with specific workspace
@@ -174,8 +421,168 @@ class TestKBIntegration:
         )
 
         # Verify workspace filter was applied
-        call_kwargs = mock_qdrant_instance.search.call_args[1]
+        call_kwargs = mock_qdrant_instance.query_points.call_args[1]
         assert "query_filter" in call_kwargs
         # Filter should contain workspace_id condition
         filter_obj = call_kwargs["query_filter"]
         assert filter_obj is not None
+
+    @patch("app.kb.retrieval.get_qdrant_client")
+    @patch("app.kb.embeddings.get_openai_client")
+    def test_search_kb_reuses_query_embedding(self, mock_openai, mock_qdrant):
+        """Test repeated searches for the same query embed it once."""
+        mock_openai_instance = MagicMock()
+        mock_openai_instance.embeddings.create.return_value = QUERY_EMBEDDING_RESPONSE
+        mock_openai.return_value = mock_openai_instance
+
+        mock_qdrant_instance = MagicMock()
+        mock_qdrant_instance.query_points.return_value = NO_HITS
+        mock_qdrant.return_value = mock_qdrant_instance
+
+        search_kb(query="refund policy", workspace_id="workspace-123")
+        search_kb(query="  refund   policy ", workspace_id="workspace-123")
+
+        assert mock_openai_instance.embeddings.create.call_count == 1
+        assert mock_qdrant_instance.query_points.call_count == 2
+        assert mock_qdrant_instance.query_points.call_args[1]["query"] == pytest.approx(EMBEDDING)
+
+    @patch("app.kb.retrieval.collection_has_sparse_vectors", return_value=True)
+    @patch("app.kb.retrieval.get_qdrant_client")
+    @patch("app.kb.embeddings.get_openai_client")
+    def test_search_kb_short_query_uses_sparse_vectors(self, mock_openai, mock_qdrant, mock_has_sparse):
+        """Test keyword queries hit the BM25 vectors without embedding the query."""
+        hit = FakeHit("chunk-1", score=3.2, payload={"content": "Refunds take 5 days", "workspace_id": "workspace-123"})
+        mock_qdrant_instance = MagicMock()
+        mock_qdrant_instance.query_points.return_value = FakeQueryResponse((hit,))
+        mock_qdrant.return_value = mock_qdrant_instance
+
+        results = search_kb(query="refund", workspace_id="workspace-123")
+
+        assert [r.chunk_id for r in results] == ["chunk-1"]
+        call_kwargs = mock_qdrant_instance.query_points.call_args[1]
+        assert call_kwargs["using"] == "text"
+        assert call_kwargs["query"].indices
+        mock_openai.assert_not_called()
+
+    @patch("app.kb.retrieval.collection_has_sparse_vectors", return_value=True)
+    @patch("app.kb.retrieval.get_qdrant_client")
+    @patch("app.kb.embeddings.get_openai_client")
+    def test_search_kb_short_query_falls_back_to_dense(self, mock_openai, mock_qdrant, mock_has_sparse):
+        """Test a keyword query with no BM25 hits falls back to dense search."""
+        mock_openai_instance = MagicMock()
+        mock_openai_instance.embeddings.create.return_value = QUERY_EMBEDDING_RESPONSE
+        mock_openai.return_value = mock_openai_instance
+
+        mock_qdrant_instance = MagicMock()
+        mock_qdrant_instance.query_points.side_effect = [NO_HITS, NO_HITS]
+        mock_qdrant.return_value = mock_qdrant_instance
+
+        search_kb(query="refund", workspace_id="workspace-123")
+
+        assert mock_qdrant_instance.query_points.call_count == 2
+        dense_kwargs = mock_qdrant_instance.query_points.call_args[1]
+        assert "using" not in dense_kwargs
+        assert dense_kwargs["query"] == pytest.approx(EMBEDDING)
+
+    @patch("app.kb.retrieval.search_snapshot")
+    @patch("app.kb.retrieval.get_qdrant_client")
+    @patch("app.kb.embeddings.get_openai_client")
+    def test_search_kb_falls_back_to_snapshot(self, mock_openai, mock_qdrant, mock_search_snapshot):
+        """Test an unreachable Qdrant is answered from the local snapshot."""
+        mock_openai_instance = MagicMock()
+        mock_openai_instance.embeddings.create.return_value = QUERY_EMBEDDING_RESPONSE
+        mock_openai.return_value = mock_openai_instance
+        mock_qdrant_instance = MagicMock()
+        mock_qdrant_instance.query_points.side_effect = ResponseHandlingException(ConnectionError("refused"))
+        mock_qdrant.return_value = mock_qdrant_instance
+        mock_search_snapshot.return_value = [
+            SnapshotHit("chunk-1", 0.9, {"content": "Refunds take 5 days", "workspace_id": "workspace-123"}),
+        ]
+
+        results = search_kb(query="how long do refunds take", workspace_id="workspace-123")
+
+        assert [(r.chunk_id, r.score) for r in results] == [("chunk-1", 0.9)]
+        mock_search_snapshot.assert_called_once()
+
+    @patch("app.kb.retrieval.search_snapshot", return_value=None)
+    @patch("app.kb.retrieval.get_qdrant_client")
+    @patch("app.kb.embeddings.get_openai_client")
+    def test_search_kb_without_snapshot_raises(self, mock_openai, mock_qdrant, mock_search_snapshot):
+        """Test the Qdrant error propagates when there is no snapshot to fall back on."""
+        mock_openai_instance = MagicMock()
+        mock_openai_instance.embeddings.create.return_value = QUERY_EMBEDDING_RESPONSE
+        mock_openai.return_value = mock_openai_instance
+        mock_qdrant_instance = MagicMock()
+        mock_qdrant_instance.query_points.side_effect = ResponseHandlingException(ConnectionError("refused"))
+        mock_qdrant.return_value = mock_qdrant_instance
+
+        with pytest.raises(ResponseHandlingException):
+            search_kb(query="how long do refunds take", workspace_id="workspace-123")
+
+    @pytest.mark.parametrize(
+        "code, falls_back",
+        [
+            (grpc.StatusCode.UNAVAILABLE, True),
+            (grpc.StatusCode.DEADLINE_EXCEEDED, True),
+            (grpc.StatusCode.INVALID_ARGUMENT, False),
+            (grpc.StatusCode.NOT_FOUND, False),
+        ],
+    )
+    @patch("app.kb.retrieval.search_snapshot")
+    @patch("app.kb.retrieval.get_qdrant_client")
+    @patch("app.kb.embeddings.get_openai_client")
+    def test_search_kb_grpc_errors(self, mock_openai, mock_qdrant, mock_search_snapshot, code, falls_back):
+        """Test only gRPC errors meaning Qdrant is unreachable are served from the snapshot."""
+        mock_openai_instance = MagicMock()
+        mock_openai_instance.embeddings.create.return_value = QUERY_EMBEDDING_RESPONSE
+        mock_openai.return_value = mock_openai_instance
+        mock_qdrant_instance = MagicMock()
+        mock_qdrant_instance.query_points.side_effect = FakeRpcError(code)
+        mock_qdrant.return_value = mock_qdrant_instance
+        mock_search_snapshot.return_value = []
+
+        if falls_back:
+            assert search_kb(query="how long do refunds take", workspace_id="workspace-123") == []
+        else:
+            with pytest.raises(grpc.RpcError):
+                search_kb(query="how long do refunds take", workspace_id="workspace-123")
+        assert mock_search_snapshot.called == falls_back
+
+    @patch("app.kb.retrieval.collection_has_sparse_vectors", return_value=True)
+    @patch("app.kb.retrieval.get_qdrant_client")
+    @patch("app.kb.retrieval.ensure_collection_exists")
+    @patch("app.kb.embeddings.get_async_openai_client")
+    async def test_upsert_document_writes_sparse_vectors(self, mock_openai, mock_ensure_collection, mock_qdrant, mock_has_sparse):
+        """Test collections with sparse vectors get dense and BM25 vectors per point."""
+        mock_openai_instance = MagicMock()
+        mock_openai_instance.embeddings.with_raw_response.create = AsyncMock(side_effect=_fake_raw_embeddings)
+        mock_openai.return_value = mock_openai_instance
+        mock_qdrant_instance = MagicMock()
+        mock_qdrant_instance.scroll.return_value = NO_STORED_COPIES
+        mock_qdrant.return_value = mock_qdrant_instance
+
+        await upsert_document(
+            file_content="This is a test document. " * 100,
+            workspace_id="workspace-123",
+        )
+
+        points = mock_qdrant_instance.upsert.call_args[1]["points"]
+        assert set(points.vectors) == {"", "text"}
+        assert len(points.vectors[""]) == len(points.vectors["text"]) == len(points.ids)
+
+
+class TestEmbeddingBatching:
+    """Test token-budgeted packing of embedding requests."""
+
+    @patch("app.kb.embeddings._get_model_encoding", return_value=None)
+    def test_pack_batches_respects_token_budget(self, mock_encoding):
+        """Test batches close before exceeding the token budget."""
+        texts = ["a" * 40, "b" * 40, "c" * 40, "d" * 10]
+        batches = _pack_batches(texts, "text-embedding-3-small", max_inputs=10, max_tokens=90)
+        assert batches == [(0, 2, 80), (2, 4, 50)]
+
+    @patch("app.kb.embeddings._get_model_encoding", return_value=None)
+    def test_pack_batches_respects_input_cap(self, mock_encoding):
+        """Test batches close at the input cap."""
+        batches = _pack_batches(["x"] * 5, "text-embedding-3-small", max_inputs=2, max_tokens=1000)
+        assert batches == [(0, 2, 2), (2, 4, 2), (4, 5, 1)]
@@ -0,0 +1,48 @@
+"""Unit tests for KB near-duplicate detection."""
+from app.kb.chunker import Chunk, compute_content_hash
+from app.kb.minhash import MinHashLSH, deduplicate_near_chunks, minhash_signature
+
+
+def _chunk(text: str) -> Chunk:
+    return Chunk(content=text, content_hash=compute_content_hash(text), start_idx=0, end_idx=len(text))
+
+
+BASE_TEXT = " ".join(f"word{i}" for i in range(300))
+
+
+class TestMinHash:
+    """Test MinHash signatures and LSH near-duplicate filtering."""
+
+    def test_signature_ignores_whitespace_reflow(self):
+        """Test reformatted whitespace yields the same signature."""
+        reflowed = "\n  ".join(BASE_TEXT.split())
+        assert (minhash_signature(BASE_TEXT) == minhash_signature(reflowed)).all()
+
+    def test_near_duplicate_is_dropped(self):
+        """Test a lightly edited copy is filtered out."""
+        words = BASE_TEXT.split()
+        edited = " ".join(words[:-2] + ["changed", "ending"])
+
+        kept = deduplicate_near_chunks([_chunk(BASE_TEXT), _chunk(edited)])
+
+        assert [c.content for c in kept] == [BASE_TEXT]
+
+    def test_distinct_chunks_are_kept(self):
+        """Test unrelated chunks all survive."""
+        other = " ".join(f"term{i}" for i in range(300))
+
+        kept = deduplicate_near_chunks([_chunk(BASE_TEXT), _chunk(other)])
+
+        assert len(kept) == 2
+
+    def test_index_persists_across_batches(self):
+        """Test a shared index filters near-duplicates in later batches."""
+        lsh = MinHashLSH()
+        reflowed = "\n".join(BASE_TEXT.split())
+
+        assert len(deduplicate_near_chunks([_chunk(BASE_TEXT)], lsh)) == 1
+        assert deduplicate_near_chunks([_chunk(reflowed)], lsh) == []
+
+    def test_short_text(self):
+        """Test text shorter than a shingle still gets a signature."""
+        assert len(minhash_signature("hi")) == len(minhash_signature(BASE_TEXT))
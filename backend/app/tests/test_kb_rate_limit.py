@@ -0,0 +1,71 @@
+"""Unit tests for OpenAI rate limit pacing."""
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.kb.rate_limit import OpenAIRateLimiter, _parse_reset
+
+
+class TestOpenAIRateLimiter:
+    """Test header parsing and request pacing."""
+
+    @pytest.mark.parametrize("value,expected", [
+        ("1s", 1.0),
+        ("120ms", 0.12),
+        ("6m0s", 360.0),
+        ("1h2m3.5s", 3723.5),
+        ("", None),
+        ("soon", None),
+    ])
+    def test_parse_reset(self, value, expected):
+        """Test OpenAI reset durations parse to seconds."""
+        if expected is None:
+            assert _parse_reset(value) is None
+        else:
+            assert _parse_reset(value) == pytest.approx(expected)
+
+    async def test_acquire_without_headers_does_not_wait(self):
+        """Test nothing is held back before any limits are known."""
+        limiter = OpenAIRateLimiter()
+
+        with patch("app.kb.rate_limit.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            await limiter.acquire(10_000)
+
+        mock_sleep.assert_not_called()
+
+    async def test_acquire_waits_for_token_reset(self):
+        """Test a request larger than the remaining token budget waits for the reset."""
+        limiter = OpenAIRateLimiter()
+        limiter.update({
+            "x-ratelimit-remaining-requests": "100",
+            "x-ratelimit-reset-requests": "1s",
+            "x-ratelimit-remaining-tokens": "500",
+            "x-ratelimit-reset-tokens": "2s",
+        })
+
+        async def fake_sleep(delay):
+            # Simulate the reset passing while asleep
+            limiter._tokens_reset_at -= delay
+
+        with patch("app.kb.rate_limit.asyncio.sleep", side_effect=fake_sleep) as mock_sleep:
+            await limiter.acquire(400)
+            mock_sleep.assert_not_called()
+            await limiter.acquire(400)
+
+        mock_sleep.assert_called_once()
+        assert mock_sleep.call_args[0][0] == pytest.approx(2.0, abs=0.1)
+
+    async def test_acquire_waits_when_requests_exhausted(self):
+        """Test no request is sent once the request budget is used up."""
+        limiter = OpenAIRateLimiter()
+        limiter.update({
+            "x-ratelimit-remaining-requests": "1",
+            "x-ratelimit-reset-requests": "500ms",
+        })
+
+        async def fake_sleep(delay):
+            limiter._requests_reset_at -= delay
+
+        with patch("app.kb.rate_limit.asyncio.sleep", side_effect=fake_sleep) as mock_sleep:
+            await limiter.acquire(1)
+            await limiter.acquire(1)
+
+        mock_sleep.assert_called_once()
@@ -0,0 +1,92 @@
+"""Unit tests for local KB snapshots and the brute-force fallback search."""
+import numpy as np
+import orjson
+import pytest
+from unittest.mock import MagicMock, patch
+from qdrant_client.models import Record
+from app.kb.snapshot import search_snapshot, snapshot_workspace
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path):
+    with patch("app.kb.snapshot.settings") as mock_settings:
+        mock_settings.KB_SNAPSHOT_DIR = str(tmp_path)
+        yield tmp_path
+
+
+def _record(point_id: str, vector, content: str) -> Record:
+    return Record(id=point_id, vector=vector, payload={"content": content, "workspace_id": "ws"})
+
+
+class TestKBSnapshot:
+    """Test snapshot writing and brute-force cosine search."""
+
+    def test_search_ranks_by_cosine_similarity(self, snapshot_dir):
+        """Test the fallback returns the closest vectors first."""
+        records = [
+            _record("a", [1.0, 0.0, 0.0], "x axis"),
+            _record("b", {"": [0.0, 2.0, 0.0]}, "y axis"),
+            _record("c", [0.7, 0.7, 0.0], "diagonal"),
+        ]
+        client = MagicMock()
+        client.scroll.return_value = (records, None)
+
+        with patch("app.kb.snapshot.get_qdrant_client", return_value=client):
+            assert snapshot_workspace("kb", "ws") == 3
+
+        hits = search_snapshot("kb", "ws", [0.0, 1.0, 0.1], k=2)
+
+        assert [hit.point_id for hit in hits] == ["b", "c"]
+        assert hits[0].score == pytest.approx(0.995, abs=1e-2)
+        assert hits[1].payload["content"] == "diagonal"
+
+    def test_snapshot_pages_through_scroll(self, snapshot_dir):
+        """Test every scroll page ends up in the snapshot."""
+        client = MagicMock()
+        client.scroll.side_effect = [
+            ([_record("a", [1.0, 0.0], "first")], "next"),
+            ([_record("b", [0.0, 1.0], "second")], None),
+        ]
+
+        with patch("app.kb.snapshot.get_qdrant_client", return_value=client):
+            assert snapshot_workspace("kb", "ws") == 2
+
+        assert client.scroll.call_args_list[1].kwargs["offset"] == "next"
+        vectors = np.load(next(snapshot_dir.glob("kb/*.npy")))
+        assert vectors.dtype == np.float16
+
+    def test_refresh_replaces_generation(self, snapshot_dir):
+        """Test a refresh publishes a new vector file and removes the old one."""
+        client = MagicMock()
+        client.scroll.side_effect = [
+            ([_record("a", [1.0, 0.0], "old")], None),
+            ([_record("a", [1.0, 0.0], "new"), _record("b", [0.0, 1.0], "added")], None),
+        ]
+
+        with patch("app.kb.snapshot.get_qdrant_client", return_value=client):
+            snapshot_workspace("kb", "ws")
+            assert search_snapshot("kb", "ws", [1.0, 0.0], k=5)[0].payload["content"] == "old"
+            snapshot_workspace("kb", "ws")
+
+        hits = search_snapshot("kb", "ws", [0.0, 1.0], k=5)
+        assert [hit.point_id for hit in hits] == ["b", "a"]
+        assert len(list(snapshot_dir.glob("kb/*.npy"))) == 1
+        assert not list(snapshot_dir.glob("kb/*.tmp"))
+
+    def test_mismatched_snapshot_is_ignored(self, snapshot_dir):
+        """Test metadata that doesn't match its vector file is treated as no snapshot."""
+        client = MagicMock()
+        client.scroll.return_value = ([_record("a", [1.0, 0.0], "first")], None)
+
+        with patch("app.kb.snapshot.get_qdrant_client", return_value=client):
+            snapshot_workspace("kb", "ws")
+
+        meta_path = next(snapshot_dir.glob("kb/*.json"))
+        meta = orjson.loads(meta_path.read_bytes())
+        meta_path.write_bytes(orjson.dumps({**meta, "ids": ["a", "b"]}))
+
+        assert search_snapshot("kb", "ws", [1.0, 0.0], k=5) is None
+
+    def test_missing_snapshot(self, snapshot_dir):
+        """Test searching without a snapshot returns None."""
+        assert search_snapshot("kb", "unknown", [1.0, 0.0], k=5) is None
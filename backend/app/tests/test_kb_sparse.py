@@ -0,0 +1,28 @@
+"""Unit tests for KB BM25 sparse vectors."""
+from app.kb.sparse import bm25_document_vector, bm25_query_vector
+
+
+class TestSparseVectors:
+    """Test BM25 sparse vector construction."""
+
+    def test_query_terms_match_document_terms(self):
+        """Test query and document vectors share indices for the same words."""
+        doc = bm25_document_vector("Refund requests are processed within five days.")
+        query = bm25_query_vector("REFUND days")
+
+        assert set(query.indices) <= set(doc.indices)
+        assert query.values == [1.0, 1.0]
+
+    def test_repeated_terms_saturate(self):
+        """Test term weights grow with frequency but stay below k1 + 1."""
+        once = bm25_document_vector("invoice")
+        many = bm25_document_vector("invoice " * 50)
+
+        assert many.values[0] > once.values[0]
+        assert many.values[0] < 2.2
+
+    def test_indices_sorted_and_unique(self):
+        """Test vectors are well-formed for Qdrant."""
+        vector = bm25_document_vector("b a c a b")
+        assert vector.indices == sorted(set(vector.indices))
+        assert len(vector.indices) == len(vector.values) == 3
@@ -97,6 +97,78 @@ def test_policy_guard_multiple_violations():
     assert any("money back guarantee" in v.lower() for v in result["violations"])
 
 
+def test_policy_guard_deduplicates_phrases():
+    """Test that PolicyGuard reports each normalised phrase once."""
+    state: DraftCrewState = {
+        "original_message_summary": "Test message",
+        "workspace_id": "test-workspace",
+        "thread_id": None,
+        "intent": "support",
+        "confidence": 0.9,
+        "context_snippets": [],
+        "draft_html": "<p>Start your free\n  trial today</p>",
+        "violations": [],
+        "tone_level": 3,
+        "style_json": {},
+        "blocklist": ["Free  trial", "free trial", "  "],
+    }
+
+    result = policy_guard_node(state)
+
+    assert result["violations"] == ["Blocklisted phrase detected: 'Free trial'"]
+
+
+def test_policy_guard_scans_text_and_attributes():
+    """Test that PolicyGuard matches across inline tags and inside attribute values."""
+    state: DraftCrewState = {
+        "original_message_summary": "Test message",
+        "workspace_id": "test-workspace",
+        "thread_id": None,
+        "intent": "support",
+        "confidence": 0.9,
+        "context_snippets": [],
+        "draft_html": (
+            '<p class="intro">Start your <b>free</b> trial today</p>'
+            '<img alt="Money back guarantee">'
+            "<a href='https://x.test/promo'>Learn more</a>"
+        ),
+        "violations": [],
+        "tone_level": 3,
+        "style_json": {},
+        "blocklist": ["free trial", "money back guarantee", "promo", "intro start"],
+    }
+
+    result = policy_guard_node(state)
+
+    assert result["violations"] == [
+        "Blocklisted phrase detected: 'free trial'",
+        "Blocklisted phrase detected: 'money back guarantee'",
+        "Blocklisted phrase detected: 'promo'",
+    ]
+
+
+def test_policy_guard_empty_blocklist():
+    """Test that PolicyGuard passes any draft when no phrases are configured."""
+    state: DraftCrewState = {
+        "original_message_summary": "Test message",
+        "workspace_id": "test-workspace",
+        "thread_id": None,
+        "intent": "support",
+        "confidence": 0.9,
+        "context_snippets": [],
+        "draft_html": "<p>This is a free trial offer for you!</p>",
+        "violations": ["stale violation"],
+        "tone_level": 3,
+        "style_json": {},
+        "blocklist": [],
+    }
+
+    result = policy_guard_node(state)
+
+    assert result["violations"] == []
+    assert result["draft_html"] == state["draft_html"]
+
+
 def test_drafter_uses_tone_level():
     """Test that drafter node respects tone_level setting."""
     from app.agents.reploom_crew import drafter_node
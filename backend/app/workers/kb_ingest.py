@@ -0,0 +1,81 @@
+"""
+Arq worker for KB document ingestion.
+
+Run with: python -m app.workers.kb_ingest
+"""
+import asyncio
+import logging
+import logging.config
+from arq import run_worker
+from arq.connections import RedisSettings
+from arq.logs import default_log_config
+from app.core.config import settings
+from app.kb.embeddings import close_openai_clients
+from app.kb.retrieval import upsert_document
+from app.kb.snapshot import run_snapshot_refresh, snapshots_enabled
+
+logger = logging.getLogger(__name__)
+
+
+async def ingest(
+    ctx: dict,
+    file_content: str,
+    workspace_id: str,
+    source: str = "upload",
+    title: str | None = None,
+    url: str | None = None,
+    tags: list[str] | None = None,
+    owner: str | None = None,
+) -> dict:
+    """
+    Chunk, embed and upsert one document; the stats become the job result.
+
+    owner is the uploader's user sub; it only lives in the job kwargs so
+    /kb/jobs/{job_id} can hide the job from other users.
+    """
+    logger.info("Ingest job %s started: workspace=%s, title=%s", ctx["job_id"], workspace_id, title)
+    stats = await upsert_document(
+        file_content=file_content,
+        workspace_id=workspace_id,
+        source=source,
+        title=title,
+        url=url,
+        tags=tags,
+    )
+    logger.info("Ingest job %s complete: %s", ctx["job_id"], stats)
+    return stats
+
+
+async def startup(ctx: dict) -> None:
+    # Workspaces written here are marked stale in this process, so the
+    # worker refreshes their snapshots itself
+    ctx["snapshot_task"] = asyncio.create_task(run_snapshot_refresh()) if snapshots_enabled() else None
+
+
+async def shutdown(ctx: dict) -> None:
+    if ctx.get("snapshot_task") is not None:
+        ctx["snapshot_task"].cancel()
+    await close_openai_clients()
+
+
+class WorkerSettings:
+    functions = [ingest]
+    on_startup = startup
+    on_shutdown = shutdown
+    redis_settings = RedisSettings.from_dsn(settings.REDIS_URL)
+    # Large documents take minutes to embed; results stay pollable for a day
+    job_timeout = 30 * 60
+    keep_result = 24 * 60 * 60
+    max_jobs = 4
+
+
+if __name__ == "__main__":
+    # uvloop (installed with uvicorn's standard extras, except on Windows)
+    # speeds up the worker's fan-out of embedding and Qdrant requests
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    logging.config.dictConfig(default_log_config(verbose=False))
+    run_worker(WorkerSettings)
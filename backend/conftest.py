@@ -0,0 +1,3 @@
+"""Root pytest configuration, shared by tests/ and app/tests/."""
+
+pytest_plugins = ["tests.conftest_plugin"]
@@ -0,0 +1,51 @@
+-- Migration: Replace draft table Config.indexes (never read by SQLModel) with
+-- real composite indexes and unique idempotency constraints
+
+-- Note: SQLModel creates these on new tables via create_all
+-- This migration is for existing databases and is safe to re-run
+
+-- draft_reviews: "my reviews" listing and the pending review queue
+CREATE INDEX IF NOT EXISTS ix_draft_reviews_user_status
+    ON draft_reviews (user_id, status, updated_at);
+CREATE INDEX IF NOT EXISTS ix_draft_reviews_user_pending
+    ON draft_reviews (user_id, updated_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS ix_draft_reviews_thread_user
+    ON draft_reviews (thread_id, user_id);
+DROP INDEX IF EXISTS ix_draft_reviews_user_id;
+DROP INDEX IF EXISTS ix_draft_reviews_thread_id;
+
+-- gmail_drafts / outlook_drafts: remove duplicate rows (keep the oldest)
+-- before adding the unique constraints
+DELETE FROM gmail_drafts a USING gmail_drafts b
+WHERE a.user_id = b.user_id
+  AND a.thread_id = b.thread_id
+  AND a.reply_to_msg_id = b.reply_to_msg_id
+  AND a.content_hash = b.content_hash
+  AND (a.created_at, a.id) > (b.created_at, b.id);
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_gmail_drafts_reply_content') THEN
+        ALTER TABLE gmail_drafts ADD CONSTRAINT uq_gmail_drafts_reply_content
+            UNIQUE (user_id, thread_id, reply_to_msg_id, content_hash);
+    END IF;
+END $$;
+DROP INDEX IF EXISTS ix_gmail_drafts_user_id;
+
+DELETE FROM outlook_drafts a USING outlook_drafts b
+WHERE a.user_id = b.user_id
+  AND a.conversation_id = b.conversation_id
+  AND a.message_id = b.message_id
+  AND a.content_hash = b.content_hash
+  AND (a.created_at, a.id) > (b.created_at, b.id);
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_outlook_drafts_reply_content') THEN
+        ALTER TABLE outlook_drafts ADD CONSTRAINT uq_outlook_drafts_reply_content
+            UNIQUE (user_id, conversation_id, message_id, content_hash);
+    END IF;
+END $$;
+DROP INDEX IF EXISTS ix_outlook_drafts_user_id;
+
+-- Verify the schema
+-- \d draft_reviews
+-- \d gmail_drafts
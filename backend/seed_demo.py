@@ -10,7 +10,7 @@ This script sets up a complete demo workspace with:
 
 import asyncio
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from sqlmodel import Session, select
 
 from app.core.db import engine, init_db
@@ -28,6 +28,9 @@ async def seed_demo_data():
 
     print("🌱 Starting demo data seeding...")
 
+    # One clock read for the whole seed, so rows share a consistent timestamp
+    now = datetime.now(timezone.utc)
+
     # Initialize database schema
     print("📊 Initializing database schema...")
     await init_db()
@@ -58,7 +61,7 @@ async def seed_demo_data():
                 "click here"
             ]
             existing_workspace.approval_threshold = 0.85
-            existing_workspace.updated_at = datetime.now(timezone.utc)
+            existing_workspace.updated_at = now
             workspace = existing_workspace
         else:
             workspace = WorkspaceSettings(
@@ -76,10 +79,11 @@ async def seed_demo_data():
                     "click here"
                 ],
                 approval_threshold=0.85,
+                created_at=now,
+                updated_at=now,
             )
             session.add(workspace)
 
-        session.commit()
         print(f"   ✅ Workspace created/updated: tone_level={workspace.tone_level}")
         print(f"   📝 Blocklist: {len(workspace.blocklist_json)} phrases")
 
@@ -181,22 +185,23 @@ async def seed_demo_data():
             },
         ]
 
-        # Check and create/update draft reviews
-        for draft_data in sample_drafts:
-            thread_id = draft_data["thread_id"]
+        # Check which draft reviews already exist in one query
+        existing_thread_ids = set(session.exec(
+            select(DraftReview.thread_id).where(
+                DraftReview.thread_id.in_([d["thread_id"] for d in sample_drafts]),
+                DraftReview.user_id == DEMO_USER_ID
+            )
+        ).all())
 
-            existing_review = session.exec(
-                select(DraftReview).where(
-                    DraftReview.thread_id == thread_id,
-                    DraftReview.user_id == DEMO_USER_ID
-                )
-            ).first()
+        new_reviews = []
+        for i, draft_data in enumerate(sample_drafts):
+            thread_id = draft_data["thread_id"]
 
-            if existing_review:
+            if thread_id in existing_thread_ids:
                 print(f"   ⚠️  Draft review for {thread_id} already exists, skipping...")
                 continue
 
-            review = DraftReview(
+            new_reviews.append(DraftReview(
                 user_id=DEMO_USER_ID,
                 user_email=DEMO_USER_EMAIL,
                 thread_id=draft_data["thread_id"],
@@ -209,10 +214,14 @@ async def seed_demo_data():
                 violations=draft_data["violations"],
                 status=draft_data["status"],
                 run_id=str(uuid.uuid4()),  # Synthetic run ID
-            )
-            session.add(review)
+                # A minute apart, so the inbox lists samples in a stable order
+                created_at=now - timedelta(minutes=i),
+                updated_at=now - timedelta(minutes=i),
+            ))
             print(f"   ✅ Created draft review: {thread_id} ({draft_data['intent']}, {draft_data['status']})")
 
+        # Workspace settings and new reviews go in one transaction
+        session.add_all(new_reviews)
         session.commit()
 
     print("\n✨ Demo data seeding complete!")
@@ -0,0 +1,131 @@
+"""Integration tests for the KB upload and ingest job routes.
+
+The Redis-backed arq pool and job lookups are replaced with in-memory fakes.
+"""
+
+from datetime import datetime, timezone
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+from arq.jobs import JobDef, JobResult, JobStatus
+from fastapi import FastAPI
+
+JOB_ID = "3f2c9a1e0b7d4c6f8e5a2b1c0d9e8f7a"
+OWNER = "auth0|test-user-123456"
+ENQUEUE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _job_def(owner: str) -> JobDef:
+    return JobDef(
+        function="ingest",
+        args=(),
+        kwargs={"owner": owner, "workspace_id": "workspace-123"},
+        job_try=1,
+        enqueue_time=ENQUEUE_TIME,
+        score=None,
+        job_id=JOB_ID,
+    )
+
+
+def _job_result(owner: str, stats: dict[str, Any]) -> JobResult:
+    job_def = _job_def(owner)
+    return JobResult(
+        **vars(job_def),
+        success=True,
+        result=stats,
+        start_time=ENQUEUE_TIME,
+        finish_time=ENQUEUE_TIME,
+        queue_name="arq:queue",
+    )
+
+
+@pytest.fixture
+def arq_pool(_app: FastAPI, monkeypatch: pytest.MonkeyPatch) -> MagicMock:
+    """Connected job queue whose enqueue_job hands back a fixed job ID."""
+    pool = MagicMock()
+    pool.enqueue_job = AsyncMock(return_value=MagicMock(job_id=JOB_ID))
+    monkeypatch.setattr(_app.state, "arq", pool, raising=False)
+    return pool
+
+
+def _patch_job(monkeypatch: pytest.MonkeyPatch, status: JobStatus, info: JobDef | None) -> None:
+    job = MagicMock()
+    job.status = AsyncMock(return_value=status)
+    job.info = AsyncMock(return_value=info)
+    monkeypatch.setattr("app.api.routes.kb.Job", lambda job_id, redis: job)
+
+
+@pytest.mark.integration
+async def test_upload_queues_job_for_owner(async_client: httpx.AsyncClient, arq_pool: MagicMock):
+    """Test upload answers 202 with the job ID and records the uploader on the job."""
+    response = await async_client.post(
+        "/api/kb/upload",
+        params={"workspace_id": "workspace-123"},
+        files={"file": ("faq.txt", b"Refunds take 5 days.", "text/plain")},
+    )
+
+    assert response.status_code == 202
+    assert response.json()["job_id"] == JOB_ID
+    assert arq_pool.enqueue_job.await_args.kwargs["owner"] == OWNER
+
+
+@pytest.mark.integration
+async def test_upload_without_job_queue(
+    _app: FastAPI, async_client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    """Test upload answers 503 when Redis was unreachable at startup."""
+    monkeypatch.setattr(_app.state, "arq", None, raising=False)
+
+    response = await async_client.post(
+        "/api/kb/upload",
+        params={"workspace_id": "workspace-123"},
+        files={"file": ("faq.txt", b"Refunds take 5 days.", "text/plain")},
+    )
+
+    assert response.status_code == 503
+
+
+@pytest.mark.integration
+async def test_get_job_complete(
+    async_client: httpx.AsyncClient, arq_pool: MagicMock, monkeypatch: pytest.MonkeyPatch
+):
+    """Test the uploader sees the upload statistics once the job finishes."""
+    stats = {"chunks_total": 3, "chunks_uploaded": 3, "duplicates_skipped": 0}
+    _patch_job(monkeypatch, JobStatus.complete, _job_result(OWNER, stats))
+
+    response = await async_client.get(f"/api/kb/jobs/{JOB_ID}")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "job_id": JOB_ID,
+        "status": "complete",
+        "workspace_id": "workspace-123",
+        "stats": stats,
+    }
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize(
+    "status, info",
+    [
+        (JobStatus.queued, _job_def("auth0|another-user")),
+        (JobStatus.not_found, None),
+    ],
+    ids=["other_owner", "missing"],
+)
+async def test_get_job_not_found(
+    async_client: httpx.AsyncClient,
+    arq_pool: MagicMock,
+    monkeypatch: pytest.MonkeyPatch,
+    status: JobStatus,
+    info: JobDef | None,
+):
+    """Test another user's job is reported exactly like a missing one."""
+    _patch_job(monkeypatch, status, info)
+
+    response = await async_client.get(f"/api/kb/jobs/{JOB_ID}")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Job not found"}
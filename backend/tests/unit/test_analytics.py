@@ -1,12 +1,80 @@
 """Unit tests for analytics metrics calculations."""
 
 import pytest
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 
 from app.api.routes.analytics import calculate_metrics, parse_window
 from app.models.draft_reviews import DraftReview
 
+# Fixed creation time for every review; FRTs are offsets from it
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True, slots=True)
+class FakeReview:
+    """The DraftReview fields calculate_metrics reads, without model construction."""
+    intent: str | None
+    status: str
+    created_at: datetime
+    updated_at: datetime
+    reviewed_at: datetime | None = None
+
+
+@pytest.fixture(scope="module")
+def frt_reviews() -> tuple[FakeReview, ...]:
+    """Reviews with FRTs of 60s, 120s and 600s, plus one pending review."""
+    return (
+        # FRT: 60 seconds (meets SLA)
+        FakeReview(
+            intent="support",
+            status="approved",
+            created_at=BASE_TIME,
+            updated_at=BASE_TIME + timedelta(seconds=60),
+            reviewed_at=BASE_TIME + timedelta(seconds=60),
+        ),
+        # FRT: 120 seconds (meets SLA)
+        FakeReview(
+            intent="support",
+            status="rejected",
+            created_at=BASE_TIME,
+            updated_at=BASE_TIME + timedelta(seconds=120),
+            reviewed_at=BASE_TIME + timedelta(seconds=120),
+        ),
+        # FRT: 600 seconds (misses SLA)
+        FakeReview(
+            intent="support",
+            status="editing",
+            created_at=BASE_TIME,
+            updated_at=BASE_TIME + timedelta(seconds=600),
+            reviewed_at=BASE_TIME + timedelta(seconds=600),
+        ),
+        # Pending - no FRT
+        FakeReview(
+            intent="support",
+            status="pending",
+            created_at=BASE_TIME,
+            updated_at=BASE_TIME,
+            reviewed_at=None,
+        ),
+    )
+
+
+@pytest.fixture(scope="module")
+def large_window_reviews() -> tuple[FakeReview, ...]:
+    """400 reviews with FRTs of 1..400 seconds, in shuffled order."""
+    return tuple(
+        FakeReview(
+            intent="support",
+            status="approved",
+            created_at=BASE_TIME,
+            updated_at=BASE_TIME + timedelta(seconds=(i * 7919) % 400 + 1),
+            reviewed_at=BASE_TIME + timedelta(seconds=(i * 7919) % 400 + 1),
+        )
+        for i in range(400)
+    )
+
 
 class TestParseWindow:
     """Test window parsing function."""
@@ -45,53 +113,29 @@ class TestCalculateMetrics:
     def test_intents_count(self):
         """Test intent counting."""
         reviews = [
-            DraftReview(
-                id=str(uuid4()),
-                user_id="user1",
-                user_email="test@example.com",
-                thread_id="thread1",
-                draft_id="draft1",
+            FakeReview(
                 intent="support",
                 status="pending",
-                draft_html="<p>Test</p>",
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc),
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME,
             ),
-            DraftReview(
-                id=str(uuid4()),
-                user_id="user1",
-                user_email="test@example.com",
-                thread_id="thread2",
-                draft_id="draft2",
+            FakeReview(
                 intent="support",
                 status="pending",
-                draft_html="<p>Test</p>",
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc),
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME,
             ),
-            DraftReview(
-                id=str(uuid4()),
-                user_id="user1",
-                user_email="test@example.com",
-                thread_id="thread3",
-                draft_id="draft3",
+            FakeReview(
                 intent="cs",
                 status="pending",
-                draft_html="<p>Test</p>",
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc),
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME,
             ),
-            DraftReview(
-                id=str(uuid4()),
-                user_id="user1",
-                user_email="test@example.com",
-                thread_id="thread4",
-                draft_id="draft4",
+            FakeReview(
                 intent="exec",
                 status="pending",
-                draft_html="<p>Test</p>",
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc),
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME,
             ),
         ]
 
@@ -102,29 +146,17 @@ class TestCalculateMetrics:
     def test_intents_count_with_null(self):
         """Test intent counting with null values."""
         reviews = [
-            DraftReview(
-                id=str(uuid4()),
-                user_id="user1",
-                user_email="test@example.com",
-                thread_id="thread1",
-                draft_id="draft1",
+            FakeReview(
                 intent=None,
                 status="pending",
-                draft_html="<p>Test</p>",
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc),
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME,
             ),
-            DraftReview(
-                id=str(uuid4()),
-                user_id="user1",
-                user_email="test@example.com",
-                thread_id="thread2",
-                draft_id="draft2",
+            FakeReview(
                 intent="support",
                 status="pending",
-                draft_html="<p>Test</p>",
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc),
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME,
             ),
         ]
 
@@ -134,23 +166,14 @@ class TestCalculateMetrics:
 
     def test_review_rate_all_statuses(self):
         """Test review rate calculation with all statuses."""
-        now = datetime.now(timezone.utc)
         reviews = [
-            DraftReview(
-                id=str(uuid4()),
-                user_id="user1",
-                user_email="test@example.com",
-                thread_id=f"thread{i}",
-                draft_id=f"draft{i}",
+            FakeReview(
                 intent="support",
                 status=status,
-                draft_html="<p>Test</p>",
-                created_at=now,
-                updated_at=now,
-            )
-            for i, status in enumerate(
-                ["pending", "approved", "approved", "rejected", "editing"]
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME,
             )
+            for status in ["pending", "approved", "approved", "rejected", "editing"]
         ]
 
         result = calculate_metrics(reviews)
@@ -165,73 +188,12 @@ class TestCalculateMetrics:
         assert result["review_rate"]["rejected_rate"] == 20.0
         assert result["review_rate"]["editing_rate"] == 20.0
 
-    def test_frt_calculation(self):
+    def test_frt_calculation(self, frt_reviews):
         """Test first response time calculation."""
-        base_time = datetime.now(timezone.utc)
-
-        reviews = [
-            # FRT: 60 seconds (meets SLA)
-            DraftReview(
-                id=str(uuid4()),
-                user_id="user1",
-                user_email="test@example.com",
-                thread_id="thread1",
-                draft_id="draft1",
-                intent="support",
-                status="approved",
-                draft_html="<p>Test</p>",
-                created_at=base_time,
-                updated_at=base_time + timedelta(seconds=60),
-                reviewed_at=base_time + timedelta(seconds=60),
-            ),
-            # FRT: 120 seconds (meets SLA)
-            DraftReview(
-                id=str(uuid4()),
-                user_id="user1",
-                user_email="test@example.com",
-                thread_id="thread2",
-                draft_id="draft2",
-                intent="support",
-                status="rejected",
-                draft_html="<p>Test</p>",
-                created_at=base_time,
-                updated_at=base_time + timedelta(seconds=120),
-                reviewed_at=base_time + timedelta(seconds=120),
-            ),
-            # FRT: 600 seconds (misses SLA)
-            DraftReview(
-                id=str(uuid4()),
-                user_id="user1",
-                user_email="test@example.com",
-                thread_id="thread3",
-                draft_id="draft3",
-                intent="support",
-                status="editing",
-                draft_html="<p>Test</p>",
-                created_at=base_time,
-                updated_at=base_time + timedelta(seconds=600),
-                reviewed_at=base_time + timedelta(seconds=600),
-            ),
-            # Pending - no FRT
-            DraftReview(
-                id=str(uuid4()),
-                user_id="user1",
-                user_email="test@example.com",
-                thread_id="thread4",
-                draft_id="draft4",
-                intent="support",
-                status="pending",
-                draft_html="<p>Test</p>",
-                created_at=base_time,
-                updated_at=base_time,
-                reviewed_at=None,
-            ),
-        ]
-
-        result = calculate_metrics(reviews, sla_threshold_seconds=300)
+        result = calculate_metrics(frt_reviews, sla_threshold_seconds=300)
 
         assert result["frt"]["total_with_frt"] == 3
-        assert result["frt"]["avg_seconds"] == pytest.approx(260.0, rel=1)
+        assert result["frt"]["avg_seconds"] == 260.0
         assert result["frt"]["median_seconds"] == 120.0
         assert result["frt"]["min_seconds"] == 60.0
         assert result["frt"]["max_seconds"] == 600.0
@@ -241,34 +203,20 @@ class TestCalculateMetrics:
 
     def test_frt_calculation_custom_sla(self):
         """Test FRT calculation with custom SLA threshold."""
-        base_time = datetime.now(timezone.utc)
-
         reviews = [
-            DraftReview(
-                id=str(uuid4()),
-                user_id="user1",
-                user_email="test@example.com",
-                thread_id="thread1",
-                draft_id="draft1",
+            FakeReview(
                 intent="support",
                 status="approved",
-                draft_html="<p>Test</p>",
-                created_at=base_time,
-                updated_at=base_time + timedelta(seconds=100),
-                reviewed_at=base_time + timedelta(seconds=100),
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME + timedelta(seconds=100),
+                reviewed_at=BASE_TIME + timedelta(seconds=100),
             ),
-            DraftReview(
-                id=str(uuid4()),
-                user_id="user1",
-                user_email="test@example.com",
-                thread_id="thread2",
-                draft_id="draft2",
+            FakeReview(
                 intent="support",
                 status="approved",
-                draft_html="<p>Test</p>",
-                created_at=base_time,
-                updated_at=base_time + timedelta(seconds=200),
-                reviewed_at=base_time + timedelta(seconds=200),
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME + timedelta(seconds=200),
+                reviewed_at=BASE_TIME + timedelta(seconds=200),
             ),
         ]
 
@@ -279,56 +227,43 @@ class TestCalculateMetrics:
         assert result["frt"]["sla_met_percentage"] == 50.0
         assert result["frt"]["sla_threshold_seconds"] == 150
 
-    def test_frt_uses_reviewed_at_when_available(self):
-        """Test FRT uses reviewed_at timestamp when available."""
-        base_time = datetime.now(timezone.utc)
-
-        review = DraftReview(
-            id=str(uuid4()),
-            user_id="user1",
-            user_email="test@example.com",
-            thread_id="thread1",
-            draft_id="draft1",
+    @pytest.mark.parametrize(
+        ("reviewed_after", "expected_frt"),
+        [
+            # Should use reviewed_at (100s) not the later updated_at (200s)
+            (100, 100.0),
+            # Should fall back to updated_at when reviewed_at is None
+            (None, 200.0),
+        ],
+    )
+    def test_frt_response_time_source(self, reviewed_after, expected_frt):
+        """Test FRT uses reviewed_at when available and updated_at otherwise."""
+        review = FakeReview(
             intent="support",
             status="approved",
-            draft_html="<p>Test</p>",
-            created_at=base_time,
-            updated_at=base_time + timedelta(seconds=200),  # Later update
-            reviewed_at=base_time + timedelta(seconds=100),  # Actual review time
+            created_at=BASE_TIME,
+            updated_at=BASE_TIME + timedelta(seconds=200),
+            reviewed_at=None if reviewed_after is None else BASE_TIME + timedelta(seconds=reviewed_after),
         )
 
         result = calculate_metrics([review])
 
-        # Should use reviewed_at (100s) not updated_at (200s)
-        assert result["frt"]["avg_seconds"] == 100.0
+        assert result["frt"]["avg_seconds"] == expected_frt
 
-    def test_frt_handles_missing_reviewed_at(self):
-        """Test FRT falls back to updated_at when reviewed_at is None."""
-        base_time = datetime.now(timezone.utc)
+    def test_frt_large_window(self, large_window_reviews):
+        """Test FRT statistics over enough reviews to take the NumPy path."""
+        result = calculate_metrics(large_window_reviews, sla_threshold_seconds=300)
 
-        review = DraftReview(
-            id=str(uuid4()),
-            user_id="user1",
-            user_email="test@example.com",
-            thread_id="thread1",
-            draft_id="draft1",
-            intent="support",
-            status="approved",
-            draft_html="<p>Test</p>",
-            created_at=base_time,
-            updated_at=base_time + timedelta(seconds=150),
-            reviewed_at=None,  # Missing reviewed_at
-        )
-
-        result = calculate_metrics([review])
-
-        # Should fall back to updated_at
-        assert result["frt"]["avg_seconds"] == 150.0
+        assert result["frt"]["total_with_frt"] == 400
+        assert result["frt"]["avg_seconds"] == pytest.approx(200.5)
+        # Upper median of an even count, as for small windows
+        assert result["frt"]["median_seconds"] == 201.0
+        assert result["frt"]["min_seconds"] == 1.0
+        assert result["frt"]["max_seconds"] == 400.0
+        assert result["frt"]["sla_met_count"] == 300
 
     def test_comprehensive_metrics(self):
         """Test comprehensive metrics calculation with realistic data."""
-        base_time = datetime.now(timezone.utc)
-
         reviews = [
             # Support intent, approved, FRT 90s
             DraftReview(
@@ -340,9 +275,9 @@ class TestCalculateMetrics:
                 intent="support",
                 status="approved",
                 draft_html="<p>Test</p>",
-                created_at=base_time,
-                updated_at=base_time + timedelta(seconds=90),
-                reviewed_at=base_time + timedelta(seconds=90),
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME + timedelta(seconds=90),
+                reviewed_at=BASE_TIME + timedelta(seconds=90),
             ),
             # CS intent, approved, FRT 180s
             DraftReview(
@@ -354,9 +289,9 @@ class TestCalculateMetrics:
                 intent="cs",
                 status="approved",
                 draft_html="<p>Test</p>",
-                created_at=base_time,
-                updated_at=base_time + timedelta(seconds=180),
-                reviewed_at=base_time + timedelta(seconds=180),
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME + timedelta(seconds=180),
+                reviewed_at=BASE_TIME + timedelta(seconds=180),
             ),
             # Exec intent, rejected, FRT 400s
             DraftReview(
@@ -368,9 +303,9 @@ class TestCalculateMetrics:
                 intent="exec",
                 status="rejected",
                 draft_html="<p>Test</p>",
-                created_at=base_time,
-                updated_at=base_time + timedelta(seconds=400),
-                reviewed_at=base_time + timedelta(seconds=400),
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME + timedelta(seconds=400),
+                reviewed_at=BASE_TIME + timedelta(seconds=400),
             ),
             # Support intent, pending (no FRT)
             DraftReview(
@@ -382,8 +317,8 @@ class TestCalculateMetrics:
                 intent="support",
                 status="pending",
                 draft_html="<p>Test</p>",
-                created_at=base_time,
-                updated_at=base_time,
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME,
                 reviewed_at=None,
             ),
             # Other intent, editing, FRT 250s
@@ -396,9 +331,9 @@ class TestCalculateMetrics:
                 intent="other",
                 status="editing",
                 draft_html="<p>Test</p>",
-                created_at=base_time,
-                updated_at=base_time + timedelta(seconds=250),
-                reviewed_at=base_time + timedelta(seconds=250),
+                created_at=BASE_TIME,
+                updated_at=BASE_TIME + timedelta(seconds=250),
+                reviewed_at=BASE_TIME + timedelta(seconds=250),
             ),
         ]
 
@@ -1,13 +1,21 @@
 """Unit tests for Gmail service layer."""
 
+import asyncio
 import base64
+import email
+import gc
+from email.header import decode_header, make_header
+import orjson
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi import HTTPException
 
+from app.integrations import gmail_service
 from app.integrations.gmail_service import (
     get_thread,
     create_reply_draft,
+    create_reply_drafts,
+    ReplyOp,
     _build_reply_mime,
     _get_header_value,
     ThreadNotFoundError,
@@ -16,6 +24,18 @@ from app.integrations.gmail_service import (
 )
 
 
+@pytest.fixture(autouse=True)
+def reset_gmail_service_state():
+    """Start every test with an empty reply header cache and no shared client."""
+    gmail_service._reply_header_cache.clear()
+    gmail_service._reply_header_fetches.clear()
+    gmail_service._http_client = None
+    yield
+    gmail_service._reply_header_cache.clear()
+    gmail_service._reply_header_fetches.clear()
+    gmail_service._http_client = None
+
+
 class TestGetHeaderValue:
     """Test _get_header_value helper function."""
 
@@ -70,8 +90,9 @@ class TestBuildReplyMime:
         assert "Subject: Re: Test" in decoded
         # Content might be base64 encoded, so check for the MIME type instead
         assert "Content-Type: text/html; charset=\"utf-8\"" in decoded
-        # Verify the message structure is valid
-        assert "multipart/alternative" in decoded
+        # Verify the message is a single HTML part
+        assert "MIME-Version: 1.0" in decoded
+        assert "multipart/" not in decoded
 
     def test_build_reply_mime_with_threading_headers(self):
         """Test MIME with In-Reply-To and References headers."""
@@ -88,6 +109,25 @@ class TestBuildReplyMime:
         assert "In-Reply-To: <original@gmail.com>" in decoded
         assert "References: <msg1@gmail.com> <msg2@gmail.com>" in decoded
 
+    def test_build_reply_mime_folds_long_references(self):
+        """Test a long thread's References header is folded at whitespace."""
+        references = " ".join(f"<message-{i}.1234567890@mail.gmail.com>" for i in range(60))
+        mime = _build_reply_mime(
+            to_address="recipient@example.com",
+            subject="Re: Test",
+            html_body="<p>Reply</p>",
+            in_reply_to="<message-59.1234567890@mail.gmail.com>",
+            references=references
+        )
+
+        decoded = base64.urlsafe_b64decode(mime).decode('utf-8')
+        header_block = decoded.split("\r\n\r\n", 1)[0]
+        msg = email.message_from_string(decoded)
+
+        assert max(len(line) for line in header_block.split("\r\n")) <= 78
+        assert "\r\n <message-" in header_block
+        assert msg["References"].split() == references.split()
+
     def test_build_reply_mime_utf8_content(self):
         """Test MIME with UTF-8 special characters."""
         mime = _build_reply_mime(
@@ -100,6 +140,10 @@ class TestBuildReplyMime:
 
         # Verify UTF-8 encoding is preserved
         assert "charset=\"utf-8\"" in decoded
+        message = email.message_from_string(decoded)
+        assert message.get_payload(decode=True).decode("utf-8") == "<p>Hello 世界</p>"
+        subject = str(make_header(decode_header(message["Subject"])))
+        assert subject == "Re: Test with émojis 🎉"
 
     def test_build_reply_mime_no_threading_headers(self):
         """Test MIME without optional threading headers."""
@@ -124,12 +168,12 @@ class TestGetThread:
         """Test successful thread retrieval."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
+        mock_response.content = orjson.dumps({
             "id": "thread_123",
             "messages": [
                 {"id": "msg_456", "threadId": "thread_123"}
             ]
-        }
+        })
         mock_response.raise_for_status = MagicMock()
 
         with patch("app.integrations.gmail_service.httpx.AsyncClient") as mock_client:
@@ -191,7 +235,7 @@ class TestCreateReplyDraft:
         # Mock message fetch response
         mock_msg_response = MagicMock()
         mock_msg_response.status_code = 200
-        mock_msg_response.json.return_value = {
+        mock_msg_response.content = orjson.dumps({
             "id": "msg_456",
             "threadId": "thread_123",
             "payload": {
@@ -201,13 +245,13 @@ class TestCreateReplyDraft:
                     {"name": "From", "value": "sender@example.com"},
                 ]
             }
-        }
+        })
         mock_msg_response.raise_for_status = MagicMock()
 
         # Mock draft creation response
         mock_draft_response = MagicMock()
         mock_draft_response.status_code = 200
-        mock_draft_response.json.return_value = {
+        mock_draft_response.content = orjson.dumps({
             "id": "r-1234567890",
             "message": {
                 "id": "msg_789",
@@ -218,7 +262,7 @@ class TestCreateReplyDraft:
                     ]
                 }
             }
-        }
+        })
         mock_draft_response.raise_for_status = MagicMock()
 
         with patch("app.integrations.gmail_service.httpx.AsyncClient") as mock_client:
@@ -241,20 +285,27 @@ class TestCreateReplyDraft:
             assert result["id"] == "r-1234567890"
             assert result["message"]["threadId"] == "thread_123"
 
+            # Verify only the threading headers were requested
+            get_params = mock_async_client.get.call_args[1]["params"]
+            assert ("format", "metadata") in get_params
+            assert ("metadataHeaders", "Message-ID") in get_params
+            assert ("metadataHeaders", "References") in get_params
+
             # Verify draft creation was called with proper structure
             mock_async_client.post.assert_called_once()
             call_kwargs = mock_async_client.post.call_args[1]
-            assert "json" in call_kwargs
-            assert "message" in call_kwargs["json"]
-            assert "raw" in call_kwargs["json"]["message"]
-            assert "threadId" in call_kwargs["json"]["message"]
-            assert call_kwargs["json"]["message"]["threadId"] == "thread_123"
+            assert "content" in call_kwargs
+            draft_payload = orjson.loads(call_kwargs["content"])
+            assert "message" in draft_payload
+            assert "raw" in draft_payload["message"]
+            assert "threadId" in draft_payload["message"]
+            assert draft_payload["message"]["threadId"] == "thread_123"
 
     async def test_create_reply_draft_custom_subject(self):
         """Test draft with custom subject adds Re: prefix."""
         mock_msg_response = MagicMock()
         mock_msg_response.status_code = 200
-        mock_msg_response.json.return_value = {
+        mock_msg_response.content = orjson.dumps({
             "id": "msg_456",
             "payload": {
                 "headers": [
@@ -262,15 +313,15 @@ class TestCreateReplyDraft:
                     {"name": "From", "value": "sender@example.com"},
                 ]
             }
-        }
+        })
         mock_msg_response.raise_for_status = MagicMock()
 
         mock_draft_response = MagicMock()
         mock_draft_response.status_code = 200
-        mock_draft_response.json.return_value = {
+        mock_draft_response.content = orjson.dumps({
             "id": "r-1234567890",
             "message": {"id": "msg_789", "payload": {"headers": []}}
-        }
+        })
         mock_draft_response.raise_for_status = MagicMock()
 
         with patch("app.integrations.gmail_service.httpx.AsyncClient") as mock_client:
@@ -291,7 +342,7 @@ class TestCreateReplyDraft:
 
             # Verify the MIME message was built with Re: prefix
             call_kwargs = mock_async_client.post.call_args[1]
-            raw_message = call_kwargs["json"]["message"]["raw"]
+            raw_message = orjson.loads(call_kwargs["content"])["message"]["raw"]
             decoded = base64.urlsafe_b64decode(raw_message).decode('utf-8')
             assert "Subject: Re: Custom Subject" in decoded
 
@@ -299,7 +350,7 @@ class TestCreateReplyDraft:
         """Test error when original message lacks Message-ID header."""
         mock_msg_response = MagicMock()
         mock_msg_response.status_code = 200
-        mock_msg_response.json.return_value = {
+        mock_msg_response.content = orjson.dumps({
             "id": "msg_456",
             "payload": {
                 "headers": [
@@ -307,7 +358,7 @@ class TestCreateReplyDraft:
                     # Missing Message-ID header
                 ]
             }
-        }
+        })
         mock_msg_response.raise_for_status = MagicMock()
 
         with patch("app.integrations.gmail_service.httpx.AsyncClient") as mock_client:
@@ -332,6 +383,7 @@ class TestCreateReplyDraft:
         """Test error when reply_to_msg_id doesn't exist."""
         mock_response = MagicMock()
         mock_response.status_code = 404
+        mock_response.content = b""
 
         with patch("app.integrations.gmail_service.httpx.AsyncClient") as mock_client:
             mock_async_client = MagicMock()
@@ -355,7 +407,7 @@ class TestCreateReplyDraft:
         """Test that References header includes all previous message IDs."""
         mock_msg_response = MagicMock()
         mock_msg_response.status_code = 200
-        mock_msg_response.json.return_value = {
+        mock_msg_response.content = orjson.dumps({
             "id": "msg_456",
             "payload": {
                 "headers": [
@@ -365,15 +417,15 @@ class TestCreateReplyDraft:
                     {"name": "Subject", "value": "Re: Thread"},
                 ]
             }
-        }
+        })
         mock_msg_response.raise_for_status = MagicMock()
 
         mock_draft_response = MagicMock()
         mock_draft_response.status_code = 200
-        mock_draft_response.json.return_value = {
+        mock_draft_response.content = orjson.dumps({
             "id": "r-1234567890",
             "message": {"id": "msg_789", "payload": {"headers": []}}
-        }
+        })
         mock_draft_response.raise_for_status = MagicMock()
 
         with patch("app.integrations.gmail_service.httpx.AsyncClient") as mock_client:
@@ -394,7 +446,7 @@ class TestCreateReplyDraft:
 
             # Verify References header includes all message IDs
             call_kwargs = mock_async_client.post.call_args[1]
-            raw_message = call_kwargs["json"]["message"]["raw"]
+            raw_message = orjson.loads(call_kwargs["content"])["message"]["raw"]
             decoded = base64.urlsafe_b64decode(raw_message).decode('utf-8')
 
             # Should contain all three message IDs
@@ -407,7 +459,7 @@ class TestCreateReplyDraft:
         """Test 429 rate limit error."""
         mock_msg_response = MagicMock()
         mock_msg_response.status_code = 200
-        mock_msg_response.json.return_value = {
+        mock_msg_response.content = orjson.dumps({
             "id": "msg_456",
             "payload": {
                 "headers": [
@@ -415,15 +467,14 @@ class TestCreateReplyDraft:
                     {"name": "From", "value": "sender@example.com"},
                 ]
             }
-        }
+        })
         mock_msg_response.raise_for_status = MagicMock()
 
         mock_draft_response = MagicMock()
         mock_draft_response.status_code = 429
-        mock_draft_response.content = b'{"error": {"message": "Rate limit exceeded"}}'
-        mock_draft_response.json.return_value = {
+        mock_draft_response.content = orjson.dumps({
             "error": {"message": "Rate limit exceeded"}
-        }
+        })
 
         with patch("app.integrations.gmail_service.httpx.AsyncClient") as mock_client:
             mock_async_client = MagicMock()
@@ -443,3 +494,203 @@ class TestCreateReplyDraft:
                 )
 
             assert exc_info.value.status_code == 429
+
+    async def test_create_reply_draft_caches_reply_headers(self):
+        """Test repeat drafts for the same message skip the header fetch."""
+        mock_msg_response = MagicMock()
+        mock_msg_response.status_code = 200
+        mock_msg_response.content = orjson.dumps({
+            "id": "msg_456",
+            "payload": {
+                "headers": [
+                    {"name": "Message-ID", "value": "<original@gmail.com>"},
+                    {"name": "From", "value": "sender@example.com"},
+                ]
+            }
+        })
+        mock_msg_response.raise_for_status = MagicMock()
+
+        mock_draft_response = MagicMock()
+        mock_draft_response.status_code = 200
+        mock_draft_response.content = orjson.dumps({
+            "id": "r-1234567890",
+            "message": {"id": "msg_789", "payload": {"headers": []}}
+        })
+        mock_draft_response.raise_for_status = MagicMock()
+
+        with patch("app.integrations.gmail_service.httpx.AsyncClient") as mock_client:
+            mock_async_client = MagicMock()
+            mock_async_client.__aenter__ = AsyncMock(return_value=mock_async_client)
+            mock_async_client.__aexit__ = AsyncMock(return_value=None)
+            mock_async_client.get = AsyncMock(return_value=mock_msg_response)
+            mock_async_client.post = AsyncMock(return_value=mock_draft_response)
+            mock_client.return_value = mock_async_client
+
+            for _ in range(2):
+                await create_reply_draft(
+                    user_token="fake_token",
+                    thread_id="thread_123",
+                    reply_to_msg_id="msg_456",
+                    subject=None,
+                    html_body="<p>Reply</p>"
+                )
+
+            assert mock_async_client.get.call_count == 1
+            assert mock_async_client.post.call_count == 2
+
+    @pytest.mark.parametrize("status_code", [401, 404])
+    async def test_create_reply_draft_failure_evicts_reply_headers(self, status_code):
+        """Test a 401/404 from the draft POST drops the cached headers so the next call refetches."""
+        mock_msg_response = MagicMock()
+        mock_msg_response.status_code = 200
+        mock_msg_response.content = orjson.dumps({
+            "id": "msg_456",
+            "payload": {
+                "headers": [
+                    {"name": "Message-ID", "value": "<original@gmail.com>"},
+                    {"name": "From", "value": "sender@example.com"},
+                ]
+            }
+        })
+        mock_msg_response.raise_for_status = MagicMock()
+
+        mock_draft_response = MagicMock()
+        mock_draft_response.status_code = status_code
+        mock_draft_response.content = orjson.dumps({
+            "error": {"message": "Draft creation failed"}
+        })
+
+        with patch("app.integrations.gmail_service.httpx.AsyncClient") as mock_client:
+            mock_async_client = MagicMock()
+            mock_async_client.__aenter__ = AsyncMock(return_value=mock_async_client)
+            mock_async_client.__aexit__ = AsyncMock(return_value=None)
+            mock_async_client.get = AsyncMock(return_value=mock_msg_response)
+            mock_async_client.post = AsyncMock(return_value=mock_draft_response)
+            mock_client.return_value = mock_async_client
+
+            for _ in range(2):
+                with pytest.raises(GmailServiceError):
+                    await create_reply_draft(
+                        user_token="fake_token",
+                        thread_id="thread_123",
+                        reply_to_msg_id="msg_456",
+                        subject=None,
+                        html_body="<p>Reply</p>"
+                    )
+                assert len(gmail_service._reply_header_cache) == 0
+
+            assert mock_async_client.get.call_count == 2
+
+    async def test_concurrent_header_misses_share_one_fetch(self):
+        """Test simultaneous drafts for one message wait on a single header fetch."""
+        headers = gmail_service._ReplyHeaders("<original@gmail.com>", "Hello", "sender@example.com", None)
+        release = asyncio.Event()
+
+        async def slow_fetch(*args):
+            await release.wait()
+            return headers
+
+        with patch("app.integrations.gmail_service._fetch_reply_headers", side_effect=slow_fetch) as mock_fetch:
+            tasks = [
+                asyncio.create_task(gmail_service._get_reply_headers("fake_token", "msg_456", {}, MagicMock()))
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(*tasks)
+
+        assert results == [headers] * 3
+        assert mock_fetch.call_count == 1
+        assert not gmail_service._reply_header_fetches
+        # Per-user state is keyed on a hash, never the raw token
+        assert all("fake_token" not in key for key in gmail_service._reply_header_cache)
+
+    async def test_failed_header_fetch_is_not_cached(self):
+        """Test a failed fetch reaches its callers and the next call retries."""
+        with patch(
+            "app.integrations.gmail_service._fetch_reply_headers",
+            side_effect=ThreadNotFoundError(),
+        ) as mock_fetch:
+            for _ in range(2):
+                with pytest.raises(ThreadNotFoundError):
+                    await gmail_service._get_reply_headers("fake_token", "msg_456", {}, MagicMock())
+
+        assert mock_fetch.call_count == 2
+        assert not gmail_service._reply_header_fetches
+        assert len(gmail_service._reply_header_cache) == 0
+
+
+@pytest.mark.asyncio
+class TestCreateReplyDrafts:
+    """Test create_reply_drafts batch function."""
+
+    async def test_create_reply_drafts_preserves_order(self):
+        """Test batch drafts are created concurrently and returned in op order."""
+        def msg_response(msg_id: str) -> MagicMock:
+            response = MagicMock()
+            response.status_code = 200
+            response.content = orjson.dumps({
+                "id": msg_id,
+                "payload": {
+                    "headers": [
+                        {"name": "Message-ID", "value": f"<{msg_id}@gmail.com>"},
+                        {"name": "From", "value": "sender@example.com"},
+                    ]
+                }
+            })
+            return response
+
+        def draft_response(draft_id: str) -> MagicMock:
+            response = MagicMock()
+            response.status_code = 200
+            response.content = orjson.dumps({"id": draft_id, "message": {"id": "msg_new"}})
+            return response
+
+        async def fake_get(url, **kwargs):
+            return msg_response(url.rsplit("/", 1)[-1])
+
+        async def fake_post(url, **kwargs):
+            payload = orjson.loads(kwargs["content"])
+            return draft_response(f"r-{payload['message']['threadId']}")
+
+        with patch("app.integrations.gmail_service.httpx.AsyncClient") as mock_client:
+            mock_async_client = MagicMock()
+            mock_async_client.__aenter__ = AsyncMock(return_value=mock_async_client)
+            mock_async_client.__aexit__ = AsyncMock(return_value=None)
+            mock_async_client.get = AsyncMock(side_effect=fake_get)
+            mock_async_client.post = AsyncMock(side_effect=fake_post)
+            mock_client.return_value = mock_async_client
+
+            results = await create_reply_drafts(
+                user_token="fake_token",
+                ops=[
+                    ReplyOp("thread_1", "msg_1", None, "<p>One</p>"),
+                    ReplyOp("thread_2", "msg_2", "Custom", "<p>Two</p>"),
+                ]
+            )
+
+            assert [r["id"] for r in results] == ["r-thread_1", "r-thread_2"]
+            assert mock_async_client.get.call_count == 2
+            assert mock_async_client.post.call_count == 2
+
+
+@pytest.mark.asyncio
+class TestUserSemaphore:
+    """Test the per-user Gmail request gate."""
+
+    async def test_user_semaphore_shared_while_in_use(self):
+        """Test every request for a user gets the same gate while any of them holds it."""
+        semaphore = gmail_service._user_semaphore("fake_token")
+
+        async with semaphore:
+            gc.collect()
+            assert gmail_service._user_semaphore("fake_token") is semaphore
+            assert gmail_service._user_semaphore("other_token") is not semaphore
+
+    async def test_user_semaphore_released_when_idle(self):
+        """Test idle users' gates don't accumulate."""
+        async with gmail_service._user_semaphore("fake_token"):
+            pass
+        gc.collect()
+
+        assert len(gmail_service._user_semaphores) == 0
@@ -1,12 +1,18 @@
 """Unit tests for Outlook service layer."""
 
+import asyncio
+import base64
+
+import orjson
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi import HTTPException
 
+from app.integrations import outlook_service
 from app.integrations.outlook_service import (
     list_messages,
     get_message,
+    get_messages_bulk,
     create_reply_draft,
     MessageNotFoundError,
     InvalidMessageError,
@@ -14,6 +20,22 @@ from app.integrations.outlook_service import (
 )
 
 
+def _jwt(**claims) -> str:
+    """Unsigned Graph-style access token carrying the given claims."""
+    payload = base64.urlsafe_b64encode(orjson.dumps(claims)).rstrip(b"=").decode()
+    return f"header.{payload}.signature"
+
+
+@pytest.fixture(autouse=True)
+def reset_graph_client():
+    """Start every test without a shared Graph client or coalesced fetches."""
+    outlook_service._graph_client = None
+    outlook_service._pending.clear()
+    outlook_service._queued.clear()
+    yield
+    outlook_service._graph_client = None
+
+
 @pytest.mark.asyncio
 class TestListMessages:
     """Test list_messages function."""
@@ -22,7 +44,7 @@ class TestListMessages:
         """Test successful message list retrieval."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
+        mock_response.content = orjson.dumps({
             "@odata.context": "https://graph.microsoft.com/v1.0/$metadata#users('user')/messages",
             "value": [
                 {
@@ -56,7 +78,7 @@ class TestListMessages:
                     "hasAttachments": True
                 }
             ]
-        }
+        })
         mock_response.raise_for_status = MagicMock()
 
         with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
@@ -104,10 +126,9 @@ class TestListMessages:
         """Test 404 error when folder doesn't exist."""
         mock_response = MagicMock()
         mock_response.status_code = 404
-        mock_response.content = b'{"error": {"message": "Folder not found"}}'
-        mock_response.json.return_value = {
+        mock_response.content = orjson.dumps({
             "error": {"message": "Folder not found"}
-        }
+        })
 
         with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
             mock_async_client = MagicMock()
@@ -126,10 +147,9 @@ class TestListMessages:
         """Test 403 error for insufficient permissions."""
         mock_response = MagicMock()
         mock_response.status_code = 403
-        mock_response.content = b'{"error": {"message": "Access denied"}}'
-        mock_response.json.return_value = {
+        mock_response.content = orjson.dumps({
             "error": {"message": "Access denied"}
-        }
+        })
 
         with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
             mock_async_client = MagicMock()
@@ -148,7 +168,7 @@ class TestListMessages:
         """Test message listing with pagination parameters."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"value": []}
+        mock_response.content = orjson.dumps({"value": []})
         mock_response.raise_for_status = MagicMock()
 
         with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
@@ -165,6 +185,44 @@ class TestListMessages:
             assert call_kwargs["params"]["$top"] == 25
             assert call_kwargs["params"]["$skip"] == 50
 
+    async def test_list_messages_retries_unavailable(self):
+        """Test a 503 is retried with backoff before succeeding."""
+        unavailable = MagicMock()
+        unavailable.status_code = 503
+        unavailable.headers = {}
+        ok = MagicMock()
+        ok.status_code = 200
+        ok.content = orjson.dumps({"value": [{"id": "m1"}]})
+
+        with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client, \
+                patch("app.integrations.outlook_service.asyncio.sleep", new=AsyncMock()) as mock_sleep:
+            mock_async_client = MagicMock()
+            mock_async_client.get = AsyncMock(side_effect=[unavailable, ok])
+            mock_client.return_value = mock_async_client
+
+            result = await list_messages("fake_token")
+
+            assert result["value"] == [{"id": "m1"}]
+            assert mock_async_client.get.call_count == 2
+            mock_sleep.assert_awaited_once()
+
+    async def test_list_messages_custom_select(self):
+        """Test callers can narrow the $select field list."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.content = orjson.dumps({"value": []})
+        mock_response.raise_for_status = MagicMock()
+
+        with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
+            mock_async_client = MagicMock()
+            mock_async_client.get = AsyncMock(return_value=mock_response)
+            mock_client.return_value = mock_async_client
+
+            await list_messages("fake_token", select=("id", "subject"))
+
+            call_kwargs = mock_async_client.get.call_args[1]
+            assert call_kwargs["params"]["$select"] == "id,subject"
+
 
 @pytest.mark.asyncio
 class TestGetMessage:
@@ -174,7 +232,7 @@ class TestGetMessage:
         """Test successful message retrieval."""
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
+        mock_response.content = orjson.dumps({
             "id": "AAMkAGI2NGI...",
             "conversationId": "AAQkAGI...",
             "subject": "Meeting tomorrow",
@@ -198,7 +256,7 @@ class TestGetMessage:
             },
             "receivedDateTime": "2024-01-15T10:00:00Z",
             "internetMessageId": "<abc@example.com>"
-        }
+        })
         mock_response.raise_for_status = MagicMock()
 
         with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
@@ -252,6 +310,94 @@ class TestGetMessage:
 
             assert exc_info.value.status_code == 401
 
+    async def test_get_message_coalesces_concurrent_calls(self):
+        """Test concurrent fetches share one $batch and duplicate IDs share a fetch."""
+        async def fake_post(url, **kwargs):
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.content = orjson.dumps({"responses": [
+                {"id": r["id"], "status": 200, "body": {"id": r["url"].rsplit("/", 1)[-1]}}
+                for r in orjson.loads(kwargs["content"])["requests"]
+            ]})
+            return mock_response
+
+        with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
+            mock_async_client = MagicMock()
+            mock_async_client.post = AsyncMock(side_effect=fake_post)
+            mock_async_client.get = AsyncMock()
+            mock_client.return_value = mock_async_client
+
+            results = await asyncio.gather(
+                get_message("fake_token", "m1"),
+                get_message("fake_token", "m2"),
+                get_message("fake_token", "m1"),
+            )
+
+            assert [m["id"] for m in results] == ["m1", "m2", "m1"]
+            assert mock_async_client.post.call_count == 1
+            assert len(orjson.loads(mock_async_client.post.call_args[1]["content"])["requests"]) == 2
+            mock_async_client.get.assert_not_called()
+
+    async def test_get_message_coalesces_across_token_refresh(self):
+        """Test calls for one mailbox share a batch across a token refresh, keyed without the token."""
+        async def fake_post(url, **kwargs):
+            # Coalescer state is keyed by mailbox, never by the raw token
+            assert set(outlook_service._pending) == {"tenant:user"}
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.content = orjson.dumps({"responses": [
+                {"id": r["id"], "status": 200, "body": {"id": r["url"].rsplit("/", 1)[-1]}}
+                for r in orjson.loads(kwargs["content"])["requests"]
+            ]})
+            return mock_response
+
+        with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
+            mock_async_client = MagicMock()
+            mock_async_client.post = AsyncMock(side_effect=fake_post)
+            mock_client.return_value = mock_async_client
+
+            results = await asyncio.gather(
+                get_message(_jwt(tid="tenant", oid="user", exp=1), "m1"),
+                get_message(_jwt(tid="tenant", oid="user", exp=2), "m2"),
+            )
+
+            assert [m["id"] for m in results] == ["m1", "m2"]
+            assert mock_async_client.post.call_count == 1
+            assert not outlook_service._pending
+
+    async def test_get_message_coalesced_not_found_is_per_message(self):
+        """Test a missing message in a coalesced batch only fails its own caller."""
+        batch_response = MagicMock()
+        batch_response.status_code = 200
+        batch_response.content = orjson.dumps({"responses": [
+            {"id": "0", "status": 200, "body": {"id": "m1"}},
+            {"id": "1", "status": 404, "body": {"error": {"message": "Not found"}}},
+        ]})
+
+        async def fake_get(url, **kwargs):
+            mock_response = MagicMock()
+            if url.endswith("/missing"):
+                mock_response.status_code = 404
+            else:
+                mock_response.status_code = 200
+                mock_response.content = orjson.dumps({"id": "m1"})
+            return mock_response
+
+        with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
+            mock_async_client = MagicMock()
+            mock_async_client.post = AsyncMock(return_value=batch_response)
+            mock_async_client.get = AsyncMock(side_effect=fake_get)
+            mock_client.return_value = mock_async_client
+
+            found, missing = await asyncio.gather(
+                get_message("fake_token", "m1"),
+                get_message("fake_token", "missing"),
+                return_exceptions=True,
+            )
+
+            assert found == {"id": "m1"}
+            assert isinstance(missing, MessageNotFoundError)
+
 
 @pytest.mark.asyncio
 class TestCreateReplyDraft:
@@ -262,18 +408,18 @@ class TestCreateReplyDraft:
         # Mock createReply response
         mock_create_response = MagicMock()
         mock_create_response.status_code = 200
-        mock_create_response.json.return_value = {
+        mock_create_response.content = orjson.dumps({
             "id": "AAMkAGI2NGI...",
             "conversationId": "AAQkAGI...",
             "subject": "Re: Original Subject",
             "isDraft": True
-        }
+        })
         mock_create_response.raise_for_status = MagicMock()
 
         # Mock PATCH update response
         mock_update_response = MagicMock()
         mock_update_response.status_code = 200
-        mock_update_response.json.return_value = {
+        mock_update_response.content = orjson.dumps({
             "id": "AAMkAGI2NGI...",
             "conversationId": "AAQkAGI...",
             "subject": "Re: Original Subject",
@@ -282,7 +428,7 @@ class TestCreateReplyDraft:
                 "content": "<p>Thanks for your email!</p>"
             },
             "isDraft": True
-        }
+        })
         mock_update_response.raise_for_status = MagicMock()
 
         with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
@@ -304,37 +450,37 @@ class TestCreateReplyDraft:
             assert result["conversationId"] == "AAQkAGI..."
             assert result["subject"] == "Re: Original Subject"
 
-            # Verify createReply was called
+            # Verify createReply was called with the body in the same request
             mock_async_client.post.assert_called_once()
             post_call_args = mock_async_client.post.call_args[0]
             assert "createReply" in post_call_args[0]
+            post_call_kwargs = mock_async_client.post.call_args[1]
+            assert "content" in post_call_kwargs
+            body = orjson.loads(post_call_kwargs["content"])["message"]["body"]
+            assert body["contentType"] == "html"
+            assert body["content"] == "<p>Thanks for your email!</p>"
 
-            # Verify PATCH was called to update body
-            mock_async_client.patch.assert_called_once()
-            patch_call_kwargs = mock_async_client.patch.call_args[1]
-            assert "json" in patch_call_kwargs
-            assert "body" in patch_call_kwargs["json"]
-            assert patch_call_kwargs["json"]["body"]["contentType"] == "html"
-            assert patch_call_kwargs["json"]["body"]["content"] == "<p>Thanks for your email!</p>"
+            # No follow-up PATCH is needed without a comment
+            mock_async_client.patch.assert_not_called()
 
     async def test_create_reply_draft_with_comment(self):
         """Test draft creation with optional comment."""
         mock_create_response = MagicMock()
         mock_create_response.status_code = 200
-        mock_create_response.json.return_value = {
+        mock_create_response.content = orjson.dumps({
             "id": "AAMkAGI2NGI...",
             "conversationId": "AAQkAGI...",
             "subject": "Re: Original Subject"
-        }
+        })
         mock_create_response.raise_for_status = MagicMock()
 
         mock_update_response = MagicMock()
         mock_update_response.status_code = 200
-        mock_update_response.json.return_value = {
+        mock_update_response.content = orjson.dumps({
             "id": "AAMkAGI2NGI...",
             "conversationId": "AAQkAGI...",
             "subject": "Re: Original Subject"
-        }
+        })
         mock_update_response.raise_for_status = MagicMock()
 
         with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
@@ -354,9 +500,14 @@ class TestCreateReplyDraft:
 
             # Verify comment was included in createReply call
             post_call_kwargs = mock_async_client.post.call_args[1]
-            assert "json" in post_call_kwargs
-            assert "comment" in post_call_kwargs["json"]
-            assert post_call_kwargs["json"]["comment"] == "This is a quick reply"
+            assert "content" in post_call_kwargs
+            assert "comment" in orjson.loads(post_call_kwargs["content"])
+            assert orjson.loads(post_call_kwargs["content"])["comment"] == "This is a quick reply"
+
+            # Graph rejects comment + message.body, so the body is PATCHed separately
+            mock_async_client.patch.assert_called_once()
+            patch_call_kwargs = mock_async_client.patch.call_args[1]
+            assert orjson.loads(patch_call_kwargs["content"])["body"]["content"] == "<p>Reply</p>"
 
     async def test_create_reply_draft_message_not_found(self):
         """Test error when message doesn't exist."""
@@ -384,10 +535,9 @@ class TestCreateReplyDraft:
         """Test 400 error for invalid request."""
         mock_response = MagicMock()
         mock_response.status_code = 400
-        mock_response.content = b'{"error": {"message": "Invalid request"}}'
-        mock_response.json.return_value = {
+        mock_response.content = orjson.dumps({
             "error": {"message": "Invalid request"}
-        }
+        })
 
         with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
             mock_async_client = MagicMock()
@@ -410,12 +560,13 @@ class TestCreateReplyDraft:
         """Test 429 rate limit error."""
         mock_response = MagicMock()
         mock_response.status_code = 429
-        mock_response.content = b'{"error": {"message": "Rate limit exceeded"}}'
-        mock_response.json.return_value = {
+        mock_response.headers = {"Retry-After": "2"}
+        mock_response.content = orjson.dumps({
             "error": {"message": "Rate limit exceeded"}
-        }
+        })
 
-        with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
+        with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client, \
+                patch("app.integrations.outlook_service.asyncio.sleep", new=AsyncMock()) as mock_sleep:
             mock_async_client = MagicMock()
             mock_async_client.__aenter__ = AsyncMock(return_value=mock_async_client)
             mock_async_client.__aexit__ = AsyncMock(return_value=None)
@@ -430,16 +581,19 @@ class TestCreateReplyDraft:
                 )
 
             assert exc_info.value.status_code == 429
+            # Retried after Retry-After until attempts ran out
+            assert mock_async_client.post.call_count == outlook_service._MAX_RETRY_ATTEMPTS
+            mock_sleep.assert_awaited_with(2.0)
 
     async def test_create_reply_draft_no_draft_id_returned(self):
         """Test error when Graph API doesn't return draft ID."""
         mock_create_response = MagicMock()
         mock_create_response.status_code = 200
-        mock_create_response.json.return_value = {
+        mock_create_response.content = orjson.dumps({
             # Missing "id" field
             "conversationId": "AAQkAGI...",
             "subject": "Re: Original Subject"
-        }
+        })
         mock_create_response.raise_for_status = MagicMock()
 
         with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
@@ -457,3 +611,122 @@ class TestCreateReplyDraft:
                 )
 
             assert "no ID returned" in exc_info.value.message
+
+
+@pytest.mark.asyncio
+class TestGetMessagesBulk:
+    """Test get_messages_bulk function."""
+
+    @staticmethod
+    def _batch_response(responses: list[dict]) -> MagicMock:
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.content = orjson.dumps({"responses": responses})
+        return mock_response
+
+    async def test_get_messages_bulk_batches_and_preserves_order(self):
+        """Test IDs are packed into $batch requests and returned in input order."""
+        async def fake_post(url, **kwargs):
+            requests = orjson.loads(kwargs["content"])["requests"]
+            # Answer out of order, as Graph may
+            return self._batch_response([
+                {"id": r["id"], "status": 200, "body": {"id": r["url"].rsplit("/", 1)[-1]}}
+                for r in reversed(requests)
+            ])
+
+        with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
+            mock_async_client = MagicMock()
+            mock_async_client.post = AsyncMock(side_effect=fake_post)
+            mock_client.return_value = mock_async_client
+
+            ids = ["m1", "m2", "m3", "m4", "m5"]
+            result = await get_messages_bulk("fake_token", ids, batch_size=4)
+
+            assert [m["id"] for m in result] == ids
+            assert mock_async_client.post.call_count == 2
+            assert mock_async_client.post.call_args[0][0] == "/$batch"
+
+    async def test_get_messages_bulk_retries_throttled(self):
+        """Test throttled sub-requests are retried after Retry-After."""
+        responses = [
+            self._batch_response([
+                {"id": "0", "status": 200, "body": {"id": "m1"}},
+                {"id": "1", "status": 429, "headers": {"Retry-After": "0"}, "body": {}},
+            ]),
+            self._batch_response([
+                {"id": "0", "status": 200, "body": {"id": "m2"}},
+            ]),
+        ]
+
+        with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client, \
+                patch("app.integrations.outlook_service.asyncio.sleep", new=AsyncMock()):
+            mock_async_client = MagicMock()
+            mock_async_client.post = AsyncMock(side_effect=responses)
+            mock_client.return_value = mock_async_client
+
+            result = await get_messages_bulk("fake_token", ["m1", "m2"])
+
+            assert [m["id"] for m in result] == ["m1", "m2"]
+            retry_requests = orjson.loads(mock_async_client.post.call_args[1]["content"])["requests"]
+            assert retry_requests == [{"id": "0", "method": "GET", "url": "/me/messages/m2"}]
+
+    async def test_get_messages_bulk_retries_date_retry_after(self):
+        """Test an HTTP-date Retry-After on a sub-response falls back to backoff instead of failing."""
+        responses = [
+            self._batch_response([
+                {
+                    "id": "0",
+                    "status": 429,
+                    "headers": {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"},
+                    "body": {},
+                },
+            ]),
+            self._batch_response([
+                {"id": "0", "status": 200, "body": {"id": "m1"}},
+            ]),
+        ]
+
+        with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client, \
+                patch("app.integrations.outlook_service.asyncio.sleep", new=AsyncMock()) as mock_sleep:
+            mock_async_client = MagicMock()
+            mock_async_client.post = AsyncMock(side_effect=responses)
+            mock_client.return_value = mock_async_client
+
+            result = await get_messages_bulk("fake_token", ["m1"])
+
+            assert [m["id"] for m in result] == ["m1"]
+            # First attempt backs off 2**0 seconds plus jitter
+            assert 1.0 <= mock_sleep.await_args[0][0] < 2.0
+
+    async def test_get_messages_bulk_not_found(self):
+        """Test 404 sub-response raises MessageNotFoundError."""
+        with patch("app.integrations.outlook_service.httpx.AsyncClient") as mock_client:
+            mock_async_client = MagicMock()
+            mock_async_client.post = AsyncMock(return_value=self._batch_response([
+                {"id": "0", "status": 404, "body": {"error": {"message": "Not found"}}},
+            ]))
+            mock_client.return_value = mock_async_client
+
+            with pytest.raises(MessageNotFoundError):
+                await get_messages_bulk("fake_token", ["missing"])
+
+
+class TestMailboxSemaphore:
+    """Test the per-mailbox batch concurrency gate."""
+
+    def test_refreshed_token_shares_semaphore(self):
+        """Test a refreshed token for the same mailbox gets the same semaphore."""
+        old_token = _jwt(tid="tenant", oid="user", exp=1)
+        new_token = _jwt(tid="tenant", oid="user", exp=2)
+
+        semaphore = outlook_service._mailbox_semaphore(old_token)
+
+        assert outlook_service._mailbox_semaphore(new_token) is semaphore
+        assert outlook_service._mailbox_semaphore(_jwt(tid="tenant", oid="other")) is not semaphore
+
+    def test_opaque_token_not_kept(self):
+        """Test tokens that aren't JWTs are keyed by a hash, not the raw token."""
+        semaphore = outlook_service._mailbox_semaphore("opaque_token")
+
+        assert outlook_service._mailbox_semaphore("opaque_token") is semaphore
+        assert "opaque_token" not in outlook_service._mailbox_semaphores
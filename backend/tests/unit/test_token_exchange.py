@@ -3,8 +3,10 @@
 These tests verify the token exchange logic with mocked HTTP responses.
 """
 
+from urllib.parse import parse_qs
+
 import pytest
-from unittest.mock import AsyncMock, patch, MagicMock
+from unittest.mock import patch
 import httpx
 from fastapi import HTTPException
 
@@ -14,99 +16,74 @@ from app.auth.token_exchange import (
     InsufficientScopeError,
     InvalidGrantError,
 )
+from tests.conftest import MockHttpx
+
+TOKEN_PATH = "/oauth/token"
 
 
 @pytest.mark.unit
 @pytest.mark.asyncio
-async def test_get_google_access_token_success():
+async def test_get_google_access_token_success(mock_httpx: MockHttpx):
     """Test successful token exchange returns access token."""
     user_sub = "auth0|123456"
     scopes = ["https://www.googleapis.com/auth/gmail.readonly"]
     expected_token = "ya29.mock-google-access-token"
 
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {
+    mock_httpx.set(TOKEN_PATH, 200, {
         "access_token": expected_token,
         "token_type": "Bearer",
         "expires_in": 3600,
-    }
-    mock_response.raise_for_status = MagicMock()
+    })
 
-    with patch("httpx.AsyncClient") as mock_client_class:
-        mock_client = AsyncMock()
-        mock_client.__aenter__.return_value = mock_client
-        mock_client.__aexit__.return_value = None
-        mock_client.post = AsyncMock(return_value=mock_response)
-        mock_client_class.return_value = mock_client
+    result = await get_google_access_token(user_sub, scopes)
 
-        result = await get_google_access_token(user_sub, scopes)
+    assert result == expected_token
+    assert len(mock_httpx.requests) == 1
+    request = mock_httpx.requests[0]
 
-        assert result == expected_token
-        assert mock_client.post.called
-        call_args = mock_client.post.call_args
-
-        # Verify the request parameters
-        assert "oauth/token" in call_args.args[0]
-        assert call_args.kwargs["data"]["grant_type"] == "urn:ietf:params:oauth:grant-type:token-exchange"
-        assert call_args.kwargs["data"]["scope"] == " ".join(scopes)
+    # Verify the request parameters
+    assert request.method == "POST"
+    assert request.url.path == TOKEN_PATH
+    form = parse_qs(request.content.decode())
+    assert form["grant_type"] == ["urn:ietf:params:oauth:grant-type:token-exchange"]
+    assert form["scope"] == [" ".join(scopes)]
 
 
 @pytest.mark.unit
 @pytest.mark.asyncio
-async def test_get_google_access_token_insufficient_scope():
+async def test_get_google_access_token_insufficient_scope(mock_httpx: MockHttpx):
     """Test 403 error raises InsufficientScopeError."""
     user_sub = "auth0|123456"
     scopes = ["https://www.googleapis.com/auth/gmail.readonly"]
 
-    mock_response = MagicMock()
-    mock_response.status_code = 403
-    mock_response.content = b'{"error": "access_denied", "error_description": "Insufficient scope"}'
-    mock_response.json.return_value = {
+    mock_httpx.set(TOKEN_PATH, 403, {
         "error": "access_denied",
         "error_description": "Insufficient scope for requested operation",
-    }
+    })
 
-    with patch("httpx.AsyncClient") as mock_client_class:
-        mock_client = AsyncMock()
-        mock_client.__aenter__.return_value = mock_client
-        mock_client.__aexit__.return_value = None
-        mock_client.post = AsyncMock(return_value=mock_response)
-        mock_client_class.return_value = mock_client
+    with pytest.raises(InsufficientScopeError) as exc_info:
+        await get_google_access_token(user_sub, scopes)
 
-        with pytest.raises(InsufficientScopeError) as exc_info:
-            await get_google_access_token(user_sub, scopes)
-
-        assert exc_info.value.status_code == 403
-        assert "permission" in exc_info.value.message.lower() or "scope" in exc_info.value.message.lower()
+    assert exc_info.value.status_code == 403
+    assert "permission" in exc_info.value.message.lower() or "scope" in exc_info.value.message.lower()
 
 
 @pytest.mark.unit
 @pytest.mark.asyncio
-async def test_get_google_access_token_invalid_grant():
+async def test_get_google_access_token_invalid_grant(mock_httpx: MockHttpx):
     """Test 401 error raises InvalidGrantError."""
     user_sub = "auth0|123456"
     scopes = ["https://www.googleapis.com/auth/gmail.readonly"]
 
-    mock_response = MagicMock()
-    mock_response.status_code = 401
-    mock_response.content = b'{"error": "invalid_grant", "error_description": "Grant is invalid"}'
-    mock_response.json.return_value = {
+    mock_httpx.set(TOKEN_PATH, 401, {
         "error": "invalid_grant",
         "error_description": "Grant is invalid or expired",
-    }
-
-    with patch("httpx.AsyncClient") as mock_client_class:
-        mock_client = AsyncMock()
-        mock_client.__aenter__.return_value = mock_client
-        mock_client.__aexit__.return_value = None
-        mock_client.post = AsyncMock(return_value=mock_response)
-        mock_client_class.return_value = mock_client
+    })
 
-        with pytest.raises(InvalidGrantError) as exc_info:
-            await get_google_access_token(user_sub, scopes)
+    with pytest.raises(InvalidGrantError) as exc_info:
+        await get_google_access_token(user_sub, scopes)
 
-        assert exc_info.value.status_code == 401
+    assert exc_info.value.status_code == 401
 
 
 @pytest.mark.unit
@@ -131,110 +108,80 @@ async def test_get_google_access_token_missing_config():
 
 @pytest.mark.unit
 @pytest.mark.asyncio
-async def test_get_google_access_token_timeout():
+async def test_get_google_access_token_timeout(mock_httpx: MockHttpx):
     """Test timeout raises HTTPException with 504."""
     user_sub = "auth0|123456"
     scopes = ["https://www.googleapis.com/auth/gmail.readonly"]
 
-    with patch("httpx.AsyncClient") as mock_client_class:
-        mock_client = AsyncMock()
-        mock_client.__aenter__.return_value = mock_client
-        mock_client.__aexit__.return_value = None
-        mock_client.post = AsyncMock(side_effect=httpx.TimeoutException("Request timeout"))
-        mock_client_class.return_value = mock_client
+    mock_httpx.fail(TOKEN_PATH, httpx.TimeoutException("Request timeout"))
 
-        with pytest.raises(HTTPException) as exc_info:
-            await get_google_access_token(user_sub, scopes)
+    with pytest.raises(HTTPException) as exc_info:
+        await get_google_access_token(user_sub, scopes)
 
-        assert exc_info.value.status_code == 504
-        assert "timeout" in exc_info.value.detail.lower()
+    assert exc_info.value.status_code == 504
+    assert "timeout" in exc_info.value.detail.lower()
 
 
 @pytest.mark.unit
 @pytest.mark.asyncio
-async def test_get_google_access_token_network_error():
+async def test_get_google_access_token_network_error(mock_httpx: MockHttpx):
     """Test network error raises HTTPException with 503."""
     user_sub = "auth0|123456"
     scopes = ["https://www.googleapis.com/auth/gmail.readonly"]
 
-    with patch("httpx.AsyncClient") as mock_client_class:
-        mock_client = AsyncMock()
-        mock_client.__aenter__.return_value = mock_client
-        mock_client.__aexit__.return_value = None
-        mock_client.post = AsyncMock(side_effect=httpx.RequestError("Network error"))
-        mock_client_class.return_value = mock_client
+    mock_httpx.fail(TOKEN_PATH, httpx.RequestError("Network error"))
 
-        with pytest.raises(HTTPException) as exc_info:
-            await get_google_access_token(user_sub, scopes)
+    with pytest.raises(HTTPException) as exc_info:
+        await get_google_access_token(user_sub, scopes)
 
-        assert exc_info.value.status_code == 503
-        assert "connect" in exc_info.value.detail.lower()
+    assert exc_info.value.status_code == 503
+    assert "connect" in exc_info.value.detail.lower()
 
 
 @pytest.mark.unit
 @pytest.mark.asyncio
-async def test_get_google_access_token_missing_access_token_in_response():
+async def test_get_google_access_token_missing_access_token_in_response(mock_httpx: MockHttpx):
     """Test response without access_token field raises error."""
     user_sub = "auth0|123456"
     scopes = ["https://www.googleapis.com/auth/gmail.readonly"]
 
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {
+    mock_httpx.set(TOKEN_PATH, 200, {
         "token_type": "Bearer",
         "expires_in": 3600,
         # Missing access_token field
-    }
-    mock_response.raise_for_status = MagicMock()
-
-    with patch("httpx.AsyncClient") as mock_client_class:
-        mock_client = AsyncMock()
-        mock_client.__aenter__.return_value = mock_client
-        mock_client.__aexit__.return_value = None
-        mock_client.post = AsyncMock(return_value=mock_response)
-        mock_client_class.return_value = mock_client
+    })
 
-        with pytest.raises(TokenExchangeError) as exc_info:
-            await get_google_access_token(user_sub, scopes)
+    with pytest.raises(TokenExchangeError) as exc_info:
+        await get_google_access_token(user_sub, scopes)
 
-        assert "invalid_token_response" in exc_info.value.error_code
-        assert exc_info.value.status_code == 500
+    assert "invalid_token_response" in exc_info.value.error_code
+    assert exc_info.value.status_code == 500
 
 
 @pytest.mark.unit
 @pytest.mark.asyncio
-async def test_get_google_access_token_logs_without_tokens():
+async def test_get_google_access_token_logs_without_tokens(mock_httpx: MockHttpx):
     """Test that access tokens are never logged (security check)."""
     user_sub = "auth0|123456"
     scopes = ["https://www.googleapis.com/auth/gmail.readonly"]
     secret_token = "ya29.secret-should-never-appear-in-logs"
 
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {
+    mock_httpx.set(TOKEN_PATH, 200, {
         "access_token": secret_token,
         "token_type": "Bearer",
         "expires_in": 3600,
-    }
-    mock_response.raise_for_status = MagicMock()
+    })
 
-    with patch("httpx.AsyncClient") as mock_client_class:
-        mock_client = AsyncMock()
-        mock_client.__aenter__.return_value = mock_client
-        mock_client.__aexit__.return_value = None
-        mock_client.post = AsyncMock(return_value=mock_response)
-        mock_client_class.return_value = mock_client
-
-        with patch("app.auth.token_exchange.logger") as mock_logger:
-            result = await get_google_access_token(user_sub, scopes)
+    with patch("app.auth.token_exchange.logger") as mock_logger:
+        result = await get_google_access_token(user_sub, scopes)
 
-            assert result == secret_token
+        assert result == secret_token
 
-            # Check that no log call contains the actual token
-            for call in mock_logger.info.call_args_list:
-                args_str = str(call)
-                assert secret_token not in args_str, "Secret token found in logs!"
+        # Check that no log call contains the actual token
+        for call in mock_logger.info.call_args_list:
+            args_str = str(call)
+            assert secret_token not in args_str, "Secret token found in logs!"
 
-            for call in mock_logger.error.call_args_list:
-                args_str = str(call)
-                assert secret_token not in args_str, "Secret token found in error logs!"
+        for call in mock_logger.error.call_args_list:
+            args_str = str(call)
+            assert secret_token not in args_str, "Secret token found in error logs!"